@@ -28,14 +28,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'cloudinary_storage',
-    'cloudinary',
     'core.apps.CoreConfig',  # Use app config to load signals
 ]
 
+# Cloudinary pulls in urllib3 and friends at startup; only load it when it is configured
+if os.environ.get('CLOUDINARY_CLOUD_NAME'):
+    INSTALLED_APPS[-1:-1] = ['cloudinary_storage', 'cloudinary']
+
 MIDDLEWARE = [
+    'core.logs.RequestIdMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.compression.CompressionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.metrics.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -82,6 +87,34 @@ else:
         }
     }
 
+# Optional read replica / separate analytics database for reports, forecast and exports
+# (core.routers). Locally: ANALYTICS_DATABASE_URL=sqlite:///analytics.sqlite3
+if os.environ.get('ANALYTICS_DATABASE_URL'):
+    DATABASES['analytics'] = dj_database_url.parse(
+        os.environ['ANALYTICS_DATABASE_URL'],
+        conn_max_age=600,
+        conn_health_checks=True,
+    )
+DATABASE_ROUTERS = ['core.routers.AnalyticsRouter']
+ANALYTICS_PIN_SECONDS = int(os.environ.get('ANALYTICS_PIN_SECONDS', '10'))  # read-your-writes window after a sale
+
+# Opt-in SQLite tuning for concurrent checkouts on the local database (core.sqlite).
+# Run `manage.py sqlite_maintenance` periodically to checkpoint the WAL.
+SQLITE_PERFORMANCE_MODE = os.environ.get('SQLITE_PERFORMANCE_MODE', 'False').lower() == 'true'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # safe with WAL; may lose the last commits on power loss, never corrupts
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'cache_size': -20000,  # negative means KiB, so ~20 MB per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+if SQLITE_PERFORMANCE_MODE:
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.sqlite3':
+            # Take the write lock when a transaction begins, not when its first read upgrades
+            database.setdefault('OPTIONS', {})['transaction_mode'] = 'IMMEDIATE'
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -97,6 +130,8 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Until collectstatic has run (e.g. a serverless build without a build step), serve straight from static/
+WHITENOISE_USE_FINDERS = DEBUG or not (STATIC_ROOT / 'staticfiles.json').exists()
 
 # Cloudinary configuration for media files
 CLOUDINARY_STORAGE = {
@@ -105,16 +140,81 @@ CLOUDINARY_STORAGE = {
     'API_SECRET': os.environ.get('CLOUDINARY_API_SECRET'),
 }
 
-# Use Cloudinary for media files if configured, otherwise use local storage
+# Use Cloudinary for media files if configured, otherwise use local storage.
+# Static files get hashed names and precompressed copies at collectstatic time (core.storage).
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.storage.StaticFilesStorage',
+    },
+}
 if os.environ.get('CLOUDINARY_CLOUD_NAME'):
-    DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+    STORAGES['default']['BACKEND'] = 'cloudinary_storage.storage.MediaCloudinaryStorage'
     MEDIA_URL = '/media/'
 else:
     MEDIA_URL = '/media/'
     MEDIA_ROOT = BASE_DIR / 'media'
 
+# Content-addressed local media (core.storage), served with immutable cache headers.
+# Disabled when media lives on Cloudinary since the serverless filesystem is not persistent.
+MEDIA_CAS_ENABLED = not os.environ.get('CLOUDINARY_CLOUD_NAME')
+MEDIA_CAS_ROOT = Path(os.environ.get('MEDIA_CAS_ROOT', BASE_DIR / 'media' / 'cas'))
+MEDIA_CAS_URL = MEDIA_URL + 'cas/'
+MEDIA_CAS_MAX_AGE = 60 * 60 * 24 * 365  # 1 year
+
+# Background image uploads (core.uploads)
+IMGBB_UPLOAD_URL = os.environ.get('IMGBB_UPLOAD_URL', 'https://api.imgbb.com/1/upload')
+IMAGE_UPLOAD_WORKERS = int(os.environ.get('IMAGE_UPLOAD_WORKERS', '4'))
+IMAGE_UPLOAD_MAX_PENDING = int(os.environ.get('IMAGE_UPLOAD_MAX_PENDING', '32'))
+IMAGE_UPLOAD_TIMEOUT = (5, 30)  # (connect, read) seconds
+IMAGE_UPLOAD_RETRIES = 3
+IMAGE_UPLOAD_BACKOFF = 1.0  # seconds, doubled on each retry
+IMAGE_UPLOAD_JOB_TTL = 600  # keep finished job status for 10 minutes
+IMAGE_UPLOAD_SPOOL_DIR = os.environ.get('IMAGE_UPLOAD_SPOOL_DIR') or None  # system temp dir by default
+# Upload inside the request instead of on a background thread; api/index.py sets it on serverless
+IMAGE_UPLOAD_INLINE = os.environ.get('IMAGE_UPLOAD_INLINE', 'False').lower() == 'true'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Serverless cold start (api/index.py, core.warmup, profile_startup)
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', 'True').lower() == 'true'
+WARMUP_TEMPLATES = [
+    'core/base.html',
+    'core/login.html',
+    'core/home.html',
+    'core/pos.html',
+    'core/receipt.html',
+]
+COLD_START_BUDGET_MS = int(os.environ.get('COLD_START_BUDGET_MS', '1500'))
+
+# Cache for template fragments (core.fragments) and upload job status (core.uploads). LocMem is per process; with
+# several workers or instances set CACHE_BACKEND=db (after `manage.py createcachetable`) so both reach all of them.
+if os.environ.get('CACHE_BACKEND') == 'db':
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'django_cache'}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'alvarez-bakery'}}
+FRAGMENT_CACHE_SECONDS = int(os.environ.get('FRAGMENT_CACHE_SECONDS', '300'))  # also bounds staleness without a shared cache
+
+# Response compression (core.compression): gzip, or brotli for non-HTML when the Brotli package is installed
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))  # smaller bodies fit in a packet anyway
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '5'))  # 0-11; 11 is too slow per request
+
+# Request metrics (core.metrics); requests slower than this are logged to core.slow_requests, 0 disables
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '1000'))
+
+# Login history is buffered in memory and written in batches (core.audit); 0 writes on every login/logout
+LOGIN_AUDIT_FLUSH_SECONDS = float(os.environ.get('LOGIN_AUDIT_FLUSH_SECONDS', '2'))
+LOGIN_AUDIT_MAX_EVENTS = int(os.environ.get('LOGIN_AUDIT_MAX_EVENTS', '200'))  # flush early once this many are queued
+# Events kept for retry while the database is unavailable; the oldest are dropped beyond this
+LOGIN_AUDIT_MAX_BUFFERED = int(os.environ.get('LOGIN_AUDIT_MAX_BUFFERED', '10000'))
+
+# Sales velocity and low-stock alerts (core.velocity)
+VELOCITY_HALF_LIFE_DAYS = float(os.environ.get('VELOCITY_HALF_LIFE_DAYS', '7'))  # a day's sales weigh half as much a week later
+REORDER_LEAD_DAYS = float(os.environ.get('REORDER_LEAD_DAYS', '1'))  # from ordering a bake to it being on the shelf
+REORDER_SAFETY_Z = float(os.environ.get('REORDER_SAFETY_Z', '1.65'))  # safety stock in standard deviations; 1.65 covers ~95% of days
+
 # Production security settings
 if not DEBUG:
     SECURE_HSTS_SECONDS = 31536000  # 1 year
@@ -131,24 +231,40 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 
-# Logging configuration for Vercel debugging
+# Structured logging (core.logs): request threads only enqueue records, a listener thread writes them.
+# LOG_QUEUE=False writes on the request thread instead, for hosts that freeze the process after a response
+LOG_QUEUE = os.environ.get('LOG_QUEUE', 'True').lower() == 'true'
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # 'json' or 'text'
+# Share of DEBUG/INFO records kept per logger, decided per request; warnings and errors are always kept
+LOG_SAMPLE_RATES = {
+    'core.cart': float(os.environ.get('LOG_CART_SAMPLE_RATE', '0.1')),
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'sampling': {
+            '()': 'core.logs.SamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
+    },
     'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
+        'queue': {
+            'class': 'core.logs.QueueLogHandler' if LOG_QUEUE else 'core.logs.StreamLogHandler',
+            'stream': 'ext://sys.stderr',
+            'fmt': LOG_FORMAT,
+            'filters': ['sampling'],
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['console'],
             'level': 'INFO',
-            'propagate': True,
         },
     },
     'root': {
-        'handlers': ['console'],
-        'level': 'DEBUG',
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
     },
 }
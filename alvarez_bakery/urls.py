@@ -5,6 +5,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 from core import views as core_views
+from core import async_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -47,6 +48,19 @@ urlpatterns = [
     
     # Image Upload (Admin only)
     path('upload-image/', core_views.upload_image, name='upload_image'),
+    path('upload-image/<str:job_id>/status/', core_views.upload_image_status, name='upload_image_status'),
+
+    # Read-only JSON for dashboards and tablets (async, best served over ASGI)
+    path('api/dashboard/', async_views.dashboard_data, name='api_dashboard'),
+    path('api/reports/', async_views.reports_data, name='api_reports'),
+    path('api/forecast/', async_views.forecast_data, name='api_forecast'),
+    path('api/catalog/', async_views.catalog_data, name='api_catalog'),
+
+    # Request metrics, Prometheus text format (Admin only)
+    path('metrics/', core_views.metrics, name='metrics'),
+
+    # Content-addressed media (immutable, long-lived cache headers)
+    path(settings.MEDIA_CAS_URL.lstrip('/') + '<path:path>', core_views.cas_media, name='cas_media'),
 ]
 
 # serve uploaded media in development
@@ -1,13 +1,19 @@
 import os
 import sys
 from http.server import BaseHTTPRequestHandler
-from io import BytesIO
+from urllib.parse import urlsplit, unquote
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Set Django settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alvarez_bakery.settings')
+# The function may be frozen right after a response, so don't leave login history queued in memory
+os.environ.setdefault('LOGIN_AUDIT_FLUSH_SECONDS', '0')
+# ...nor an image upload running on a background thread
+os.environ.setdefault('IMAGE_UPLOAD_INLINE', 'True')
+# ...or log records waiting for the listener thread
+os.environ.setdefault('LOG_QUEUE', 'False')
 
 # Import Django and setup
 import django
@@ -17,67 +23,181 @@ django.setup()
 from django.core.wsgi import get_wsgi_application
 _application = get_wsgi_application()
 
+# Build URL resolvers and compile hot templates before the first request arrives
+from django.conf import settings
+if settings.WARMUP_ON_START:
+    from core.warmup import warm_up
+    warm_up()
+
+
+class LimitedReader:
+    """wsgi.input that reads the request body straight from the socket, up to Content-Length"""
+
+    def __init__(self, stream, length):
+        self._stream = stream
+        self._remaining = length
+
+    @property
+    def remaining(self):
+        return self._remaining
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._stream.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def readline(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._stream.readline(size)
+        self._remaining -= len(data)
+        return data
+
+    def readlines(self, hint=-1):
+        return list(iter(self.readline, b''))
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+
 class handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 is required for chunked transfer encoding of streaming responses
+    protocol_version = 'HTTP/1.1'
+    application = staticmethod(_application)
+    max_drain_bytes = 256 * 1024
+
     def do_GET(self):
         return self._handle_request()
-    
+
+    def do_HEAD(self):
+        return self._handle_request()
+
     def do_POST(self):
         return self._handle_request()
-    
+
     def do_PUT(self):
         return self._handle_request()
-    
+
     def do_DELETE(self):
         return self._handle_request()
-    
+
     def do_PATCH(self):
         return self._handle_request()
-    
-    def _handle_request(self):
-        # Build WSGI environ from HTTP request
+
+    def _build_environ(self):
+        url = urlsplit(self.path)
+        try:
+            content_length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            content_length = 0
+
         environ = {
             'REQUEST_METHOD': self.command,
             'SCRIPT_NAME': '',
-            'PATH_INFO': self.path.split('?')[0],
-            'QUERY_STRING': self.path.split('?')[1] if '?' in self.path else '',
+            # WSGI strings are latin-1 decoded bytes; Django re-decodes them as UTF-8
+            'PATH_INFO': unquote(url.path, 'iso-8859-1'),
+            # Keep the raw query string so repeated keys (?a=1&a=2) survive for QueryDict
+            'QUERY_STRING': url.query,
             'CONTENT_TYPE': self.headers.get('Content-Type', ''),
-            'CONTENT_LENGTH': self.headers.get('Content-Length', '0'),
+            'CONTENT_LENGTH': str(content_length),
             'SERVER_NAME': self.headers.get('Host', 'localhost').split(':')[0],
             'SERVER_PORT': '443',
             'SERVER_PROTOCOL': self.request_version,
+            'REMOTE_ADDR': self.client_address[0] if self.client_address else '',
             'wsgi.version': (1, 0),
             'wsgi.url_scheme': 'https',
-            'wsgi.input': BytesIO(self.rfile.read(int(self.headers.get('Content-Length', 0)))),
+            'wsgi.input': LimitedReader(self.rfile, content_length),
             'wsgi.errors': sys.stderr,
             'wsgi.multithread': False,
             'wsgi.multiprocess': False,
             'wsgi.run_once': False,
         }
-        
-        # Add HTTP headers to environ
+
+        # Add HTTP headers to environ; repeated headers are joined per RFC 9110,
+        # except Cookie, whose pairs are separated by "; " (RFC 6265)
         for key, value in self.headers.items():
             key = key.replace('-', '_').upper()
-            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
-                environ[f'HTTP_{key}'] = value
-        
-        # Response data
-        response_status = None
-        response_headers = []
-        
-        def start_response(status, headers):
-            nonlocal response_status, response_headers
-            response_status = status
-            response_headers = headers
-        
-        # Call Django WSGI application
-        response_body = b''.join(_application(environ, start_response))
-        
-        # Send response
-        status_code = int(response_status.split()[0])
-        self.send_response(status_code)
-        
-        for header_name, header_value in response_headers:
-            self.send_header(header_name, header_value)
-        self.end_headers()
-        
-        self.wfile.write(response_body)
+            if key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                continue
+            key = f'HTTP_{key}'
+            if key in environ:
+                value = f'{environ[key]}; {value}' if key == 'HTTP_COOKIE' else f'{environ[key]},{value}'
+            environ[key] = value
+        return environ
+
+    def _handle_request(self):
+        environ = self._build_environ()
+        state = {'status': None, 'headers': None, 'sent': False, 'chunked': False}
+
+        def send_headers():
+            status_code = int(state['status'].split()[0])
+            header_names = {name.lower() for name, _ in state['headers']}
+            bodyless = self.command == 'HEAD' or status_code in (204, 304) or status_code < 200
+            unsized = not bodyless and 'content-length' not in header_names
+            # Without a Content-Length the body is streamed with chunked transfer encoding,
+            # or for HTTP/1.0 clients, which don't know chunking, ended by closing the connection
+            state['chunked'] = unsized and self.request_version not in ('HTTP/0.9', 'HTTP/1.0')
+            close_delimited = unsized and not state['chunked']
+
+            self.send_response(status_code)
+            for header_name, header_value in state['headers']:
+                self.send_header(header_name, header_value)
+            if state['chunked']:
+                self.send_header('Transfer-Encoding', 'chunked')
+            if close_delimited or environ['wsgi.input'].remaining > self.max_drain_bytes:
+                # The body ends with the connection, or there is too much unread
+                # request body to skip cheaply; either way don't reuse the connection
+                self.send_header('Connection', 'close')
+            self.end_headers()
+            state['sent'] = True
+
+        def write(data):
+            if not state['sent']:
+                send_headers()
+            if not data or self.command == 'HEAD':
+                return
+            if state['chunked']:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            else:
+                self.wfile.write(data)
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info:
+                try:
+                    if state['sent']:
+                        raise exc_info[1].with_traceback(exc_info[2])
+                finally:
+                    exc_info = None
+            elif state['status'] is not None:
+                raise AssertionError('start_response called twice without exc_info')
+            state['status'] = status
+            state['headers'] = headers
+            return write
+
+        result = self.application(environ, start_response)
+        try:
+            for data in result:
+                if data:
+                    write(data)
+            if not state['sent']:
+                send_headers()
+            if state['chunked']:
+                self.wfile.write(b'0\r\n\r\n')
+            self.wfile.flush()
+        finally:
+            # Lets Django close DB connections and fire request_finished
+            if hasattr(result, 'close'):
+                result.close()
+
+        # An unread request body would be parsed as the next request on a kept-alive connection
+        if environ['wsgi.input'].remaining > self.max_drain_bytes:
+            self.close_connection = True
+        else:
+            while environ['wsgi.input'].read(64 * 1024):
+                pass
@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Product, SalesTransaction, SalesItem, LoginHistory, UserProfile
+from .models import (
+    Product, SalesTransaction, SalesItem, LoginHistory, UserProfile,
+    ArchivedSalesTransaction, ArchivedSalesItem, DailySalesSummary, DailyProductSummary, StockMovement,
+    SalesVelocity,
+)
+from . import batches, stock
 
 class SalesItemInline(admin.TabularInline):
     model = SalesItem
@@ -16,6 +21,49 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ('is_active',)
     search_fields = ('name',)
 
+    def save_model(self, request, obj, form, change):
+        previous = form.initial.get('stock', 0)
+        if change:
+            batches.apply_edit(obj, form.initial.get('expiration_date'))
+        super().save_model(request, obj, form, change)
+        if change:
+            movement = stock.stock_change(obj, previous, user=request.user, note='Admin')
+            if movement:
+                stock.record([movement])
+        else:
+            batches.opening_batches([obj])
+            stock.record_new_products([obj], user=request.user)
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    """Read-only: the ledger is append-only"""
+    list_display = ('created_at', 'product', 'kind', 'quantity', 'sale_id', 'user', 'note')
+    list_filter = ('kind',)
+    search_fields = ('product__name', 'note')
+    list_select_related = ('product', 'user')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(SalesVelocity)
+class SalesVelocityAdmin(admin.ModelAdmin):
+    """Read-only: checkout and update_velocity maintain these rows"""
+    list_display = ('product', 'rate', 'reorder_point', 'day', 'units_today')
+    search_fields = ('product__name',)
+    list_select_related = ('product',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(LoginHistory)
 class LoginHistoryAdmin(admin.ModelAdmin):
     list_display = ['user', 'login_time', 'ip_address', 'logout_time']
@@ -28,3 +76,24 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'created_at', 'updated_at']
     search_fields = ['user__username', 'user__email']
     readonly_fields = ['created_at', 'updated_at']
+
+class ArchivedSalesItemInline(admin.TabularInline):
+    model = ArchivedSalesItem
+    extra = 0
+
+@admin.register(ArchivedSalesTransaction)
+class ArchivedSalesTransactionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'cashier', 'total_amount', 'discount', 'payment_method', 'created_at', 'archived_at')
+    date_hierarchy = 'created_at'
+    inlines = [ArchivedSalesItemInline]
+
+@admin.register(DailySalesSummary)
+class DailySalesSummaryAdmin(admin.ModelAdmin):
+    list_display = ['date', 'orders', 'quantity', 'revenue', 'discount']
+    date_hierarchy = 'date'
+
+@admin.register(DailyProductSummary)
+class DailyProductSummaryAdmin(admin.ModelAdmin):
+    list_display = ['date', 'product', 'quantity', 'revenue']
+    list_filter = ['product']
+    date_hierarchy = 'date'
@@ -6,3 +6,6 @@ class CoreConfig(AppConfig):
     
     def ready(self):
         import core.signals  # Register signals
+        from django.db.backends.signals import connection_created
+        from core.sqlite import configure_connection
+        connection_created.connect(configure_connection, dispatch_uid='core.sqlite.configure_connection')
@@ -0,0 +1,222 @@
+import gzip
+import json
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .fragments import bump_sales
+from .models import (
+    SalesTransaction, SalesItem, ArchivedSalesTransaction, ArchivedSalesItem,
+    DailySalesSummary, DailyProductSummary,
+)
+
+
+def get_sale(sale_id):
+    """Return the sale with this id from the hot table, falling back to the archive"""
+    for model in (SalesTransaction, ArchivedSalesTransaction):
+        sale = model.objects.select_related('cashier').prefetch_related('items__product').filter(pk=sale_id).first()
+        if sale is not None:
+            return sale
+    return None
+
+
+def _summary_range(qs, start=None, end=None):
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+    return qs
+
+
+def _archived_daily_result(rows):
+    return {
+        r['date']: {'revenue': float(r['revenue']), 'quantity': int(r['quantity']), 'orders': int(r['orders'])}
+        for r in rows
+    }
+
+
+def _archived_daily_query(start=None, end=None):
+    return _summary_range(DailySalesSummary.objects.all(), start, end).values('date', 'revenue', 'quantity', 'orders')
+
+
+def archived_daily_totals(start=None, end=None):
+    # returns {date: {'revenue': float, 'quantity': int, 'orders': int}} for archived days
+    return _archived_daily_result(_archived_daily_query(start, end))
+
+
+async def aarchived_daily_totals(start=None, end=None):
+    return _archived_daily_result([r async for r in _archived_daily_query(start, end)])
+
+
+def _archived_product_result(rows):
+    totals = defaultdict(lambda: {'qty': 0, 'revenue': 0.0})
+    for r in rows:
+        totals[r['product__name']]['qty'] += int(r['quantity'])
+        totals[r['product__name']]['revenue'] += float(r['revenue'])
+    return totals
+
+
+def _archived_product_query(start=None, end=None):
+    return _summary_range(DailyProductSummary.objects.all(), start, end).values('product__name', 'quantity', 'revenue')
+
+
+def archived_product_totals(start=None, end=None):
+    # returns {product_name: {'qty': int, 'revenue': float}} for archived days
+    return _archived_product_result(_archived_product_query(start, end))
+
+
+async def aarchived_product_totals(start=None, end=None):
+    return _archived_product_result([r async for r in _archived_product_query(start, end)])
+
+
+def _local_date(dt):
+    return timezone.localtime(dt).date() if timezone.is_aware(dt) else dt.date()
+
+
+def _merge_summaries(sales, items):
+    """Add the totals of one archived batch onto the daily summary tables"""
+    sale_dates = {}
+    day_totals = defaultdict(lambda: {'orders': 0, 'quantity': 0, 'revenue': Decimal('0'), 'discount': Decimal('0')})
+    for sale in sales:
+        day = _local_date(sale.created_at)
+        sale_dates[sale.pk] = day
+        day_totals[day]['orders'] += 1
+        day_totals[day]['discount'] += sale.discount
+
+    product_totals = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0')})
+    for item in items:
+        day = sale_dates[item.sale_id]
+        day_totals[day]['quantity'] += item.qty
+        day_totals[day]['revenue'] += item.line_total
+        product_totals[(day, item.product_id)]['quantity'] += item.qty
+        product_totals[(day, item.product_id)]['revenue'] += item.line_total
+
+    existing = DailySalesSummary.objects.in_bulk(list(day_totals), field_name='date')
+    for day, totals in day_totals.items():
+        if day in existing:
+            DailySalesSummary.objects.filter(pk=existing[day].pk).update(
+                orders=F('orders') + totals['orders'],
+                quantity=F('quantity') + totals['quantity'],
+                revenue=F('revenue') + totals['revenue'],
+                discount=F('discount') + totals['discount'],
+            )
+    DailySalesSummary.objects.bulk_create([
+        DailySalesSummary(date=day, **totals)
+        for day, totals in day_totals.items() if day not in existing
+    ])
+
+    existing = {
+        (s.date, s.product_id): s
+        for s in DailyProductSummary.objects.filter(date__in=list(day_totals))
+    }
+    to_update = []
+    to_create = []
+    for (day, product_id), totals in product_totals.items():
+        summary = existing.get((day, product_id))
+        if summary:
+            summary.quantity += totals['quantity']
+            summary.revenue += totals['revenue']
+            to_update.append(summary)
+        else:
+            to_create.append(DailyProductSummary(date=day, product_id=product_id, **totals))
+    DailyProductSummary.objects.bulk_update(to_update, ['quantity', 'revenue'])
+    DailyProductSummary.objects.bulk_create(to_create)
+
+
+def _export_rows(export_file, sales, items_by_sale):
+    for sale in sales:
+        export_file.write(json.dumps({
+            'id': sale.pk,
+            'cashier_id': sale.cashier_id,
+            'total_amount': sale.total_amount,
+            'discount': sale.discount,
+            'payment_method': sale.payment_method,
+            'cash_received': sale.cash_received,
+            'change_given': sale.change_given,
+            'created_at': sale.created_at,
+            'items': [
+                {
+                    'id': it.pk,
+                    'product_id': it.product_id,
+                    'qty': it.qty,
+                    'unit_price': it.unit_price,
+                    'line_total': it.line_total,
+                }
+                for it in items_by_sale[sale.pk]
+            ],
+        }, cls=DjangoJSONEncoder) + '\n')
+
+
+def archive_sales_before(cutoff, batch_size=1000, export_path=None, keep_archive_rows=True):
+    """
+    Move sales created before `cutoff` (a local date) out of the hot tables.
+
+    Each batch runs in its own transaction: rows are copied into the archive
+    tables (and/or appended to a gzip'd JSON-lines export), rolled up into the
+    daily summaries, then deleted from SalesTransaction/SalesItem.
+    Returns (sales_archived, items_archived).
+    """
+    export_file = gzip.open(export_path, 'at', encoding='utf-8') if export_path else None
+    sales_done = items_done = 0
+    try:
+        while True:
+            with transaction.atomic():
+                sales = list(
+                    SalesTransaction.objects
+                    .filter(created_at__date__lt=cutoff)
+                    .order_by('pk')[:batch_size]
+                )
+                if not sales:
+                    break
+                sale_ids = [s.pk for s in sales]
+                items = list(SalesItem.objects.filter(sale_id__in=sale_ids).order_by('pk'))
+
+                if keep_archive_rows:
+                    ArchivedSalesTransaction.objects.bulk_create([
+                        ArchivedSalesTransaction(
+                            id=s.pk,
+                            cashier_id=s.cashier_id,
+                            total_amount=s.total_amount,
+                            discount=s.discount,
+                            payment_method=s.payment_method,
+                            cash_received=s.cash_received,
+                            change_given=s.change_given,
+                            created_at=s.created_at,
+                        )
+                        for s in sales
+                    ])
+                    ArchivedSalesItem.objects.bulk_create([
+                        ArchivedSalesItem(
+                            id=it.pk,
+                            sale_id=it.sale_id,
+                            product_id=it.product_id,
+                            qty=it.qty,
+                            unit_price=it.unit_price,
+                            line_total=it.line_total,
+                        )
+                        for it in items
+                    ])
+                if export_file:
+                    items_by_sale = defaultdict(list)
+                    for it in items:
+                        items_by_sale[it.sale_id].append(it)
+                    _export_rows(export_file, sales, items_by_sale)
+
+                _merge_summaries(sales, items)
+
+                SalesItem.objects.filter(sale_id__in=sale_ids).delete()
+                SalesTransaction.objects.filter(pk__in=sale_ids).delete()
+
+            sales_done += len(sales)
+            items_done += len(items)
+    finally:
+        if export_file:
+            export_file.close()
+    if sales_done:
+        # Bulk deletes skip the post_save hooks that invalidate cached report tables
+        bump_sales()
+    return sales_done, items_done
@@ -0,0 +1,157 @@
+"""
+Async, read-only JSON endpoints for dashboards and tablets that poll.
+
+Served through alvarez_bakery.asgi, a single worker can keep many of these
+requests in flight while they wait on the database. Independent queries are
+issued together with asyncio.gather; Django still runs each ORM call on the
+request's database thread, so the gain is in worker concurrency rather than
+parallel SQL.
+"""
+import asyncio
+from datetime import date, timedelta, datetime
+from functools import wraps
+
+from django.db.models import Sum, Count
+from django.http import JsonResponse
+
+from . import batches, velocity
+from .models import Product, SalesTransaction
+from .routers import use_analytics_db
+from .utils import adaily_sales, adaily_quantity, atop_sellers, moving_average_forecast
+
+
+def async_login_required(admin=False):
+    """Async counterpart of login_required/user_passes_test(is_admin) returning JSON errors"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return JsonResponse({'error': 'Authentication required'}, status=401)
+            if admin and not user.is_staff:
+                return JsonResponse({'error': 'Admin access required'}, status=403)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _parse_range(request, default_days=30):
+    today = date.today()
+    start_str = request.GET.get('start', (today - timedelta(days=default_days)).isoformat())
+    end_str = request.GET.get('end', today.isoformat())
+    return datetime.fromisoformat(start_str).date(), datetime.fromisoformat(end_str).date()
+
+
+async def _day_totals(day):
+    return await SalesTransaction.objects.filter(created_at__date=day).aaggregate(
+        revenue=Sum('total_amount'), orders=Count('id')
+    )
+
+
+async def _recent_sales(limit=6):
+    qs = (SalesTransaction.objects
+          .annotate(item_count=Count('items'))
+          .order_by('-created_at')[:limit])
+    return [
+        {
+            'id': sale.id,
+            'created_at': sale.created_at.isoformat(),
+            'item_count': sale.item_count,
+            'total_amount': f"{sale.total_amount:.2f}",
+        }
+        async for sale in qs
+    ]
+
+
+def _available_products(today):
+    # Matches the POS view: non-archived, with stock in unexpired batches
+    return batches.sellable(Product.objects.filter(is_archived=False), today)
+
+
+@async_login_required()
+@use_analytics_db
+async def dashboard_data(request):
+    today = date.today()
+    today_totals, yesterday_totals, active_products, low_stock, top_products, recent_sales = await asyncio.gather(
+        _day_totals(today),
+        _day_totals(today - timedelta(days=1)),
+        _available_products(today).acount(),
+        velocity.alow_stock(),
+        atop_sellers(start=today - timedelta(days=7), end=today, limit=5),
+        _recent_sales(),
+    )
+    today_revenue = float(today_totals['revenue'] or 0)
+    yesterday_revenue = float(yesterday_totals['revenue'] or 0)
+    orders = today_totals['orders']
+    return JsonResponse({
+        'today_sales': round(today_revenue, 2),
+        'today_orders': orders,
+        'avg_ticket': round(today_revenue / orders, 2) if orders else 0.0,
+        'today_growth': round((today_revenue - yesterday_revenue) / yesterday_revenue * 100, 1) if yesterday_revenue else 0.0,
+        'active_products': active_products,
+        'low_stock': [
+            {'product': v.product.name, 'stock': v.available, 'reorder_point': v.reorder_point,
+             'days_of_cover': round(v.days_of_cover, 1) if v.days_of_cover is not None else None}
+            for v in low_stock
+        ],
+        'top_products': top_products,
+        'recent_sales': recent_sales,
+    })
+
+
+@async_login_required(admin=True)
+@use_analytics_db
+async def reports_data(request):
+    try:
+        start, end = _parse_range(request)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date range'}, status=400)
+    history = await adaily_sales(start=start, end=end)
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'history': [{'date': h['date'].isoformat(), 'revenue': h['revenue']} for h in history],
+    })
+
+
+@async_login_required(admin=True)
+@use_analytics_db
+async def forecast_data(request):
+    today = date.today()
+    start = today - timedelta(days=60)
+    history, quantity_history, top, top_7days = await asyncio.gather(
+        adaily_sales(start=start, end=today),
+        adaily_quantity(start=start, end=today),
+        atop_sellers(start=start, end=today, limit=5),
+        atop_sellers(start=today - timedelta(days=7), end=today, limit=10),
+    )
+    return JsonResponse({
+        'history': [{'date': h['date'].isoformat(), 'revenue': h['revenue']} for h in history],
+        'quantity_history': [{'date': h['date'].isoformat(), 'quantity': h['quantity']} for h in quantity_history],
+        'forecast_points': moving_average_forecast(history, horizon=7, window=7),
+        'top': top,
+        'top_7days': top_7days,
+    })
+
+
+@async_login_required()
+async def catalog_data(request):
+    products = _available_products(date.today()).order_by('name').only(
+        'id', 'name', 'price', 'stock', 'expiration_date', 'image', 'image_variants'
+    )
+    return JsonResponse({
+        'products': [
+            {
+                'id': p.id,
+                'name': p.name,
+                'price': f"{p.price:.2f}",
+                'stock': p.available,
+                'expiration_date': p.expiration_date.isoformat() if p.expiration_date else None,
+                'expiration_status': p.get_expiration_status(),
+                'thumb': p.image_thumb_url(),
+                'srcset_webp': p.image_srcset_webp(),
+                'srcset_jpeg': p.image_srcset_jpeg(),
+            }
+            async for p in products
+        ],
+    })
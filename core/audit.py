@@ -0,0 +1,154 @@
+"""
+Write-behind buffer for LoginHistory.
+
+The login/logout signals queue an event in memory instead of writing during
+the request. A background thread flushes the queue every
+LOGIN_AUDIT_FLUSH_SECONDS, or as soon as LOGIN_AUDIT_MAX_EVENTS are waiting:
+logins with one bulk_create, logouts by closing each user's latest open login
+with one bulk_update. Events a failed write (e.g. "database is locked") could
+not store go back to the front of the queue for the next flush, up to
+LOGIN_AUDIT_MAX_BUFFERED queued events. Whatever is still queued is flushed
+synchronously when the process exits. With LOGIN_AUDIT_FLUSH_SECONDS = 0 every event is written
+immediately (tests, serverless functions that may be frozen after a response).
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import LoginHistory
+
+logger = logging.getLogger(__name__)
+
+
+def close_logins(logouts):
+    """
+    Set logout_time on the latest open login before each (user_id, logout_time).
+
+    One query over the (user, logout_time, login_time) index and one bulk_update.
+    Logins older than a session can't belong to the session being closed, which
+    keeps the read bounded for users with many abandoned (never logged out) rows.
+    """
+    oldest = min(at for _, at in logouts) - timedelta(seconds=settings.SESSION_COOKIE_AGE)
+    open_logins = defaultdict(list)
+    rows = (LoginHistory.objects
+            .filter(user_id__in={user_id for user_id, _ in logouts}, logout_time__isnull=True, login_time__gte=oldest)
+            .order_by('-login_time')
+            .only('id', 'user_id', 'login_time', 'logout_time'))
+    for row in rows:
+        open_logins[row.user_id].append(row)
+
+    closed = []
+    for user_id, at in sorted(logouts, key=lambda event: event[1]):
+        row = next((r for r in open_logins[user_id] if r.logout_time is None and r.login_time <= at), None)
+        if row is not None:
+            row.logout_time = at
+            closed.append(row)
+    LoginHistory.objects.bulk_update(closed, ['logout_time'])
+    return closed
+
+
+class LoginAuditBuffer:
+    def __init__(self):
+        self._logins = []
+        self._logouts = []
+        self._lock = threading.Lock()
+        # One flush at a time, so a logout is never applied before the login it closes
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record_login(self, user_id, ip_address=None, user_agent='', at=None):
+        self._add(self._logins, LoginHistory(
+            user_id=user_id,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            login_time=at or timezone.now(),
+        ))
+
+    def record_logout(self, user_id, at=None):
+        self._add(self._logouts, (user_id, at or timezone.now()))
+
+    def pending(self):
+        with self._lock:
+            return len(self._logins) + len(self._logouts)
+
+    def _add(self, queue, event):
+        with self._lock:
+            queue.append(event)
+        if settings.LOGIN_AUDIT_FLUSH_SECONDS <= 0:
+            self.flush()
+            return
+        self._ensure_worker()
+        if self.pending() >= settings.LOGIN_AUDIT_MAX_EVENTS:
+            self._wakeup.set()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='login-audit', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.LOGIN_AUDIT_FLUSH_SECONDS)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Login audit flush failed')
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        """Write everything queued so far; returns (logins written, logouts applied)"""
+        with self._flush_lock:
+            with self._lock:
+                logins, self._logins = self._logins, []
+                logouts, self._logouts = self._logouts, []
+            written = False
+            try:
+                if logins:
+                    LoginHistory.objects.bulk_create(logins)
+                written = True
+                closed = close_logins(logouts) if logouts else []
+            except Exception:
+                self._requeue([] if written else logins, logouts)
+                raise
+            return len(logins), len(closed)
+
+    def _requeue(self, logins, logouts):
+        """Put events a failed flush didn't write back in front of newer ones, for the next flush to retry"""
+        with self._lock:
+            self._logins[:0] = logins
+            self._logouts[:0] = logouts
+            # Bound memory while the database stays unavailable; the oldest events go first
+            excess = len(self._logins) + len(self._logouts) - settings.LOGIN_AUDIT_MAX_BUFFERED
+            dropped_logins = min(max(excess, 0), len(self._logins))
+            dropped_logouts = max(excess - dropped_logins, 0)
+            del self._logins[:dropped_logins]
+            del self._logouts[:dropped_logouts]
+        logger.warning('Login audit flush failed; %d login and %d logout events queued for retry',
+                       len(logins), len(logouts))
+        if dropped_logins or dropped_logouts:
+            logger.error('Lost %d login and %d logout audit events over LOGIN_AUDIT_MAX_BUFFERED',
+                         dropped_logins, dropped_logouts)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_login_audit():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = LoginAuditBuffer()
+        return _buffer
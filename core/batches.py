@@ -0,0 +1,152 @@
+"""
+Production batches and first-expired-first-out (FEFO) allocation.
+
+Each bake is a ProductBatch with its own expiry. Product.stock stays the total
+of a product's batches and Product.expiration_date the expiry of the next batch
+to sell, so listings keep working, but what can be sold comes from unexpired
+batches only: yesterday's expired batch no longer blocks this morning's. Checkout
+takes units FEFO from the batches it locks in one query, and expire_batches
+writes expired batches off nightly as waste in the stock ledger.
+"""
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, ProductBatch, StockMovement
+from .stock import record
+
+# Earliest expiry first, batches that never expire last, then oldest bake
+FEFO_ORDER = (F('expires_at').asc(nulls_last=True), 'baked_at', 'id')
+
+
+def unexpired(today):
+    return Q(expires_at__isnull=True) | Q(expires_at__gte=today)
+
+
+def with_available(queryset, today=None, product='pk'):
+    """Annotates `available`: units in the unexpired batches of the product that `product` refers to"""
+    total = (ProductBatch.objects.filter(unexpired(today or date.today()), product=OuterRef(product), quantity__gt=0)
+             .values('product').annotate(total=Sum('quantity')).values('total'))
+    return queryset.annotate(available=Coalesce(Subquery(total), Value(0)))
+
+
+def sellable(queryset, today=None):
+    """Products from `queryset` that have unexpired stock, with `available` annotated"""
+    return with_available(queryset, today).filter(available__gt=0)
+
+
+def _is_live(batch, today):
+    return batch.quantity > 0 and (batch.expires_at is None or batch.expires_at >= today)
+
+
+def next_expiry(batches, today):
+    """The expiry shown on the product: the next unexpired batch's, else the latest expired one's"""
+    held = [b for b in batches if b.quantity]
+    live = [b.expires_at for b in held if _is_live(b, today)]
+    if live:
+        return min((d for d in live if d), default=None)
+    return max((b.expires_at for b in held if b.expires_at), default=None)
+
+
+def take(batches, qty):
+    """Take qty units from `batches` in their order; returns the batches that changed"""
+    changed = []
+    for batch in batches:
+        if not qty:
+            break
+        if not batch.quantity:
+            continue
+        used = min(batch.quantity, qty)
+        batch.quantity -= used
+        qty -= used
+        changed.append(batch)
+    return changed
+
+
+def lock_for_sale(product_ids, today):
+    """{product_id: [unexpired batches in FEFO order]} for checkout, locked in one query"""
+    lots = {pid: [] for pid in product_ids}
+    for batch in (ProductBatch.objects.select_for_update()
+                  .filter(unexpired(today), product_id__in=product_ids, quantity__gt=0)
+                  .order_by(*FEFO_ORDER)):
+        lots[batch.product_id].append(batch)
+    return lots
+
+
+def save_taken(batches):
+    ProductBatch.objects.bulk_update(batches, ['quantity'], batch_size=500)
+
+
+def opening_batches(products):
+    """One batch holding the stock of each newly created product, expiring on its expiration_date"""
+    ProductBatch.objects.bulk_create(
+        [ProductBatch(product=p, quantity=p.stock, expires_at=p.expiration_date) for p in products if p.stock > 0],
+        batch_size=500,
+    )
+
+
+def apply_edit(product, previous_expiry, today=None):
+    """
+    Bring an edited product's batches in line with its new stock and expiration date.
+
+    Added units become a new batch expiring on product.expiration_date; removed
+    units come out FEFO. A changed date without a restock re-dates the unexpired
+    batches, as editing the single product date did before batches. Sets
+    product.expiration_date to the next expiry; the caller saves the product.
+    """
+    today = today or date.today()
+    batches = list(ProductBatch.objects.select_for_update()
+                   .filter(product=product, quantity__gt=0).order_by(*FEFO_ORDER))
+    delta = product.stock - sum(b.quantity for b in batches)
+    changed = []
+    if delta > 0:
+        batches.append(ProductBatch.objects.create(product=product, quantity=delta, expires_at=product.expiration_date))
+    elif delta < 0:
+        changed = take(batches, -delta)
+    elif product.expiration_date != previous_expiry:
+        changed = [b for b in batches if _is_live(b, today)]
+        for batch in changed:
+            batch.expires_at = product.expiration_date
+    ProductBatch.objects.bulk_update(changed, ['quantity', 'expires_at'])
+    product.expiration_date = next_expiry(batches, today)
+
+
+def write_off_expired(today=None):
+    """
+    Take every batch that expired before `today` out of stock as waste and
+    delete the empty batches; returns (batches written off, units).
+    A fixed handful of queries however many batches expired.
+    """
+    today = today or date.today()
+    with transaction.atomic():
+        product_ids = set(ProductBatch.objects.filter(expires_at__lt=today, quantity__gt=0)
+                          .values_list('product_id', flat=True))
+        # Products before batches, the same lock order as checkout and product_edit
+        products = Product.objects.select_for_update().in_bulk(product_ids)
+        expired = list(ProductBatch.objects.select_for_update()
+                       .filter(product_id__in=product_ids, expires_at__lt=today, quantity__gt=0))
+        now = timezone.now()
+        wasted = defaultdict(int)
+        for batch in expired:
+            wasted[batch.product_id] += batch.quantity
+        ProductBatch.objects.filter(Q(pk__in=[b.pk for b in expired]) | Q(quantity=0)).delete()
+
+        remaining = defaultdict(list)
+        for batch in ProductBatch.objects.filter(product_id__in=product_ids, quantity__gt=0):
+            remaining[batch.product_id].append(batch)
+        for pid, units in wasted.items():
+            product = products[pid]
+            product.stock = max(0, product.stock - units)
+            product.expiration_date = next_expiry(remaining[pid], today)
+            product.updated_at = now
+        Product.objects.bulk_update([products[pid] for pid in wasted], ['stock', 'expiration_date', 'updated_at'])
+        record([
+            StockMovement(product_id=b.product_id, kind=StockMovement.WASTE, quantity=-b.quantity, created_at=now,
+                          note=f'Batch baked {timezone.localtime(b.baked_at):%Y-%m-%d} expired {b.expires_at}')
+            for b in expired
+        ])
+    return len(expired), sum(wasted.values())
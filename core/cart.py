@@ -0,0 +1,60 @@
+"""
+Cashier carts stored as narrow CartLine rows (user, product, qty).
+
+The cart used to be a dict of names, prices and quantities in the session, so
+every click rewrote the whole session row. A click now touches one small row,
+and names and prices are always read from the catalog.
+
+Lines are keyed by user, not by session: a cashier logged in at two terminals
+sees and checks out one shared cart, and a cart survives logging out and back
+in. Give each till its own cashier account to keep their carts apart.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import CartLine
+
+
+def lines(user):
+    """Cart lines with their products, in the order they were added"""
+    return list(CartLine.objects.filter(user=user).select_related('product').order_by('id'))
+
+
+def quantities(user):
+    """{product_id: qty} for the user's cart"""
+    return dict(CartLine.objects.filter(user=user).values_list('product_id', 'qty'))
+
+
+def get_qty(user, product_id):
+    return CartLine.objects.filter(user=user, product_id=product_id).values_list('qty', flat=True).first() or 0
+
+
+def _upsert(user, product_id, qty, increment):
+    existing = CartLine.objects.filter(user=user, product_id=product_id)
+    if existing.update(qty=F('qty') + qty if increment else qty):
+        return
+    try:
+        with transaction.atomic():
+            CartLine.objects.create(user=user, product_id=product_id, qty=qty)
+    except IntegrityError:
+        # Another request (double click) created the line first
+        existing.update(qty=F('qty') + qty if increment else qty)
+
+
+def add(user, product_id, qty):
+    _upsert(user, product_id, qty, increment=True)
+
+
+def set_qty(user, product_id, qty):
+    if qty <= 0:
+        remove(user, product_id)
+    else:
+        _upsert(user, product_id, qty, increment=False)
+
+
+def remove(user, product_id):
+    CartLine.objects.filter(user=user, product_id=product_id).delete()
+
+
+def clear(user):
+    CartLine.objects.filter(user=user).delete()
@@ -0,0 +1,162 @@
+"""
+Response compression for HTML, JSON, CSV and other text responses.
+
+gzip is always available; brotli is used when the optional Brotli package is
+installed and the client accepts it. Streaming responses (sync or async) are
+compressed chunk by chunk without buffering them. Images, fonts, archives and
+anything WhiteNoise already served precompressed are left alone, as are bodies
+under COMPRESSION_MIN_BYTES.
+
+BREACH: pages that carry a secret next to reflected input are HTML (CSRF
+tokens, search boxes). Django already masks the CSRF token per response; on top
+of that HTML is only ever gzipped with Django's "Heal The Breach" random-length
+gzip header (the same as GZipMiddleware), since brotli has no equivalent
+padding. JSON and CSV may use brotli.
+"""
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:  # optional, see requirements.txt
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml',
+    'application/manifest+json', 'image/svg+xml',
+)
+# Each chunk must reach the client as soon as it is written
+UNBUFFERED_TYPES = ('text/event-stream',)
+HTB_MAX_RANDOM_BYTES = 100
+
+_ENCODING = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?', re.IGNORECASE)
+
+
+def accepted_encodings(header):
+    """Content codings from an Accept-Encoding header, minus any the client refused with q=0"""
+    accepted = set()
+    for part in header.split(','):
+        match = _ENCODING.match(part)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2) or 1)
+        except ValueError:
+            continue
+        if quality > 0:
+            accepted.add(match.group(1).lower())
+    return accepted
+
+
+def _media_type(response):
+    return response.get('Content-Type', '').split(';')[0].strip().lower()
+
+
+def is_compressible(response):
+    media_type = _media_type(response)
+    return media_type.startswith(COMPRESSIBLE_TYPES) and media_type not in UNBUFFERED_TYPES
+
+
+def choose_encoding(response, accepted):
+    """'br', 'gzip' or None for this response and the client's accepted codings"""
+    if brotli is not None and 'br' in accepted and _media_type(response) != 'text/html':
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def brotli_compress(data):
+    return brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+
+def _brotli_sequence(chunks):
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _abrotli_sequence(chunks):
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    async for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _agzip_sequence(chunks):
+    # One gzip member per chunk, as GZipMiddleware does for async responses
+    async for chunk in chunks:
+        yield compress_string(chunk, max_random_bytes=HTB_MAX_RANDOM_BYTES)
+
+
+def compress_response(response, encoding):
+    """Compress `response` in place with `encoding`; False if it was not worth it"""
+    if response.streaming:
+        if response.is_async:
+            wrap = _abrotli_sequence if encoding == 'br' else _agzip_sequence
+            response.streaming_content = wrap(response.streaming_content)
+        elif encoding == 'br':
+            response.streaming_content = _brotli_sequence(response.streaming_content)
+        else:
+            response.streaming_content = compress_sequence(
+                response.streaming_content, max_random_bytes=HTB_MAX_RANDOM_BYTES)
+        # The compressed size is only known once the stream is done
+        del response.headers['Content-Length']
+    else:
+        if encoding == 'br':
+            compressed = brotli_compress(response.content)
+        else:
+            compressed = compress_string(response.content, max_random_bytes=HTB_MAX_RANDOM_BYTES)
+        if len(compressed) >= len(response.content):
+            return False
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+
+    # A strong ETag would now name different bytes; a weak one still matches If-None-Match
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response.headers['ETag'] = 'W/' + etag
+    response.headers['Content-Encoding'] = encoding
+    return True
+
+
+class CompressionMiddleware:
+    """Compresses text responses with brotli or gzip, following the client's Accept-Encoding"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_bytes = settings.COMPRESSION_MIN_BYTES
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if (response.has_header('Content-Encoding') or response.status_code == 206
+                or not is_compressible(response)):
+            return response
+        if not response.streaming and len(response.content) < self.min_bytes:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(response, accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        if encoding:
+            compress_response(response, encoding)
+        return response
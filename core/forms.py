@@ -1,8 +1,12 @@
 # core/forms.py
+import logging
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from .models import Product
+from .models import Product, StockMovement
+from .images import build_derivatives, variants_by_hash
+
+logger = logging.getLogger(__name__)
 
 class ProductForm(forms.ModelForm):
     image_upload = forms.ImageField(
@@ -14,6 +18,14 @@ class ProductForm(forms.ModelForm):
         })
     )
     
+    # Why stock changed, for the stock ledger (core.stock); blank picks restock or adjustment from the sign
+    stock_reason = forms.ChoiceField(
+        required=False,
+        choices=[('', 'Restock / count correction'), (StockMovement.RESTOCK, 'Restock'),
+                 (StockMovement.ADJUSTMENT, 'Count correction'), (StockMovement.WASTE, 'Waste / spoiled')],
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+
     class Meta:
         model = Product
         fields = ['image', 'name', 'price', 'stock', 'ingredients', 'is_active', 'expiration_date']
@@ -30,6 +42,35 @@ class ProductForm(forms.ModelForm):
             }),
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        reason, new_stock = cleaned_data.get('stock_reason'), cleaned_data.get('stock')
+        if reason and new_stock is not None:
+            delta = new_stock - (self.instance.stock if self.instance.pk else 0)
+            if reason == StockMovement.RESTOCK and delta < 0:
+                self.add_error('stock_reason', 'A restock can only increase stock.')
+            elif reason == StockMovement.WASTE and delta > 0:
+                self.add_error('stock_reason', 'Waste can only decrease stock.')
+        return cleaned_data
+
+    def save(self, commit=True):
+        product = super().save(commit=False)
+        upload = self.cleaned_data.get('image_upload')
+        if upload:
+            # Build thumbnails from the uploaded original while we still have it locally
+            try:
+                product.image_variants = build_derivatives(upload, source=product.image or '',
+                                                           known=variants_by_hash([product.image_variants]))
+            except Exception as e:
+                logger.warning('Could not build image derivatives for %s: %s', product.name, e)
+                product.image_variants = {}
+        elif 'image' in self.changed_data:
+            # Image replaced without an upload; build_image_derivatives will backfill it
+            product.image_variants = {}
+        if commit:
+            product.save()
+        return product
+
 
 class CashierForm(UserCreationForm):
     """Form for creating new cashier accounts"""
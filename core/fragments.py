@@ -0,0 +1,54 @@
+"""
+Versions for the cached template fragments ({% cache %} in pos.html,
+reports.html and forecast.html).
+
+Fragments are keyed on a catalog or sales version instead of being deleted:
+bumping a version makes every fragment built from older data unreachable,
+and those age out after FRAGMENT_CACHE_SECONDS. Product saves/deletes and new
+sales bump the versions through core.signals; code that bypasses model
+signals (bulk_update in checkout, seed_demo, archive_sales) calls the bump
+functions itself.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+CATALOG = 'catalog'
+SALES = 'sales'
+
+
+def _key(name):
+    return f'fragments:{name}:version'
+
+
+def get_version(name):
+    version = cache.get(_key(name))
+    if version is None:
+        # Start from the clock so a fresh cache never hands out a version that was used before
+        cache.add(_key(name), time.time_ns(), None)
+        version = cache.get(_key(name))
+    return version
+
+
+def bump(name):
+    try:
+        cache.incr(_key(name))
+    except ValueError:
+        cache.set(_key(name), time.time_ns(), None)
+
+
+def bump_catalog():
+    bump(CATALOG)
+
+
+def bump_sales():
+    bump(SALES)
+
+
+def context(*names):
+    """Template context for {% cache fragment_ttl ... <name>_version %}"""
+    ctx = {'fragment_ttl': settings.FRAGMENT_CACHE_SECONDS}
+    for name in names:
+        ctx[f'{name}_version'] = get_version(name)
+    return ctx
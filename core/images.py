@@ -0,0 +1,163 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .storage import get_derivative_storage
+
+# name -> (width, height, crop). Thumbnails are cropped to fill the POS grid tile,
+# medium renditions keep their aspect ratio.
+RENDITIONS = {
+    'thumb': (240, 180, True),
+    'medium': (640, 480, False),
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DERIVATIVES_DIR = 'products/derivatives'
+
+
+def read_image_source(image):
+    """Return the raw bytes behind a Product.image value (storage path, /media/, /static/ or URL)"""
+    if image.startswith(('http://', 'https://')):
+        import requests
+        response = requests.get(image, timeout=15)
+        response.raise_for_status()
+        return response.content
+
+    static_prefix = '/' + settings.STATIC_URL.lstrip('/')
+    if image.startswith(static_prefix):
+        path = finders.find(image[len(static_prefix):])
+        if not path:
+            raise FileNotFoundError(image)
+        with open(path, 'rb') as f:
+            return f.read()
+
+    name = image
+    media_prefix = '/' + settings.MEDIA_URL.lstrip('/')
+    if name.startswith(media_prefix):
+        name = name[len(media_prefix):]
+    with default_storage.open(name.lstrip('/'), 'rb') as f:
+        return f.read()
+
+
+def _render(img, width, height, crop):
+    from PIL import Image, ImageOps
+
+    if crop:
+        return ImageOps.fit(img, (width, height), Image.LANCZOS)
+    out = img.copy()
+    out.thumbnail((width, height), Image.LANCZOS)
+    return out
+
+
+def variants_by_hash(variant_dicts):
+    """{original's sha256: image_variants} for reuse by build_derivatives"""
+    return {v['hash']: v for v in variant_dicts if v and v.get('hash') and v.get('files')}
+
+
+def build_derivatives(data, source='', known=None):
+    """
+    Create the thumbnail/medium WebP and JPEG renditions for one image.
+
+    `data` is the original image as bytes or a file object. Renditions go to the
+    content-addressed media store when it is enabled (deduplicated by their own
+    bytes), otherwise to default_storage under a name derived from the SHA-256
+    of the original. If `known` (see variants_by_hash) already has renditions of
+    the same bytes whose files still exist, they are reused without rendering.
+    Returns the dict stored in Product.image_variants.
+    """
+    # Pillow is imported lazily to keep it off the startup path
+    from PIL import Image, ImageOps
+
+    if hasattr(data, 'read'):
+        if hasattr(data, 'seek'):
+            data.seek(0)
+        data = data.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    storage = get_derivative_storage()
+    previous = (known or {}).get(digest)
+    if previous and all(storage.exists(path) for path in previous['files']):
+        return {**previous, 'source': source}
+
+    img = Image.open(BytesIO(data))
+    img = ImageOps.exif_transpose(img).convert('RGB')
+
+    variants = {'hash': digest, 'source': source, 'files': []}
+    for name, (width, height, crop) in RENDITIONS.items():
+        rendition = None
+        entry = {}
+        for ext, (pil_format, save_options) in FORMATS.items():
+            path = f'{DERIVATIVES_DIR}/{digest[:2]}/{digest[:16]}-{name}.{ext}'
+            # The content-addressed store names files after the rendition's bytes, so
+            # only plain storage can be checked by this name before rendering
+            if settings.MEDIA_CAS_ENABLED or not storage.exists(path):
+                if rendition is None:
+                    rendition = _render(img, width, height, crop)
+                buf = BytesIO()
+                rendition.save(buf, pil_format, **save_options)
+                path = storage.save(path, ContentFile(buf.getvalue()))
+            variants['files'].append(path)
+            entry[ext] = storage.url(path)
+        if crop:
+            entry['width'] = width
+        else:
+            entry['width'] = round(img.width * min(width / img.width, height / img.height, 1))
+        variants[name] = entry
+    return variants
+
+
+def optimize_image(data, max_size=1600):
+    """
+    Re-encode an image in its own format, downscaled to fit `max_size` and without metadata.
+
+    Returns (bytes, (width, height)); JPEGs use the progressive FORMATS['jpeg'] settings
+    and PNGs keep their alpha channel. Callers should keep the original if it was smaller.
+    """
+    from PIL import Image, ImageOps
+
+    img = Image.open(BytesIO(data))
+    pil_format = img.format
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((max_size, max_size), Image.LANCZOS)
+    buf = BytesIO()
+    if pil_format == 'JPEG':
+        img.convert('RGB').save(buf, 'JPEG', **FORMATS['jpeg'][1])
+    elif pil_format == 'PNG':
+        img.save(buf, 'PNG', optimize=True)
+    else:
+        raise ValueError(f'Unsupported image format: {pil_format}')
+    return buf.getvalue(), img.size
+
+
+def webp_version(data):
+    """WebP copy of an image at its current size, for <picture> sources"""
+    from PIL import Image
+
+    img = Image.open(BytesIO(data))
+    buf = BytesIO()
+    img.save(buf, 'WEBP', **FORMATS['webp'][1])
+    return buf.getvalue()
+
+
+def build_derivatives_for_image(image, known=None):
+    """Process-pool entry point: build derivatives for a Product.image value"""
+    try:
+        return image, build_derivatives(read_image_source(image), source=image, known=known), None
+    except Exception as e:
+        return image, None, str(e)
+
+
+def init_worker():
+    """Make sure Django is configured in pool workers started with 'spawn'"""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alvarez_bakery.settings')
+        django.setup()
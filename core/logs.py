@@ -0,0 +1,192 @@
+"""
+Structured, non-blocking logging.
+
+Request threads only put records on an in-memory queue (QueueLogHandler); a
+QueueListener thread formats them as JSON lines and does the actual stream
+I/O, so a slow stdout never holds up a request. Where the process may be
+frozen between requests (serverless), LOG_QUEUE=False switches to
+StreamLogHandler, which writes on the request thread. Every record carries the
+request's correlation id (RequestIdMiddleware, X-Request-ID), and debug/info
+records from chatty loggers can be sampled per request with LOG_SAMPLE_RATES.
+"""
+import json
+import logging
+import queue
+import re
+import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+request_id = ContextVar('core_request_id', default='-')
+
+# Attributes every LogRecord has, plus django.request's request object; anything else came from `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id', 'request'}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps the current request id on the record while still on the request thread"""
+
+    def filter(self, record):
+        record.request_id = request_id.get()
+        if record.request_id == '-':
+            # django.request logs 4xx/5xx after the middleware has returned, but passes the request
+            record.request_id = getattr(getattr(record, 'request', None), 'request_id', '-')
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a share of DEBUG/INFO records from the loggers in `rates`.
+
+    The decision is a hash of the request id, so a sampled request keeps all of
+    its lines and an unsampled one drops all of them. Warnings and errors always pass.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1:
+            return True
+        key = getattr(record, 'request_id', '-')
+        if key == '-':
+            key = uuid.uuid4().hex
+        return zlib.crc32(key.encode()) % 10000 < rate * 10000
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+        }
+        entry.update((k, v) for k, v in vars(record).items() if k not in _RECORD_ATTRS)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def _formatter(fmt):
+    if fmt == 'json':
+        return JsonFormatter()
+    return logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+
+class StreamLogHandler(logging.StreamHandler):
+    """Writes records to `stream` on the calling thread, so nothing is left queued when the request ends"""
+
+    def __init__(self, stream=None, fmt='json'):
+        super().__init__(stream or sys.stderr)
+        self.setFormatter(_formatter(fmt))
+        self.addFilter(RequestIdFilter())
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room instead of failing when the queue is full at shutdown
+        self.queue.put(self._sentinel)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Puts records on a bounded queue drained by its own QueueListener thread.
+
+    The listener writes to `stream` with JsonFormatter (or a plain text format).
+    close(), which logging calls at interpreter exit, drains the queue and stops it.
+    """
+
+    def __init__(self, stream=None, fmt='json', maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        target = logging.StreamHandler(stream or sys.stderr)
+        target.setFormatter(_formatter(fmt))
+        self.addFilter(RequestIdFilter())
+        self.dropped = 0
+        self.listener = _Listener(self.queue, target, respect_handler_level=True)
+        self.listener.start()
+
+    def close(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+        super().close()
+
+    def prepare(self, record):
+        # Resolve the message and traceback here, but leave formatting to the listener thread
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging; count what was lost instead
+            self.dropped += 1
+
+
+def new_request_id(header_value=None):
+    """The caller's X-Request-ID if it is safe to echo back, else a fresh one"""
+    if header_value and _VALID_REQUEST_ID.match(header_value):
+        return header_value
+    return uuid.uuid4().hex
+
+
+class RequestIdMiddleware:
+    """Gives each request a correlation id for its log lines and echoes it as X-Request-ID"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id.reset(token)
+        response[REQUEST_ID_HEADER] = request.request_id
+        return response
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_id.reset(token)
+        response[REQUEST_ID_HEADER] = request.request_id
+        return response
+
+    def _start(self, request):
+        request.request_id = new_request_id(request.headers.get(REQUEST_ID_HEADER))
+        return request_id.set(request.request_id)
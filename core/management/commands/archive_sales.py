@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.archive import archive_sales_before
+
+
+class Command(BaseCommand):
+    help = 'Move old sales into archive tables and daily summaries to keep the hot sales tables small'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365,
+                            help='Archive sales older than this many days (default: 365)')
+        parser.add_argument('--before', type=str,
+                            help='Archive sales before this date (YYYY-MM-DD); overrides --days')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of sales moved per transaction (default: 1000)')
+        parser.add_argument('--export', type=str,
+                            help='Also append archived sales to this gzip JSON-lines file')
+        parser.add_argument('--export-only', action='store_true',
+                            help='Only write the compressed export (no archive tables); requires --export')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                cutoff = date.fromisoformat(options['before'])
+            except ValueError:
+                raise CommandError(f'Invalid --before date: {options["before"]}')
+        else:
+            # The shop's date, so sales are cut at local midnight as the summaries are
+            cutoff = timezone.localdate() - timedelta(days=options['days'])
+
+        if options['export_only'] and not options['export']:
+            raise CommandError('--export-only requires --export PATH')
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive')
+
+        self.stdout.write(f'Archiving sales before {cutoff}...')
+        sales, items = archive_sales_before(
+            cutoff,
+            batch_size=options['batch_size'],
+            export_path=options['export'],
+            keep_archive_rows=not options['export_only'],
+        )
+
+        if sales == 0:
+            self.stdout.write(self.style.WARNING('No sales older than the cutoff'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'✅ Archived {sales} sales ({items} items)'))
+        if options['export']:
+            self.stdout.write(f'📁 Export: {options["export"]}')
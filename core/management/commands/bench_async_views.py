@@ -0,0 +1,100 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+
+ENDPOINTS = ['api_dashboard', 'api_reports', 'api_forecast', 'api_catalog']
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': latencies[len(latencies) // 2],
+        'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'mean': statistics.mean(latencies),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare the async JSON endpoints through the WSGI handler (thread pool) and the ASGI handler (one event loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', type=str,
+                            help='Staff user to authenticate as (default: first staff user)')
+        parser.add_argument('--concurrency', type=int, default=20,
+                            help='Requests in flight at once (default: 20)')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Total requests per endpoint and handler (default: 200)')
+
+    def _run_wsgi(self, user, url, total, concurrency):
+        # One client per worker thread, like a pool of sync workers
+        clients = []
+        for _ in range(concurrency):
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+
+        def fetch(i):
+            started = time.perf_counter()
+            response = clients[i % concurrency].get(url, secure=settings.SECURE_SSL_REDIRECT)
+            if response.status_code != 200:
+                raise CommandError(f'WSGI {url} returned {response.status_code}')
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(fetch, range(total)))
+        return summarize(latencies, time.perf_counter() - started)
+
+    async def _run_asgi(self, cookies, url, total, concurrency):
+        client = AsyncClient()
+        client.cookies = cookies
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url, secure=settings.SECURE_SSL_REDIRECT)
+                if response.status_code != 200:
+                    raise CommandError(f'ASGI {url} returned {response.status_code}')
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(fetch() for _ in range(total)))
+        return summarize(latencies, time.perf_counter() - started)
+
+    def handle(self, *args, **options):
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+        else:
+            user = User.objects.filter(is_staff=True, is_active=True).order_by('id').first()
+        if not user or not user.is_staff:
+            raise CommandError('A staff user is required; pass --username or create an admin first')
+
+        setup_test_environment()
+        # Log in once in sync code; the session cookie is reused by the async client
+        login_client = Client()
+        login_client.force_login(user)
+
+        self.stdout.write(f'Concurrency {options["concurrency"]}, {options["requests"]} requests per endpoint')
+        self.stdout.write(f'{"endpoint":<16}{"handler":<8}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"mean ms":>9}')
+        for name in ENDPOINTS:
+            url = reverse(name)
+            results = [
+                ('wsgi', self._run_wsgi(user, url, options['requests'], options['concurrency'])),
+                ('asgi', asyncio.run(self._run_asgi(login_client.cookies, url, options['requests'], options['concurrency']))),
+            ]
+            for handler, r in results:
+                self.stdout.write(
+                    f'{name:<16}{handler:<8}{r["rps"]:>9.1f}{r["p50"] * 1000:>9.1f}'
+                    f'{r["p95"] * 1000:>9.1f}{r["mean"] * 1000:>9.1f}'
+                )
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark complete'))
@@ -0,0 +1,85 @@
+import statistics
+import time
+from datetime import date, timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Min
+from django.test import Client
+from django.urls import reverse
+
+from core import compression
+from core.audit import get_login_audit
+from core.models import SalesTransaction
+
+
+class Command(BaseCommand):
+    help = 'Report the bytes saved by response compression (gzip and brotli) for the main views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10,
+                            help='Requests per view and encoding, for the timing column (default: 10)')
+
+    def _fetch(self, client, url, accept, iterations):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            response = client.get(url, secure=settings.SECURE_SSL_REDIRECT, HTTP_ACCEPT_ENCODING=accept)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url} returned {response.status_code}')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return body, response.get('Content-Encoding', 'identity'), statistics.median(timings)
+
+    def handle(self, *args, **options):
+        from django.test.utils import setup_test_environment
+        try:
+            # Allows the test client's 'testserver' host
+            setup_test_environment()
+        except RuntimeError:
+            pass
+
+        today = date.today()
+        # The whole sales history, so the report table and CSV are as long as the data allows
+        first = SalesTransaction.objects.aggregate(first=Min('created_at'))['first']
+        history = f"?start={first.date() if first else today - timedelta(days=30)}&end={today}"
+        views = [
+            ('home', reverse('home')),
+            ('pos', reverse('pos')),
+            ('product_list', reverse('product_list')),
+            ('forecast', reverse('forecast')),
+            ('reports', reverse('reports') + history),
+            ('reports_export_csv', reverse('reports_export_csv') + history),
+            ('metrics', reverse('metrics')),
+        ]
+        encodings = [('gzip', 'gzip')] + ([('br', 'br, gzip')] if compression.brotli else [])
+        if not compression.brotli:
+            self.stdout.write(self.style.WARNING('⚠️ Brotli is not installed; measuring gzip only'))
+
+        with transaction.atomic():
+            admin = User.objects.create_user('bench-compression', password='x', is_staff=True)
+            client = Client()
+            client.force_login(admin)
+            header = f"{'view':<20} {'raw KB':>8}" + ''.join(f" {name + ' KB':>9} {'saved':>6} {'ms':>6}" for name, _ in encodings)
+            self.stdout.write('🗜️  ' + header)
+            raw_total, saved_total = 0, {name: 0 for name, _ in encodings}
+            for label, url in views:
+                raw, _, raw_ms = self._fetch(client, url, 'identity', options['iterations'])
+                raw_total += len(raw)
+                line = f'{label:<20} {len(raw) / 1024:>8.1f}'
+                for name, accept in encodings:
+                    body, used, ms = self._fetch(client, url, accept, options['iterations'])
+                    saved_total[name] += len(raw) - len(body)
+                    line += f' {len(body) / 1024:>9.1f} {(1 - len(body) / len(raw)) * 100:>5.0f}% {ms - raw_ms:>+6.1f}'
+                    if used != name:
+                        line += f' ({used})'
+                self.stdout.write('    ' + line)
+            get_login_audit().flush()  # write force_login's history row before it is rolled back
+            transaction.set_rollback(True)
+
+        self.stdout.write('    ms: added latency vs the uncompressed response; HTML is gzipped even when br is accepted (BREACH)')
+        for name, _ in encodings:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {name}: {saved_total[name] / 1024:.0f} KB saved of {raw_total / 1024:.0f} KB '
+                f'({saved_total[name] / raw_total * 100:.0f}%) across {len(views)} views'))
@@ -0,0 +1,95 @@
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import fragments
+from core.audit import get_login_audit
+from core.batches import opening_batches, sellable
+from core.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Compare POS, report and forecast render times with cold and warm template fragment caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=500,
+                            help='Extra products added to the catalog for the run, rolled back afterwards (default: 500)')
+        parser.add_argument('--iterations', type=int, default=30,
+                            help='Requests per page and cache state (default: 30)')
+
+    def _add_products(self, count):
+        today = date.today()
+        variants = {
+            'thumb': {'jpeg': '/media/thumb.jpg', 'webp': '/media/thumb.webp', 'width': 240},
+            'medium': {'jpeg': '/media/medium.jpg', 'webp': '/media/medium.webp', 'width': 640},
+        }
+        opening_batches(Product.objects.bulk_create([
+            Product(
+                name=f'Bench Bread {i:04d}', price=Decimal('10.00') + i % 90, stock=100,
+                image_variants=variants if i % 2 else {},
+                image='' if i % 2 else '/static/images/pandesal.jpg',
+                expiration_date=today + timedelta(days=i % 7 + 1) if i % 3 else None,
+            )
+            for i in range(count)
+        ]))
+
+    def _measure(self, client, url, iterations, bump):
+        timings, queries = [], []
+        client.get(url)  # fill the cache / warm up
+        for _ in range(iterations):
+            if bump:
+                bump()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = client.get(url, secure=settings.SECURE_SSL_REDIRECT)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f'{url} returned {response.status_code}')
+            queries.append(len(ctx.captured_queries))
+        return statistics.median(timings), statistics.mean(timings), max(queries), len(response.content)
+
+    def handle(self, *args, **options):
+        from django.test.utils import setup_test_environment
+        try:
+            # Allows the test client's 'testserver' host
+            setup_test_environment()
+        except RuntimeError:
+            pass
+
+        today = date.today()
+        pages = [
+            ('POS grid', reverse('pos'), fragments.bump_catalog),
+            ('Reports (60 days)', f"{reverse('reports')}?start={today - timedelta(days=60)}&end={today}", fragments.bump_sales),
+            ('Forecast', reverse('forecast'), fragments.bump_sales),
+        ]
+        with transaction.atomic():
+            self._add_products(options['products'])
+            admin = User.objects.create_user('bench-fragments', password='x', is_staff=True)
+            client = Client()
+            client.force_login(admin)
+            catalog = sellable(Product.objects.filter(is_archived=False)).count()
+            self.stdout.write(f"🧁 {catalog} products on the POS grid, {options['iterations']} requests per row")
+            self.stdout.write(f"{'page':<20} {'cache':<6} {'p50 ms':>8} {'mean ms':>8} {'queries':>8} {'KB':>6}")
+
+            results = {}
+            for label, url, bump in pages:
+                for state, bump_each in (('cold', bump), ('warm', None)):
+                    p50, mean, queries, size = results[label, state] = self._measure(
+                        client, url, options['iterations'], bump_each)
+                    self.stdout.write(f'{label:<20} {state:<6} {p50:>8.1f} {mean:>8.1f} {queries:>8} {size / 1024:>6.0f}')
+            get_login_audit().flush()  # write force_login's history row before it is rolled back
+            transaction.set_rollback(True)
+
+        for label, _, _ in pages:
+            cold, warm = results[label, 'cold'][0], results[label, 'warm'][0]
+            style = self.style.SUCCESS if warm < cold else self.style.WARNING
+            self.stdout.write(style(f'{label}: {cold:.1f} ms → {warm:.1f} ms with a warm cache ({cold / warm:.1f}x)'))
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark products rolled back.'))
@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+import uuid
+from django.core.management.base import BaseCommand
+
+from core.logs import JsonFormatter, QueueLogHandler, RequestIdFilter, SamplingFilter, request_id
+
+
+class SlowStream:
+    """A stdout that takes `delay` seconds per write, like a busy log pipe or container runtime"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+    def flush(self):
+        pass
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+class Command(BaseCommand):
+    help = 'Measure the request-thread cost of logging: direct StreamHandler vs the queued JSON pipeline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Concurrent request threads (default: 8)')
+        parser.add_argument('--requests', type=int, default=250,
+                            help='Simulated requests per thread (default: 250)')
+        parser.add_argument('--lines', type=int, default=8,
+                            help='Log calls per request, like cart clicks in a checkout (default: 8)')
+        parser.add_argument('--sink-delay-us', type=int, default=50,
+                            help='Microseconds each write to the output stream takes (default: 50)')
+        parser.add_argument('--sample-rate', type=float, default=0.1,
+                            help='Share of requests kept by the sampled scenario (default: 0.1)')
+        parser.add_argument('--queue-size', type=int, default=100000,
+                            help='Queue bound for the queued scenarios (default: 100000)')
+
+    def _direct(self, stream, options):
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        handler.addFilter(RequestIdFilter())
+        return handler
+
+    def _queued(self, stream, options):
+        return QueueLogHandler(stream, maxsize=options['queue_size'])
+
+    def _sampled(self, stream, options):
+        handler = QueueLogHandler(stream, maxsize=options['queue_size'])
+        handler.addFilter(SamplingFilter({'bench': options['sample_rate']}))
+        return handler
+
+    def _run(self, make_handler, options):
+        stream = SlowStream(options['sink_delay_us'] / 1e6)
+        handler = make_handler(stream, options)
+        logger = logging.getLogger('bench.logging')
+        logger.handlers = [handler]
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        latencies = [[] for _ in range(options['threads'])]
+
+        def worker(n):
+            for _ in range(options['requests']):
+                token = request_id.set(uuid.uuid4().hex)
+                for line in range(options['lines']):
+                    started = time.perf_counter()
+                    logger.debug('Updated cart quantity', extra={'product_id': line, 'qty': 2, 'previous_qty': 1})
+                    latencies[n].append(time.perf_counter() - started)
+                request_id.reset(token)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['threads'])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        handler.close()  # drains the queue for the queued handlers
+        drained = time.perf_counter() - started
+        logger.handlers = []
+
+        calls = sorted(x for per_thread in latencies for x in per_thread)
+        return {
+            'calls': len(calls),
+            'written': stream.writes,
+            'dropped': getattr(handler, 'dropped', 0),
+            'p50_us': percentile(calls, 0.50) * 1e6,
+            'p99_us': percentile(calls, 0.99) * 1e6,
+            'mean_us': sum(calls) / len(calls) * 1e6,
+            'elapsed': elapsed,
+            'drained': drained,
+        }
+
+    def handle(self, *args, **options):
+        scenarios = [
+            ('direct StreamHandler', self._direct),
+            ('queued JSON', self._queued),
+            (f"queued JSON, sampled {options['sample_rate']:.0%}", self._sampled),
+        ]
+        self.stdout.write(
+            f"🪵 {options['threads']} threads x {options['requests']} requests x {options['lines']} log calls, "
+            f"{options['sink_delay_us']} µs per write"
+        )
+        self.stdout.write(f"{'scenario':<28} {'p50 µs':>8} {'p99 µs':>9} {'mean µs':>8} "
+                          f"{'callers s':>10} {'drained s':>10} {'written':>8} {'dropped':>8}")
+        results = {}
+        for label, make_handler in scenarios:
+            r = results[label] = self._run(make_handler, options)
+            self.stdout.write(f"{label:<28} {r['p50_us']:>8.1f} {r['p99_us']:>9.1f} {r['mean_us']:>8.1f} "
+                              f"{r['elapsed']:>10.2f} {r['drained']:>10.2f} {r['written']:>8} {r['dropped']:>8}")
+
+        direct, queued = results['direct StreamHandler'], results['queued JSON']
+        if queued['dropped']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ The queue overflowed and dropped {queued['dropped']} records; raise --queue-size"))
+        if queued['mean_us'] < direct['mean_us']:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Queued logging costs request threads {queued['mean_us']:.1f} µs per call "
+                f"vs {direct['mean_us']:.1f} µs writing directly ({direct['mean_us'] / queued['mean_us']:.1f}x less)"))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ Queued logging was not cheaper here ({queued['mean_us']:.1f} µs vs {direct['mean_us']:.1f} µs per call)"))
@@ -0,0 +1,74 @@
+import json
+import tempfile
+from pathlib import Path
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import setup_test_environment
+from core.sqlite import get_pragma, set_transaction_mode
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent checkout throughput on SQLite with the default settings and SQLITE_PERFORMANCE_MODE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cashiers', type=int, default=8,
+                            help='Concurrent cashiers (default: 8)')
+        parser.add_argument('--iterations', type=int, default=25,
+                            help='Checkouts attempted per cashier (default: 25)')
+        parser.add_argument('--products', type=int, default=10,
+                            help='Product pool size (default: 10)')
+
+    def _set_journal_mode(self, mode):
+        connections.close_all()
+        with connections['default'].cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode = {mode}')
+        connections.close_all()
+
+    def _run(self, label, tuned, options, workdir):
+        output = Path(workdir) / f'{label}.json'
+        previous_mode = connections['default'].settings_dict.get('OPTIONS', {}).get('transaction_mode')
+        with override_settings(SQLITE_PERFORMANCE_MODE=tuned), open(Path(workdir) / f'{label}.log', 'w') as log:
+            if not tuned:
+                # WAL is persistent in the file, so switch back to the rollback journal explicitly
+                self._set_journal_mode('DELETE')
+            set_transaction_mode('IMMEDIATE' if tuned else None)
+            connections.close_all()
+            try:
+                call_command(
+                    'load_test_pos', cashiers=options['cashiers'], iterations=options['iterations'],
+                    products=options['products'], stock=1_000_000, output=str(output), stdout=log,
+                )
+            finally:
+                set_transaction_mode(previous_mode)
+                connections.close_all()
+        with open(output, encoding='utf-8') as f:
+            return json.load(f)
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('bench_sqlite_checkout needs the SQLite database (unset DATABASE_URL)')
+        original_mode = get_pragma('journal_mode')
+        # Outside override_settings, so the test client's host stays allowed for both runs
+        setup_test_environment()
+        self.stdout.write(self.style.WARNING('⚠️  This writes load-test sales into the configured database'))
+
+        with tempfile.TemporaryDirectory() as workdir:
+            try:
+                results = [
+                    ('default', self._run('default', False, options, workdir)),
+                    ('tuned', self._run('tuned', True, options, workdir)),
+                ]
+            finally:
+                self._set_journal_mode(original_mode)
+
+        self.stdout.write(f'{options["cashiers"]} cashiers x {options["iterations"]} checkouts')
+        self.stdout.write(f'{"profile":<10}{"checkouts/s":>13}{"completed":>11}{"errors":>8}'
+                          f'{"checkout p50":>14}{"checkout p95":>14}')
+        for label, r in results:
+            checkout = r['steps']['checkout']
+            p50 = f'{checkout["p50_ms"]:.1f} ms' if checkout['p50_ms'] is not None else '-'
+            p95 = f'{checkout["p95_ms"]:.1f} ms' if checkout['p95_ms'] is not None else '-'
+            self.stdout.write(f'{label:<10}{r["checkouts_per_s"]:>13}{r["checkouts"]:>11}{r["errors"]:>8}'
+                              f'{p50:>14}{p95:>14}')
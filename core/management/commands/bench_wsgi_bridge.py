@@ -0,0 +1,107 @@
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import ThreadingHTTPServer
+from io import BytesIO
+from django.core.management.base import BaseCommand
+
+
+def make_export_app(size_mb, chunk_size=64 * 1024):
+    """A WSGI app that streams `size_mb` MB of CSV rows, like a large report export"""
+    row = b'2025-01-01,Pandesal,12,36.00,Cashier One,CASH\n'
+    rows_per_chunk = max(1, chunk_size // len(row))
+    chunk = row * rows_per_chunk
+    chunks = (size_mb * 1024 * 1024) // len(chunk)
+
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/csv')])
+        return (chunk for _ in range(chunks))
+
+    return app
+
+
+def buffered_handler_class(base):
+    """The previous bridge: read the whole body up front and join the whole response"""
+    class BufferedHandler(base):
+        protocol_version = 'HTTP/1.0'
+
+        def _handle_request(self):
+            environ = self._build_environ()
+            environ['wsgi.input'] = BytesIO(environ['wsgi.input'].read())
+            response = {}
+
+            def start_response(status, headers, exc_info=None):
+                response['status'] = status
+                response['headers'] = headers
+
+            body = b''.join(self.application(environ, start_response))
+            self.send_response(int(response['status'].split()[0]))
+            for name, value in response['headers']:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return BufferedHandler
+
+
+def measure(handler_class, app):
+    handler_class = type('BenchHandler', (handler_class,), {
+        'application': staticmethod(app),
+        'log_message': lambda self, *args: None,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        with socket.create_connection(server.server_address) as sock:
+            sock.sendall(b'GET /reports/export/ HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n')
+            first = sock.recv(1)
+            ttfb = time.perf_counter() - started
+            received = len(first)
+            while True:
+                data = sock.recv(256 * 1024)
+                if not data:
+                    break
+                received += len(data)
+        total = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {'ttfb': ttfb, 'total': total, 'peak': peak, 'bytes': received}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark time-to-first-byte and peak memory of the api/index.py bridge on a large export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=50,
+                            help='Size of the simulated export in MB (default: 50)')
+
+    def handle(self, *args, **options):
+        from django.conf import settings
+        sys.path.insert(0, str(settings.BASE_DIR))
+        from api.index import handler
+
+        app = make_export_app(options['size_mb'])
+        tracemalloc.start()
+        try:
+            results = [
+                ('buffered (old)', measure(buffered_handler_class(handler), app)),
+                ('streaming', measure(handler, app)),
+            ]
+        finally:
+            tracemalloc.stop()
+
+        self.stdout.write(f'Export size: {options["size_mb"]} MB')
+        self.stdout.write(f'{"bridge":<16}{"TTFB ms":>10}{"total ms":>10}{"peak MB":>10}{"received MB":>13}')
+        for name, r in results:
+            self.stdout.write(
+                f'{name:<16}{r["ttfb"] * 1000:>10.1f}{r["total"] * 1000:>10.1f}'
+                f'{r["peak"] / 1048576:>10.1f}{r["bytes"] / 1048576:>13.1f}'
+            )
@@ -0,0 +1,54 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import Product
+from core.images import build_derivatives_for_image, init_worker, variants_by_hash
+
+
+class Command(BaseCommand):
+    help = 'Backfill thumbnail/medium WebP and JPEG renditions for product images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (default: CPU count)')
+        parser.add_argument('--force', action='store_true',
+                            help='Rebuild derivatives even if they are already recorded')
+
+    def handle(self, *args, **options):
+        products = list(Product.objects.exclude(image__isnull=True).exclude(image=''))
+        # Renditions already built from the same bytes (e.g. an image re-hosted under a new URL) are reused
+        known = {}
+        if not options['force']:
+            known = variants_by_hash(p.image_variants for p in products)
+            products = [p for p in products if p.image_variants.get('source') != p.image]
+
+        if not products:
+            self.stdout.write(self.style.SUCCESS('All product images already have derivatives'))
+            return
+
+        # Several products can share one image; process each source once
+        by_image = {}
+        for p in products:
+            by_image.setdefault(p.image, []).append(p)
+
+        self.stdout.write(f'Building derivatives for {len(by_image)} images '
+                          f'with {options["workers"]} workers...')
+
+        updated = []
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+            futures = [pool.submit(build_derivatives_for_image, image, known) for image in by_image]
+            for future in as_completed(futures):
+                image, variants, error = future.result()
+                if error:
+                    self.stdout.write(self.style.ERROR(f'❌ {image}: {error}'))
+                    continue
+                for p in by_image[image]:
+                    p.image_variants = variants
+                    p.updated_at = timezone.now()
+                    updated.append(p)
+                self.stdout.write(self.style.SUCCESS(f'✅ {image}'))
+
+        Product.objects.bulk_update(updated, ['image_variants', 'updated_at'], batch_size=500)
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'Updated {len(updated)} products'))
@@ -0,0 +1,144 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.fragments import bump_catalog
+from core.models import Product, UserProfile
+
+
+def probe_url(session, url, timeout):
+    """HEAD the URL, falling back to a 1-byte ranged GET for hosts that reject HEAD"""
+    import requests
+
+    try:
+        response = session.head(url, timeout=timeout, allow_redirects=True)
+        if response.status_code in (403, 405, 501) or response.status_code >= 500:
+            response = session.get(url, timeout=timeout, stream=True, headers={'Range': 'bytes=0-0'})
+            response.close()
+    except requests.exceptions.RequestException as e:
+        return {'ok': False, 'status': None, 'error': str(e)}
+    ok = response.status_code < 400 and response.headers.get('Content-Type', 'image/').startswith('image/')
+    return {'ok': ok, 'status': response.status_code,
+            'error': None if ok else f'HTTP {response.status_code} {response.headers.get("Content-Type", "")}'.strip()}
+
+
+def probe_local(value):
+    """Check an image stored as a storage path, /media/ URL or /static/ URL"""
+    static_prefix = '/' + settings.STATIC_URL.lstrip('/')
+    media_prefix = '/' + settings.MEDIA_URL.lstrip('/')
+    if value.startswith(static_prefix):
+        found = finders.find(value[len(static_prefix):])
+    else:
+        name = value[len(media_prefix):] if value.startswith(media_prefix) else value
+        found = default_storage.exists(name.lstrip('/'))
+    return {'ok': bool(found), 'status': None, 'error': None if found else 'File not found'}
+
+
+class Command(BaseCommand):
+    help = 'Check that every product and profile image URL resolves, with an optional repair'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16,
+                            help='Maximum concurrent requests (default: 16)')
+        parser.add_argument('--timeout', type=float, default=5.0,
+                            help='Per-request timeout in seconds (default: 5)')
+        parser.add_argument('--ttl', type=int, default=3600,
+                            help='Reuse results from the report younger than this many seconds (default: 3600, 0 disables)')
+        parser.add_argument('--report', type=str, default='data_export/image_health.json',
+                            help='JSON report path, also used as the result cache')
+        parser.add_argument('--base-url', type=str,
+                            help='Resolve relative image paths against this URL instead of the local filesystem')
+        parser.add_argument('--repair', action='store_true',
+                            help='Replace broken images with --placeholder')
+        parser.add_argument('--placeholder', type=str, default='',
+                            help='Image used by --repair (default: empty, so pages show their built-in placeholder)')
+
+    def handle(self, *args, **options):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        products = list(Product.objects.exclude(image__isnull=True).exclude(image='').only('id', 'name', 'image'))
+        profiles = list(UserProfile.objects.exclude(profile_picture__isnull=True).exclude(profile_picture='')
+                        .select_related('user').only('id', 'profile_picture', 'user__username'))
+        references = {}
+        for p in products:
+            references.setdefault(p.image, []).append(f'product:{p.pk} {p.name}')
+        for prof in profiles:
+            references.setdefault(prof.profile_picture, []).append(f'profile:{prof.pk} {prof.user.username}')
+
+        report_path = Path(options['report'])
+        cached = {}
+        if options['ttl'] > 0 and report_path.exists():
+            with open(report_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f).get('results', {})
+        now = time.time()
+        results = {url: r for url, r in cached.items()
+                   if url in references and now - r.get('checked_at', 0) < options['ttl']}
+
+        base_url = (options['base_url'] or '').rstrip('/')
+        to_check = [url for url in references if url not in results]
+        self.stdout.write(f'Checking {len(to_check)} image URLs ({len(results)} cached)...')
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=options['workers'])
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        def check(value):
+            if value.startswith(('http://', 'https://')):
+                result = probe_url(session, value, options['timeout'])
+            elif base_url:
+                result = probe_url(session, f'{base_url}/{value.lstrip("/")}', options['timeout'])
+            else:
+                result = probe_local(value)
+            result['checked_at'] = time.time()
+            return value, result
+
+        with session, ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for value, result in pool.map(check, to_check):
+                results[value] = result
+
+        broken = {url: r for url, r in results.items() if not r['ok']}
+        for url, r in sorted(broken.items()):
+            self.stdout.write(self.style.ERROR(f'❌ {url}: {r["error"]}'))
+            for ref in references[url]:
+                self.stdout.write(f'    used by {ref}')
+
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'generated_at': now,
+                'checked': len(results),
+                'broken': len(broken),
+                'results': {url: {**r, 'used_by': references[url]} for url, r in results.items()},
+            }, f, indent=2)
+
+        self.stdout.write('')
+        if not broken:
+            self.stdout.write(self.style.SUCCESS(f'✅ All {len(results)} image URLs are reachable'))
+        else:
+            self.stdout.write(self.style.WARNING(f'⚠️  {len(broken)} of {len(results)} image URLs are broken'))
+        self.stdout.write(f'📁 Report: {report_path}')
+
+        if options['repair'] and broken:
+            placeholder = options['placeholder'] or None
+            fixed_products = [p for p in products if p.image in broken]
+            for p in fixed_products:
+                p.image = placeholder
+                p.image_variants = {}
+                p.updated_at = timezone.now()
+            Product.objects.bulk_update(fixed_products, ['image', 'image_variants', 'updated_at'])
+            if fixed_products:
+                bump_catalog()  # bulk_update skips the hook that drops the cached POS grid
+            fixed_profiles = [prof for prof in profiles if prof.profile_picture in broken]
+            for prof in fixed_profiles:
+                prof.profile_picture = placeholder
+            UserProfile.objects.bulk_update(fixed_profiles, ['profile_picture'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Repaired {len(fixed_products)} products and {len(fixed_profiles)} profiles'
+            ))
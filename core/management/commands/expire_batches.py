@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core import fragments
+from core.batches import write_off_expired
+
+
+class Command(BaseCommand):
+    help = 'Write off batches past their expiry date as waste (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None,
+                            help='Write off batches that expired before this day, YYYY-MM-DD (default: today)')
+
+    def handle(self, *args, **options):
+        count, units = write_off_expired(options['date'])
+        if count:
+            # Stock and expiry dates on the POS grid and product list changed
+            fragments.bump_catalog()
+        self.stdout.write(self.style.SUCCESS(f'✅ Wrote off {count} expired batches ({units} units)'))
@@ -5,6 +5,9 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from core.models import Product, SalesTransaction, SalesItem, LoginHistory, UserProfile
 from django.db import transaction
+from core.batches import opening_batches
+from core.stock import record_new_products
+from core.velocity import rebuild
 
 
 class Command(BaseCommand):
@@ -46,6 +49,7 @@ class Command(BaseCommand):
             imported_counts['users'] = len(data.get('users', []))
             
             # Import Products
+            new_products = []
             for product_data in data.get('products', []):
                 product, created = Product.objects.get_or_create(
                     name=product_data['name'],
@@ -61,6 +65,10 @@ class Command(BaseCommand):
                         'updated_at': datetime.fromisoformat(product_data['updated_at']),
                     }
                 )
+                if created:
+                    new_products.append(product)
+            opening_batches(new_products)
+            record_new_products(new_products, note='Imported')
             
             imported_counts['products'] = len(data.get('products', []))
             
@@ -132,6 +140,9 @@ class Command(BaseCommand):
             
             imported_counts['user_profiles'] = len(data.get('user_profiles', []))
         
+        # Imported sales bypass checkout, so velocities are computed from them here
+        rebuild()
+
         # Print summary
         self.stdout.write(self.style.SUCCESS('✅ Data imported successfully!'))
         self.stdout.write('')
@@ -0,0 +1,315 @@
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Sum
+from django.urls import reverse
+from core.batches import apply_edit, sellable, with_available
+from core.models import Product, SalesItem, StockMovement
+from core.stock import record, stock_change
+
+STEPS = ['login', 'pos', 'add_to_cart', 'update_cart', 'checkout', 'receipt']
+RECEIPT_RE = re.compile(r'/receipt/(\d+)/')
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class StepError(Exception):
+    pass
+
+
+class ClientDriver:
+    """Runs requests in-process through Django's test client (full middleware stack)"""
+
+    def __init__(self):
+        from django.test import Client
+        self.client = Client(raise_request_exception=False)
+        self.secure = settings.SECURE_SSL_REDIRECT
+
+    def login(self, username, password):
+        self.get(reverse('login'))
+        return self.post(reverse('login'), {'username': username, 'password': password})
+
+    def get(self, path):
+        response = self.client.get(path, secure=self.secure)
+        return response.status_code, response.get('Location', '')
+
+    def post(self, path, data):
+        response = self.client.post(path, data, secure=self.secure)
+        return response.status_code, response.get('Location', '')
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpDriver:
+    """Runs requests against a running server with a requests.Session per cashier"""
+
+    def __init__(self, base_url, timeout):
+        import requests
+        self.session = requests.Session()
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _csrf(self):
+        return self.session.cookies.get('csrftoken', '')
+
+    def login(self, username, password):
+        response = self.session.get(self.base_url + reverse('login'), timeout=self.timeout)
+        match = CSRF_RE.search(response.text)
+        return self.post(reverse('login'), {
+            'username': username, 'password': password,
+            'csrfmiddlewaretoken': match.group(1) if match else self._csrf(),
+        })
+
+    def get(self, path):
+        response = self.session.get(self.base_url + path, timeout=self.timeout, allow_redirects=False)
+        return response.status_code, response.headers.get('Location', '')
+
+    def post(self, path, data):
+        data = {'csrfmiddlewaretoken': self._csrf(), **data}
+        response = self.session.post(
+            self.base_url + path, data=data, timeout=self.timeout, allow_redirects=False,
+            headers={'X-CSRFToken': self._csrf(), 'Referer': self.base_url + path},
+        )
+        return response.status_code, response.headers.get('Location', '')
+
+    def close(self):
+        self.session.close()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = 'Simulate concurrent cashiers running the POS flow and report latency, errors and oversells'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cashiers', type=int, default=5,
+                            help='Concurrent cashiers, one thread each (default: 5)')
+        parser.add_argument('--iterations', type=int, default=20,
+                            help='Checkouts attempted per cashier (default: 20)')
+        parser.add_argument('--items', type=int, default=3,
+                            help='Products added to each cart (default: 3)')
+        parser.add_argument('--products', type=int, default=10,
+                            help='Size of the product pool cashiers pick from; small pools mean contention (default: 10)')
+        parser.add_argument('--stock', type=int,
+                            help='Adjust stock of the pool products to this before the run, to provoke oversells '
+                                 '(recorded as a stock adjustment; batches are trimmed FEFO or topped up)')
+        parser.add_argument('--base-url', type=str,
+                            help='Drive a running server (e.g. http://127.0.0.1:8000) instead of the test client')
+        parser.add_argument('--timeout', type=float, default=30.0,
+                            help='Per-request timeout in seconds with --base-url (default: 30)')
+        parser.add_argument('--password', type=str, default='loadtest123',
+                            help='Password for the loadtest cashier accounts (default: loadtest123)')
+        parser.add_argument('--seed', type=int, default=1,
+                            help='Random seed for product and quantity choices (default: 1)')
+        parser.add_argument('--output', type=str,
+                            help='JSON result file (default: data_export/load_test_<timestamp>.json)')
+
+    def _ensure_cashiers(self, count, password):
+        users = []
+        for i in range(count):
+            user, created = User.objects.get_or_create(username=f'loadtest{i + 1}', defaults={'is_staff': False})
+            if created or not user.check_password(password):
+                user.set_password(password)
+                user.save()
+            users.append(user)
+        return users
+
+    def _run_cashier(self, index, user, options, product_ids, results):
+        rng = random.Random(options['seed'] * 1000 + index)
+        timings = defaultdict(list)
+        errors = defaultdict(int)
+        samples = []
+        sale_ids = []
+        rejected = 0
+
+        def step(name, call, ok=lambda status, location: status < 400):
+            started = time.perf_counter()
+            try:
+                status, location = call()
+            except Exception as e:
+                errors[name] += 1
+                samples.append(f'{name}: {type(e).__name__}: {e}'[:300])
+                raise StepError(name)
+            timings[name].append(time.perf_counter() - started)
+            if not ok(status, location):
+                errors[name] += 1
+                samples.append(f'{name}: HTTP {status} {location}'[:300])
+                raise StepError(name)
+            return location
+
+        driver = HttpDriver(options['base_url'], options['timeout']) if options['base_url'] else ClientDriver()
+        try:
+            # A successful login redirects away from the login page
+            step('login', lambda: driver.login(user.username, options['password']),
+                 ok=lambda status, location: status == 302 and reverse('login') not in location)
+            for _ in range(options['iterations']):
+                try:
+                    step('pos', lambda: driver.get(reverse('pos')))
+                    cart = rng.sample(product_ids, min(options['items'], len(product_ids)))
+                    for pid in cart:
+                        step('add_to_cart', lambda pid=pid: driver.post(
+                            reverse('add_to_cart', args=[pid]), {'qty': rng.randint(1, 3)}))
+                    step('update_cart', lambda: driver.post(
+                        reverse('update_cart', args=[cart[0]]), {'qty': rng.randint(1, 4)}))
+                    location = step('checkout', lambda: driver.post(
+                        reverse('checkout'), {'discount': '0', 'payment_method': 'CASH', 'cash_received': '5000'}))
+                    match = RECEIPT_RE.search(location)
+                    if not match:
+                        # Redirected back to the POS: validation rejected the cart (e.g. out of stock)
+                        rejected += 1
+                        continue
+                    sale_ids.append(int(match.group(1)))
+                    step('receipt', lambda: driver.get(location))
+                except StepError:
+                    continue
+        except StepError:
+            pass
+        finally:
+            driver.close()
+
+        with results['lock']:
+            for name, values in timings.items():
+                results['timings'][name].extend(values)
+            for name, n in errors.items():
+                results['errors'][name] += n
+            results['samples'].extend(samples[:5])
+            results['sale_ids'].extend(sale_ids)
+            results['rejected'] += rejected
+
+    def handle(self, *args, **options):
+        if options['cashiers'] < 1 or options['iterations'] < 1:
+            raise CommandError('--cashiers and --iterations must be at least 1')
+
+        if not options['base_url']:
+            from django.test.utils import setup_test_environment
+            try:
+                # Allows the test client's 'testserver' host
+                setup_test_environment()
+            except RuntimeError:
+                pass  # already set up, e.g. by bench_sqlite_checkout
+
+        today = date.today()
+        pool = list(sellable(Product.objects.filter(is_archived=False, is_active=True), today)
+                    .order_by('id')[:options['products']])
+        if not pool:
+            raise CommandError('No active products to sell; run seed_demo first')
+        if options['stock'] is not None:
+            with transaction.atomic():
+                # The same path as editing a product's stock: locked products, then their batches
+                movements = []
+                for p in Product.objects.select_for_update().filter(pk__in=[p.pk for p in pool]).order_by('pk'):
+                    previous, p.stock = p.stock, options['stock']
+                    apply_edit(p, p.expiration_date, today)
+                    p.save(update_fields=['stock', 'expiration_date', 'updated_at'])
+                    movements.append(stock_change(p, previous, kind=StockMovement.ADJUSTMENT,
+                                                  note='Set by load_test_pos'))
+                record([m for m in movements if m])
+        # What checkout can sell: units in unexpired batches
+        initial_stock = dict(with_available(Product.objects.filter(pk__in=[p.pk for p in pool]), today)
+                             .values_list('pk', 'available'))
+        product_ids = list(initial_stock)
+
+        users = self._ensure_cashiers(options['cashiers'], options['password'])
+        target = options['base_url'] or 'in-process test client'
+        self.stdout.write(f'🧪 {len(users)} cashiers x {options["iterations"]} checkouts, '
+                          f'{len(product_ids)} products, against {target}')
+
+        results = {'lock': threading.Lock(), 'timings': defaultdict(list), 'errors': defaultdict(int),
+                   'samples': [], 'sale_ids': [], 'rejected': 0}
+        threads = [
+            threading.Thread(target=self._run_cashier, args=(i, user, options, product_ids, results))
+            for i, user in enumerate(users)
+        ]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        # Oversell: more units sold than were in stock; drift: stock doesn't match what was sold (lost update)
+        sold = dict(SalesItem.objects.filter(sale_id__in=results['sale_ids'], product_id__in=product_ids)
+                    .values('product_id').annotate(qty=Sum('qty')).values_list('product_id', 'qty'))
+        final_stock = dict(with_available(Product.objects.filter(pk__in=product_ids), today)
+                           .values_list('pk', 'available'))
+        oversold = {pid: sold.get(pid, 0) - initial_stock[pid]
+                    for pid in product_ids if sold.get(pid, 0) > initial_stock[pid]}
+        drift = {pid: final_stock[pid] - (initial_stock[pid] - sold.get(pid, 0))
+                 for pid in product_ids if final_stock[pid] != initial_stock[pid] - sold.get(pid, 0)}
+
+        total_requests = sum(len(v) for v in results['timings'].values())
+        steps = {}
+        for name in STEPS:
+            values = sorted(results['timings'].get(name, []))
+            steps[name] = {
+                'count': len(values),
+                'errors': results['errors'].get(name, 0),
+                'p50_ms': round(percentile(values, 50) * 1000, 2) if values else None,
+                'p95_ms': round(percentile(values, 95) * 1000, 2) if values else None,
+                'p99_ms': round(percentile(values, 99) * 1000, 2) if values else None,
+                'max_ms': round(values[-1] * 1000, 2) if values else None,
+            }
+        try:
+            revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                      text=True, cwd=settings.BASE_DIR).stdout.strip() or None
+        except OSError:
+            revision = None
+        report = {
+            'revision': revision,
+            'target': target,
+            'database': connections['default'].vendor,
+            'config': {k: options[k] for k in ('cashiers', 'iterations', 'items', 'products', 'stock', 'seed')},
+            'duration_s': round(elapsed, 3),
+            'requests': total_requests,
+            'requests_per_s': round(total_requests / elapsed, 2) if elapsed else None,
+            'checkouts': len(results['sale_ids']),
+            'checkouts_per_s': round(len(results['sale_ids']) / elapsed, 2) if elapsed else None,
+            'checkouts_rejected': results['rejected'],
+            'errors': sum(results['errors'].values()),
+            'error_samples': results['samples'][:20],
+            'oversold_units': sum(oversold.values()),
+            'oversold_products': {str(pid): n for pid, n in oversold.items()},
+            'stock_drift': {str(pid): n for pid, n in drift.items()},
+            'steps': steps,
+        }
+
+        self.stdout.write('')
+        self.stdout.write(f'{"step":<13}{"count":>7}{"errors":>8}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}')
+        for name, s in steps.items():
+            fmt = lambda v: f'{v:>9.1f}' if v is not None else f'{"-":>9}'
+            self.stdout.write(f'{name:<13}{s["count"]:>7}{s["errors"]:>8}{fmt(s["p50_ms"])}{fmt(s["p95_ms"])}{fmt(s["p99_ms"])}')
+        self.stdout.write('')
+        self.stdout.write(f'Duration {elapsed:.1f}s, {report["requests_per_s"]} req/s, '
+                          f'{report["checkouts_per_s"]} checkouts/s '
+                          f'({report["checkouts"]} completed, {report["checkouts_rejected"]} rejected)')
+        for sample in report['error_samples'][:5]:
+            self.stdout.write(self.style.ERROR(f'❌ {sample}'))
+
+        output = Path(options['output'] or f'data_export/load_test_{time.strftime("%Y%m%d_%H%M%S")}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+        if report['oversold_units'] or drift:
+            self.stdout.write(self.style.ERROR(
+                f'❌ Oversold {report["oversold_units"]} units; stock drift on {len(drift)} products'
+            ))
+        elif report['errors']:
+            self.stdout.write(self.style.WARNING(f'⚠️  {report["errors"]} errors, no oversells'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ No errors or oversells'))
+        self.stdout.write(f'📁 Results: {output}')
@@ -0,0 +1,57 @@
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.images import optimize_image, webp_version
+
+EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+
+class Command(BaseCommand):
+    help = 'Shrink the images in static/images in place: downscale, strip metadata, progressive JPEG, optimized PNG'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', type=str,
+                            help='Directory to optimize (default: static/images)')
+        parser.add_argument('--max-size', type=int, default=1600,
+                            help='Longest side in pixels after downscaling (default: 1600)')
+        parser.add_argument('--webp', action='store_true',
+                            help='Also write a .webp copy next to each image')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report the savings without writing any files')
+
+    def handle(self, *args, **options):
+        directory = Path(options['path']) if options['path'] else Path(settings.STATICFILES_DIRS[0]) / 'images'
+        if not directory.is_dir():
+            raise CommandError(f'{directory} is not a directory')
+
+        before_total = after_total = 0
+        for path in sorted(p for p in directory.iterdir() if p.suffix.lower() in EXTENSIONS):
+            original = path.read_bytes()
+            try:
+                optimized, size = optimize_image(original, options['max_size'])
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'❌ {path.name}: {e}'))
+                continue
+            before_total += len(original)
+            if len(optimized) < len(original):
+                after_total += len(optimized)
+                if not options['dry_run']:
+                    path.write_bytes(optimized)
+                self.stdout.write(f'  {path.name}: {len(original) / 1024:.0f} KB → {len(optimized) / 1024:.0f} KB '
+                                  f'({size[0]}x{size[1]})')
+            else:
+                after_total += len(original)
+                self.stdout.write(f'  {path.name}: already optimal ({len(original) / 1024:.0f} KB)')
+
+            if options['webp'] and not options['dry_run']:
+                path.with_suffix('.webp').write_bytes(webp_version(path.read_bytes()))
+
+        if not before_total:
+            self.stdout.write(self.style.WARNING(f'⚠️ No images found in {directory}'))
+            return
+        verb = 'Would save' if options['dry_run'] else 'Saved'
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {verb} {(before_total - after_total) / 1024:.0f} KB: {before_total / 1024:.0f} KB → '
+            f'{after_total / 1024:.0f} KB ({(1 - after_total / before_total) * 100:.0f}% smaller)'
+        ))
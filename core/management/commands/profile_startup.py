@@ -0,0 +1,92 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a cold start of api/index.py does, without binding a server
+STARTUP_SCRIPT = '''
+import os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {base_dir!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+{warm_up}
+print('STARTUP_MS', (time.perf_counter() - started) * 1000)
+'''
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+class Command(BaseCommand):
+    help = 'Profile serverless cold start: per-module import time (-X importtime) and a startup time budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25,
+                            help='Number of modules to list (default: 25)')
+        parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative',
+                            help='Sort modules by cumulative or self import time (default: cumulative)')
+        parser.add_argument('--runs', type=int, default=5,
+                            help='Number of cold starts to time (default: 5)')
+        parser.add_argument('--budget-ms', type=float, default=settings.COLD_START_BUDGET_MS,
+                            help='Fail if the median cold start exceeds this (default: COLD_START_BUDGET_MS)')
+        parser.add_argument('--no-warmup', action='store_true',
+                            help='Skip core.warmup.warm_up() in the measured startup')
+
+    def _run(self, script, importtime=False):
+        cmd = [sys.executable]
+        if importtime:
+            cmd += ['-X', 'importtime']
+        cmd += ['-c', script]
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=settings.BASE_DIR, env=os.environ.copy())
+        if proc.returncode != 0:
+            raise CommandError(f'Startup failed:\n{proc.stderr[-2000:]}')
+        match = re.search(r'STARTUP_MS ([\d.]+)', proc.stdout)
+        return float(match.group(1)), proc.stderr
+
+    def handle(self, *args, **options):
+        script = STARTUP_SCRIPT.format(
+            base_dir=str(settings.BASE_DIR),
+            settings_module=os.environ.get('DJANGO_SETTINGS_MODULE', 'alvarez_bakery.settings'),
+            warm_up='' if options['no_warmup'] else 'from core.warmup import warm_up; warm_up()',
+        )
+
+        _, stderr = self._run(script, importtime=True)
+        modules = []
+        for line in stderr.splitlines():
+            match = IMPORTTIME_RE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+
+        key = 2 if options['sort'] == 'cumulative' else 1
+        top_level = sum(m[2] for m in modules if m[3] == 0)
+        self.stdout.write(f'Imports: {len(modules)} modules, {top_level / 1000:.1f} ms total')
+        self.stdout.write(f'{"self ms":>9}{"cumul ms":>10}  module')
+        for name, self_us, cumulative_us, depth in sorted(modules, key=lambda m: m[key], reverse=True)[:options['top']]:
+            self.stdout.write(f'{self_us / 1000:>9.1f}{cumulative_us / 1000:>10.1f}  {name}')
+
+        # Packages by their top-level name, which is what lazy-loading decisions are made on
+        packages = {}
+        for name, self_us, _, _ in modules:
+            root = name.split('.')[0]
+            packages[root] = packages.get(root, 0) + self_us
+        self.stdout.write('')
+        self.stdout.write('By package:')
+        for root, total in sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:10]:
+            self.stdout.write(f'{total / 1000:>9.1f} ms  {root}')
+
+        timings = [self._run(script)[0] for _ in range(max(1, options['runs']))]
+        median = statistics.median(timings)
+        self.stdout.write('')
+        self.stdout.write(f'Cold start over {len(timings)} runs: median {median:.1f} ms, '
+                          f'min {min(timings):.1f} ms, max {max(timings):.1f} ms '
+                          f'(budget {options["budget_ms"]:.0f} ms)')
+        if median > options['budget_ms']:
+            raise CommandError(f'Cold start {median:.1f} ms is over the {options["budget_ms"]:.0f} ms budget')
+        self.stdout.write(self.style.SUCCESS('✅ Within budget'))
@@ -1,61 +1,210 @@
-from django.core.management.base import BaseCommand
+import datetime
+import random
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
-from core.models import Product, SalesTransaction, SalesItem
+from django.db import transaction
 from django.utils import timezone
-import random, datetime
+from core.batches import opening_batches
+from core.fragments import bump_catalog, bump_sales
+from core.models import Product, SalesTransaction, SalesItem, SalesVelocity, StockMovement
+from core.stock import record, record_new_products, sale_movements
+from core.velocity import rebuild
+
+PRODUCTS = [
+    ('Pandesal', 3.0),
+    ('Ensaymada', 25.0),
+    ('Spanish Bread', 15.0),
+    ('Cheese Bread', 12.0),
+    ('Ube Loaf', 70.0),
+    ('Pan de Coco', 12.0),
+    ('Monay', 10.0),
+    ('Kababayan', 15.0),
+    ('Hopia', 20.0),
+    ('Egg Pie', 45.0),
+    ('Buko Pie', 180.0),
+    ('Mamon', 18.0),
+    ('Putok', 8.0),
+    ('Pianono', 35.0),
+    ('Crinkles', 10.0),
+    ('Brazo de Mercedes', 220.0),
+]
+SIZES = ['', ' (Large)', ' (Family)', ' (Mini)']
+
+# Share of a day's transactions by hour: early pandesal rush and afternoon merienda
+HOURLY_WEIGHTS = {
+    5: 6, 6: 14, 7: 13, 8: 8, 9: 5, 10: 4, 11: 4, 12: 5,
+    13: 4, 14: 5, 15: 8, 16: 9, 17: 7, 18: 5, 19: 3, 20: 2,
+}
+# Monday..Sunday, relative to the --tx-per-day mean
+WEEKDAY_FACTORS = [0.85, 0.9, 0.9, 0.95, 1.1, 1.3, 1.2]
+BASKET_SIZES = ([1, 2, 3, 4, 5], [40, 30, 17, 9, 4])
+QUANTITIES = ([1, 2, 3, 4, 6, 10, 12], [30, 22, 14, 10, 10, 8, 6])
+DISCOUNTS = ([Decimal('0'), Decimal('2'), Decimal('5')], [85, 10, 5])
+# Marks the ledger rows seed_demo writes, so --clear can take them out again
+SEEDED_NOTE = 'Seeded sales'
+
 
 class Command(BaseCommand):
-    help = "Seed demo products and random sales data"
+    help = 'Seed demo users and products and generate deterministic, realistic sales data and its stock ledger in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed; the same seed and options generate the same data (default: 42)')
+        parser.add_argument('--days', type=int, default=60,
+                            help='Number of days of sales history up to --end-date (default: 60)')
+        parser.add_argument('--end-date', type=str,
+                            help='Last day of generated sales, YYYY-MM-DD (default: today)')
+        parser.add_argument('--products', type=int, default=5,
+                            help=f'Number of products (default: 5, names repeat in sizes past {len(PRODUCTS)})')
+        parser.add_argument('--cashiers', type=int, default=1,
+                            help='Number of cashier accounts the sales are spread over (default: 1)')
+        parser.add_argument('--tx-per-day', type=int, default=15,
+                            help='Mean transactions per day before weekday patterns (default: 15)')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Rows per bulk_create batch (default: 5000)')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete all existing sales, their seeded ledger rows and sales velocities before generating')
 
-    def handle(self, *args, **kwargs):
-        # Admin (staff) + Cashier user
+    def _ensure_users(self, count):
+        # Admin (staff) + Cashier users
         if not User.objects.filter(username='admin').exists():
-            User.objects.create_superuser('admin','admin@example.com','admin123')
+            User.objects.create_superuser('admin', 'admin@example.com', 'admin123')
             self.stdout.write(self.style.SUCCESS("Created superuser: admin / admin123"))
-        if not User.objects.filter(username='cashier').exists():
-            u = User.objects.create_user('cashier','cashier@example.com','cashier123')
-            u.is_staff = False
-            u.save()
-            self.stdout.write(self.style.SUCCESS("Created cashier: cashier / cashier123"))
-
-        # Products
-        products = [
-            ('Pandesal', 3.0),
-            ('Ensaymada', 25.0),
-            ('Spanish Bread', 15.0),
-            ('Cheese Bread', 12.0),
-            ('Ube Loaf', 70.0),
-        ]
-        objs = []
-        for name, price in products:
-            p, _ = Product.objects.get_or_create(name=name, defaults={'price':price, 'ingredients':'', 'is_active': True})
-            p.price = price; p.save()
-            objs.append(p)
-        self.stdout.write(self.style.SUCCESS(f"Ensured {len(objs)} products."))
-
-        # Random sales for last 60 days
-        cashier = User.objects.get(username='cashier')
-        now = timezone.now()
-        for d in range(60, -1, -1):
-            day = now - datetime.timedelta(days=d)
-            # 5-25 transactions per day
-            for _ in range(random.randint(5,25)):
-                items_count = random.randint(1,3)
-                discount = round(random.choice([0, 2, 5]), 2)
-                sale = SalesTransaction.objects.create(
-                    cashier=cashier,
-                    total_amount=0,
-                    discount=discount,
-                    payment_method=random.choice(['CASH','CARD','E_WALLET']),
-                    created_at=day
-                )
-                total = 0
-                for __ in range(items_count):
-                    p = random.choice(objs)
-                    qty = random.randint(1,6)
-                    line = round(p.price*qty, 2)
-                    SalesItem.objects.create(sale=sale, product=p, qty=qty, unit_price=p.price, line_total=line)
+        cashiers = []
+        for i in range(count):
+            username = 'cashier' if i == 0 else f'cashier{i + 1}'
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                user = User.objects.create_user(username, f'{username}@example.com', 'cashier123')
+                self.stdout.write(self.style.SUCCESS(f"Created cashier: {username} / cashier123"))
+            cashiers.append(user)
+        return cashiers
+
+    def _ensure_products(self, count):
+        wanted = {}
+        for i in range(count):
+            name, price = PRODUCTS[i % len(PRODUCTS)]
+            size = i // len(PRODUCTS)
+            suffix = SIZES[size] if size < len(SIZES) else f' (Batch {size})'
+            wanted[name + suffix] = Decimal(str(price * (1 + 0.5 * size))).quantize(Decimal('0.01'))
+        existing = set(Product.objects.filter(name__in=wanted).values_list('name', flat=True))
+        created = Product.objects.bulk_create([
+            Product(name=name, price=price, ingredients='', is_active=True, stock=1000)
+            for name, price in wanted.items() if name not in existing
+        ])
+        opening_batches(created)
+        record_new_products(created, note='Seeded')
+        products = {p.name: p for p in Product.objects.filter(name__in=wanted).order_by('id')}
+        return [products[name] for name in wanted]
+
+    def _flush(self, sales, baskets, bakes):
+        with transaction.atomic():
+            SalesTransaction.objects.bulk_create(sales, batch_size=self.chunk_size)
+            items, movements = [], list(bakes)
+            for sale, basket in zip(sales, baskets):
+                for item in basket:
+                    item.sale = sale
+                    items.append(item)
+                cart = Counter()
+                for item in basket:
+                    cart[item.product_id] += item.qty
+                movements += sale_movements(sale, cart)
+            SalesItem.objects.bulk_create(items, batch_size=self.chunk_size)
+            for movement in movements:
+                movement.note = SEEDED_NOTE
+            record(movements)
+        return len(items)
+
+    @staticmethod
+    def _bakes(day, baskets, tz):
+        """
+        RESTOCK movements baking, before the shop opens, what `baskets` sell on `day`.
+        Each day's bake sells out, so with its SALE movements the ledger explains
+        the history while current stock and batches stay as they are.
+        """
+        baked = defaultdict(int)
+        for basket in baskets:
+            for item in basket:
+                baked[item.product_id] += item.qty
+        opening = datetime.datetime(day.year, day.month, day.day, min(HOURLY_WEIGHTS) - 1, tzinfo=tz)
+        return [StockMovement(product_id=pid, kind=StockMovement.RESTOCK, quantity=units, created_at=opening)
+                for pid, units in baked.items()]
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['products'] < 1 or options['cashiers'] < 1:
+            raise CommandError('--days, --products and --cashiers must be at least 1')
+        try:
+            end = (datetime.date.fromisoformat(options['end_date']) if options['end_date']
+                   else timezone.localdate())
+        except ValueError:
+            raise CommandError('--end-date must be YYYY-MM-DD')
+        self.chunk_size = options['chunk_size']
+        rng = random.Random(options['seed'])
+
+        cashiers = self._ensure_users(options['cashiers'])
+        products = self._ensure_products(options['products'])
+        self.stdout.write(self.style.SUCCESS(f"Ensured {len(products)} products."))
+
+        if options['clear']:
+            with transaction.atomic():
+                SalesItem.objects.all().delete()
+                SalesTransaction.objects.all().delete()
+                StockMovement.objects.filter(note=SEEDED_NOTE).delete()
+                # Rebuilt from the new sales below
+                SalesVelocity.objects.all().delete()
+            self.stdout.write(self.style.WARNING('Deleted existing sales.'))
+
+        # Popularity follows a long tail: the first products sell far more than the rest
+        popularity = [1 / (rank + 1) ** 0.8 for rank in range(len(products))]
+        hours = list(HOURLY_WEIGHTS)
+        hour_weights = list(HOURLY_WEIGHTS.values())
+        tz = timezone.get_current_timezone()
+
+        started = time.perf_counter()
+        total_sales = total_items = 0
+        sales, baskets, bakes = [], [], []
+        for d in range(options['days'] - 1, -1, -1):
+            day = end - datetime.timedelta(days=d)
+            # Busier in December, plus day-to-day noise
+            mean = options['tx_per_day'] * WEEKDAY_FACTORS[day.weekday()] * (1.25 if day.month == 12 else 1.0)
+            count = max(0, round(rng.gauss(mean, mean * 0.1)))
+            first_of_day = len(baskets)
+            for hour in sorted(rng.choices(hours, hour_weights, k=count)):
+                created_at = datetime.datetime(day.year, day.month, day.day, hour,
+                                               rng.randrange(60), rng.randrange(60), tzinfo=tz)
+                basket = []
+                total = Decimal('0')
+                for product in rng.choices(products, popularity, k=rng.choices(*BASKET_SIZES)[0]):
+                    qty = rng.choices(*QUANTITIES)[0]
+                    line = product.price * qty
+                    basket.append(SalesItem(product=product, qty=qty, unit_price=product.price, line_total=line))
                     total += line
-                sale.total_amount = max(0, round(total - discount, 2))
-                sale.save()
-        self.stdout.write(self.style.SUCCESS("Seeded random sales for last 60 days."))
+                discount = rng.choices(*DISCOUNTS)[0]
+                sales.append(SalesTransaction(
+                    cashier=cashiers[rng.randrange(len(cashiers))],
+                    total_amount=max(Decimal('0'), total - discount),
+                    discount=discount,
+                    payment_method='CASH',
+                    created_at=created_at,
+                ))
+                baskets.append(basket)
+            bakes += self._bakes(day, baskets[first_of_day:], tz)
+
+            if len(sales) >= self.chunk_size or d == 0:
+                total_items += self._flush(sales, baskets, bakes)
+                total_sales += len(sales)
+                sales, baskets, bakes = [], [], []
+                self.stdout.write(f'  {day}: {total_sales} sales, {total_items} items')
+
+        # bulk_create skips the signals that invalidate cached POS and report fragments
+        bump_catalog()
+        bump_sales()
+        rebuild()  # sales velocity and reorder points from the seeded history
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {total_sales} sales with {total_items} items over {options['days']} days "
+            f"in {elapsed:.1f}s ({total_items / elapsed if elapsed else 0:.0f} items/s)."
+        ))
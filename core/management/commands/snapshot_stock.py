@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Product, StockMovement
+from core.stock import ledger_balances, record, take_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Snapshot every product\'s stock for the stock ledger, reporting stock changed outside the ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reconcile', action='store_true',
+                            help='Record an adjustment for any drift before snapshotting, instead of only reporting it')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Ledger and stock are compared under the same row locks the snapshot takes
+            products = {p.pk: p for p in Product.objects.select_for_update().only('pk', 'name', 'stock')}
+            expected = ledger_balances(list(products))
+            drift = {pk: products[pk].stock - balance for pk, balance in expected.items()
+                     if products[pk].stock != balance}
+            for pk, units in sorted(drift.items()):
+                self.stdout.write(self.style.WARNING(
+                    f'⚠️ {products[pk].name}: stock is {products[pk].stock}, ledger says {expected[pk]} ({units:+d})'))
+            if drift and options['reconcile']:
+                record([StockMovement(product_id=pk, kind=StockMovement.ADJUSTMENT, quantity=units,
+                                      note='Reconciled by snapshot_stock') for pk, units in drift.items()])
+            count = take_snapshots(list(products))
+
+        if drift and not options['reconcile']:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ {len(drift)} products changed outside the ledger; rerun with --reconcile to record the difference'))
+        if missing := len(products) - len(expected):
+            self.stdout.write(f'  {missing} products had no snapshot yet and start their ledger now')
+        self.stdout.write(self.style.SUCCESS(f'✅ Snapshotted stock for {count} products'))
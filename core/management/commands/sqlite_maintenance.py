@@ -0,0 +1,49 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from core.sqlite import checkpoint, get_pragma, optimize
+
+
+class Command(BaseCommand):
+    help = 'Checkpoint the SQLite WAL and refresh planner statistics, once or every --interval seconds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'], default='TRUNCATE',
+                            help='wal_checkpoint mode (default: TRUNCATE, which also shrinks the -wal file)')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Repeat every N seconds until interrupted (default: run once)')
+        parser.add_argument('--database', type=str, default='default',
+                            help='Database alias (default: default)')
+
+    def _run_once(self, options):
+        using = options['database']
+        wal_path = f"{connections[using].settings_dict['NAME']}-wal"
+        wal_before = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        started = time.perf_counter()
+        busy, wal_pages, checkpointed = checkpoint(options['mode'], using)
+        optimize(using)
+        elapsed = (time.perf_counter() - started) * 1000
+        wal_after = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        message = (f'Checkpointed {checkpointed}/{wal_pages} WAL pages, -wal {wal_before / 1024:.0f} KB '
+                   f'→ {wal_after / 1024:.0f} KB, optimize done in {elapsed:.0f} ms')
+        if busy:
+            self.stdout.write(self.style.WARNING(f'⚠️  Checkpoint blocked by active readers/writers. {message}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {message}'))
+        # Don't hold the connection (and a read snapshot) between runs
+        connections[using].close()
+
+    def handle(self, *args, **options):
+        if connections[options['database']].vendor != 'sqlite':
+            raise CommandError('sqlite_maintenance only applies to SQLite databases')
+        journal_mode = get_pragma('journal_mode', options['database'])
+        if journal_mode.lower() != 'wal':
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  Journal mode is {journal_mode}, not WAL; set SQLITE_PERFORMANCE_MODE=true to enable it'
+            ))
+
+        self._run_once(options)
+        while options['interval'] > 0:
+            time.sleep(options['interval'])
+            self._run_once(options)
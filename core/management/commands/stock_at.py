@@ -0,0 +1,30 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Product
+from core.stock import stock_at
+
+
+class Command(BaseCommand):
+    help = 'Show what each product\'s stock was at a given time, from the stock ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('when', help='Date and time, e.g. "2026-10-19 10:00" (local time)')
+        parser.add_argument('--product', type=str, help='Only products whose name contains this')
+
+    def handle(self, *args, **options):
+        try:
+            when = datetime.fromisoformat(options['when'])
+        except ValueError:
+            raise CommandError(f'Not a date/time: {options["when"]}')
+        if timezone.is_naive(when):
+            when = timezone.make_aware(when)
+
+        products = Product.objects.filter(is_archived=False).order_by('name')
+        if options['product']:
+            products = products.filter(name__icontains=options['product'])
+        self.stdout.write(f"📦 Stock at {timezone.localtime(when):%Y-%m-%d %H:%M}")
+        for product in products:
+            then = stock_at(product, when)
+            self.stdout.write(f"  {product.name:<40} {'-' if then is None else then:>6}  (now {product.stock})")
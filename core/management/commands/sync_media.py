@@ -0,0 +1,141 @@
+import hashlib
+import json
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.fragments import bump_catalog
+from core.models import Product
+from core.uploads import post_image_with_retries, UploadError
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Upload local media to ImgBB concurrently, skipping files already in the manifest, and repoint products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', type=str,
+                            help='Directory to sync (default: MEDIA_ROOT/products)')
+        parser.add_argument('--manifest', type=str, default='data_export/media_manifest.json',
+                            help='JSON manifest of already-uploaded files (default: data_export/media_manifest.json)')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Number of concurrent uploads (default: 8)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report which files would be uploaded')
+
+    def handle(self, *args, **options):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        if options['dir']:
+            media_dir = Path(options['dir'])
+        elif getattr(settings, 'MEDIA_ROOT', None):
+            media_dir = Path(settings.MEDIA_ROOT) / 'products'
+        else:
+            raise CommandError('MEDIA_ROOT is not set (Cloudinary storage?); pass --dir')
+        if not media_dir.is_dir():
+            raise CommandError(f'Directory not found: {media_dir}')
+        media_root = Path(getattr(settings, 'MEDIA_ROOT', None) or media_dir)
+
+        manifest_path = Path(options['manifest'])
+        manifest = {}
+        if manifest_path.exists():
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+        # sha256 -> [paths]; identical files are uploaded once
+        local_files = {}
+        for path in sorted(media_dir.rglob('*')):
+            if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS:
+                local_files.setdefault(file_sha256(path), []).append(path)
+
+        pending = {h: paths for h, paths in local_files.items() if h not in manifest}
+        self.stdout.write(f'Found {len(local_files)} unique images, {len(pending)} to upload')
+        if options['dry_run']:
+            for paths in pending.values():
+                self.stdout.write(f'  {paths[0]}')
+            return
+
+        if pending:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=options['workers'])
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+
+            def upload(digest, path):
+                content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+                return digest, post_image_with_retries(path, path.name, content_type, session=session)
+
+            failed = 0
+            try:
+                with session, ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                    futures = {pool.submit(upload, digest, paths[0]): paths for digest, paths in pending.items()}
+                    for future in as_completed(futures):
+                        paths = futures[future]
+                        try:
+                            digest, url = future.result()
+                        except UploadError as e:
+                            failed += 1
+                            self.stdout.write(self.style.ERROR(f'❌ {paths[0].name}: {e}'))
+                            continue
+                        except Exception as e:
+                            failed += 1
+                            self.stdout.write(self.style.ERROR(f'❌ {paths[0].name}: {type(e).__name__}: {e}'))
+                            continue
+                        manifest[digest] = {'url': url, 'files': [p.name for p in paths]}
+                        self.stdout.write(self.style.SUCCESS(f'✅ {paths[0].name} → {url}'))
+            finally:
+                # Even if the run is cut short, keep what was uploaded so the next run skips it
+                manifest_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(manifest_path, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, indent=2)
+                self.stdout.write(f'📁 Manifest saved to {manifest_path}')
+            if failed:
+                self.stdout.write(self.style.WARNING(f'⚠️  {failed} uploads failed; run again to retry'))
+
+        # Repoint products that still reference a local copy of an uploaded file
+        url_by_name = {}
+        hash_by_name = {}
+        for digest, paths in local_files.items():
+            if digest in manifest:
+                for path in paths:
+                    names = {path.relative_to(media_dir).as_posix()}
+                    if path.is_relative_to(media_root):
+                        names.add(path.relative_to(media_root).as_posix())
+                    for name in names:
+                        url_by_name[name] = manifest[digest]['url']
+                        hash_by_name[name] = digest
+
+        media_prefix = '/' + settings.MEDIA_URL.lstrip('/')
+        now = timezone.now()
+        to_update = []
+        for product in Product.objects.exclude(image__isnull=True).exclude(image=''):
+            name = product.image
+            if name.startswith(media_prefix):
+                name = name[len(media_prefix):]
+            name = name.lstrip('/')
+            if name in url_by_name:
+                product.image = url_by_name[name]
+                # Derivatives built from the same bytes stay valid for the new URL
+                if product.image_variants.get('hash') == hash_by_name[name]:
+                    product.image_variants['source'] = product.image
+                # bulk_update skips auto_now; the catalog ETag and POS grid depend on it changing
+                product.updated_at = now
+                to_update.append(product)
+
+        Product.objects.bulk_update(to_update, ['image', 'image_variants', 'updated_at'], batch_size=500)
+        if to_update:
+            bump_catalog()
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'Updated {len(to_update)} products'))
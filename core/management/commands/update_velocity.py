@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core.velocity import low_stock, rebuild, roll_all
+
+
+class Command(BaseCommand):
+    help = 'Roll sales velocities and reorder points forward to today (run nightly), or rebuild them from sales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute every product from the sales history instead of rolling forward')
+        parser.add_argument('--days', type=int, default=56,
+                            help='Days of sales history to rebuild from (default: 56)')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = rebuild(days=options['days'])
+            self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt velocity for {count} products from {options['days']} days of sales"))
+        else:
+            count = roll_all()
+            self.stdout.write(self.style.SUCCESS(f'✅ Rolled velocity forward for {count} products'))
+
+        alerts = low_stock()
+        for v in alerts:
+            cover = f'{v.days_of_cover:.1f} days left' if v.days_of_cover is not None else 'not selling'
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ {v.product.name}: {v.available} in stock, reorder at {v.reorder_point} ({cover})'))
+        if not alerts:
+            self.stdout.write('  No products are low on stock')
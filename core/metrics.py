@@ -0,0 +1,210 @@
+"""
+In-process request metrics: latency and SQL histograms per URL name.
+
+RequestMetricsMiddleware records every request into a process-wide Registry,
+which the admin-only metrics view renders in the Prometheus text format.
+Counts are per worker process; a scraper sums them across instances.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+slow_logger = logging.getLogger('core.slow_requests')
+
+# Upper bounds (le) of the histogram buckets; +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """Cumulative-at-render histogram: one bucket increment per observation"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def cumulative(self):
+        total = 0
+        for le, n in zip(self.buckets + ('+Inf',), self.counts):
+            total += n
+            yield le, total
+
+
+class ViewStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.query_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+
+class Registry:
+    """Aggregates keyed by (url_name, method); a single lock keeps updates cheap and consistent"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self.started_at = time.time()
+
+    def observe(self, view, method, status, seconds, queries, query_seconds, size):
+        status_class = f'{status // 100}xx'
+        with self._lock:
+            stats = self._views.get((view, method))
+            if stats is None:
+                stats = self._views[(view, method)] = ViewStats()
+            stats.latency.observe(seconds)
+            stats.queries.observe(queries)
+            stats.query_seconds += query_seconds
+            stats.response_bytes += size
+            stats.statuses[status_class] = stats.statuses.get(status_class, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+            self.started_at = time.time()
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = []
+
+            def histogram(name, help_text, attr):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (view, method), stats in views:
+                    h = getattr(stats, attr)
+                    labels = f'view="{_escape(view)}",method="{method}"'
+                    for le, total in h.cumulative():
+                        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {total}')
+                    lines.append(f'{name}_sum{{{labels}}} {h.sum:.6f}')
+                    lines.append(f'{name}_count{{{labels}}} {h.count}')
+
+            def counter(name, help_text, value):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for (view, method), stats in views:
+                    lines.append(f'{name}{{view="{_escape(view)}",method="{method}"}} {value(stats)}')
+
+            histogram('bakery_request_duration_seconds', 'Request latency by URL name.', 'latency')
+            histogram('bakery_request_db_queries', 'SQL queries per request by URL name.', 'queries')
+            counter('bakery_request_db_seconds_total', 'Time spent in SQL by URL name.',
+                    lambda s: f'{s.query_seconds:.6f}')
+            counter('bakery_response_bytes_total', 'Response body bytes by URL name.',
+                    lambda s: s.response_bytes)
+
+            lines.append('# HELP bakery_requests_total Requests by URL name and status class.')
+            lines.append('# TYPE bakery_requests_total counter')
+            for (view, method), stats in views:
+                for status_class, n in sorted(stats.statuses.items()):
+                    lines.append(f'bakery_requests_total{{view="{_escape(view)}",method="{method}",'
+                                 f'status="{status_class}"}} {n}')
+
+            lines.append('# HELP bakery_metrics_start_time_seconds When these in-process aggregates started.')
+            lines.append('# TYPE bakery_metrics_start_time_seconds gauge')
+            lines.append(f'bakery_metrics_start_time_seconds {self.started_at:.3f}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+class QueryTimer:
+    """connection.execute_wrapper that counts queries and the time spent in them"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    if match.url_name:
+        return f'{match.namespace}:{match.url_name}' if match.namespace else match.url_name
+    return match.view_name or '<unnamed>'
+
+
+def _response_size(response):
+    if response.streaming:
+        # Not buffered, so only known when the view set Content-Length
+        return int(response.get('Content-Length') or 0)
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    """Records latency, SQL query count/time and response size for each request"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = settings.SLOW_REQUEST_MS
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with self._timing(timer):
+            response = self.get_response(request)
+        self._record(request, response, timer, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with self._timing(timer):
+            response = await self.get_response(request)
+        self._record(request, response, timer, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def _timing(timer):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        return stack
+
+    def _record(self, request, response, timer, seconds):
+        view = _view_name(request)
+        size = _response_size(response)
+        registry.observe(view, request.method, response.status_code, seconds, timer.count, timer.seconds, size)
+
+        if self.slow_ms and seconds * 1000 >= self.slow_ms:
+            slow_logger.warning(
+                'Slow request %s %s (%s) %d in %.0f ms: %d queries in %.0f ms, %d bytes',
+                request.method, request.get_full_path(), view, response.status_code,
+                seconds * 1000, timer.count, timer.seconds * 1000, size,
+            )
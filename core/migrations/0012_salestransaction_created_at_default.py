@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='salestransaction',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def batches_from_stock(apps, schema_editor):
+    # Today's stock becomes one batch per product with the product's expiration date
+    Product = apps.get_model('core', 'Product')
+    ProductBatch = apps.get_model('core', 'ProductBatch')
+    ProductBatch.objects.bulk_create(
+        [ProductBatch(product_id=pk, quantity=stock, baked_at=created_at, expires_at=expiration_date)
+         for pk, stock, created_at, expiration_date
+         in Product.objects.filter(stock__gt=0).values_list('pk', 'stock', 'created_at', 'expiration_date').iterator()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('baked_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateField(blank=True, db_index=True, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='core.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'expires_at'], name='core_produc_product_428054_idx')],
+            },
+        ),
+        migrations.RunPython(batches_from_stock, migrations.RunPython.noop),
+    ]
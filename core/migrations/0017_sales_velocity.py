@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_product_batches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesVelocity',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='velocity', serialize=False, to='core.product')),
+                ('day', models.DateField()),
+                ('units_today', models.PositiveIntegerField(default=0)),
+                ('rate', models.FloatField(default=0)),
+                ('variance', models.FloatField(default=0)),
+                ('reorder_point', models.PositiveIntegerField(db_index=True, default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Sales Velocities',
+            },
+        ),
+    ]
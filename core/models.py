@@ -14,6 +14,8 @@ class Product(models.Model):
 
     # Product image (can be local file or Cloudinary URL)
     image = models.CharField(max_length=500, blank=True, null=True)
+    # Content-hashed thumbnail/medium renditions of `image`, see core.images.build_derivatives
+    image_variants = models.JSONField(default=dict, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -21,6 +23,24 @@ class Product(models.Model):
     def __str__(self):
         return self.name
     
+    def _image_srcset(self, fmt):
+        return ', '.join(
+            f"{self.image_variants[name][fmt]} {self.image_variants[name]['width']}w"
+            for name in ('thumb', 'medium') if name in self.image_variants
+        )
+
+    def image_thumb_url(self):
+        """Returns the JPEG thumbnail URL, or the original image if no derivatives exist"""
+        if 'thumb' in self.image_variants:
+            return self.image_variants['thumb']['jpeg']
+        return self.image
+
+    def image_srcset_webp(self):
+        return self._image_srcset('webp')
+
+    def image_srcset_jpeg(self):
+        return self._image_srcset('jpeg')
+
     def get_expiration_status(self):
         """Returns expiration status: 'expired', 'today', 'future', or None"""
         if not self.expiration_date:
@@ -52,7 +72,11 @@ class SalesTransaction(models.Model):
     total_amount = models.DecimalField(max_digits=12, decimal_places=2)
     discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS, default='CASH')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Shown on the receipt; kept on the sale rather than in the cashier's session
+    cash_received = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    change_given = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # A default instead of auto_now_add so bulk loads (seed_demo) can set historical timestamps
+    created_at = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
 
     def __str__(self):
         return f"Sale #{self.pk} - {self.created_at:%Y-%m-%d %H:%M}"
@@ -69,16 +93,32 @@ class SalesItem(models.Model):
         return f"{self.product} x {self.qty}"
 
 
+class CartLine(models.Model):
+    """One product in a cashier's open cart, shared by all their sessions; prices come from the catalog at checkout"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart_lines')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    qty = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = [('user', 'product')]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.product_id} x {self.qty}"
+
+
 class LoginHistory(models.Model):
     """Track login history for cashiers and admins"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_history')
-    login_time = models.DateTimeField(auto_now_add=True)
+    # A default instead of auto_now_add so core.audit can keep the time the login happened
+    login_time = models.DateTimeField(default=timezone.now)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.CharField(max_length=255, blank=True)
     logout_time = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-login_time']
+        # Finding a user's latest open login at logout
+        indexes = [models.Index(fields=['user', 'logout_time', 'login_time'])]
         verbose_name_plural = 'Login Histories'
     
     def __str__(self):
@@ -94,3 +134,150 @@ class UserProfile(models.Model):
     
     def __str__(self):
         return f"{self.user.username}'s Profile"
+
+
+class ArchivedSalesTransaction(models.Model):
+    """Cold copy of a SalesTransaction moved out of the hot table by archive_sales"""
+    # Keeps the original sale id so receipts and links keep resolving after archiving
+    id = models.BigIntegerField(primary_key=True)
+    cashier = models.ForeignKey(User, on_delete=models.PROTECT, related_name='archived_sales')
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payment_method = models.CharField(max_length=20, default='CASH')
+    cash_received = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    change_given = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField(db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived Sale #{self.pk} - {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class ArchivedSalesItem(models.Model):
+    """Cold copy of a SalesItem belonging to an ArchivedSalesTransaction"""
+    id = models.BigIntegerField(primary_key=True)
+    sale = models.ForeignKey(ArchivedSalesTransaction, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='archived_sales_items')
+    qty = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.product} x {self.qty}"
+
+
+class DailySalesSummary(models.Model):
+    """Per-day totals for archived sales, used by reports once the raw rows are cold"""
+    date = models.DateField(unique=True)
+    orders = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'Daily Sales Summaries'
+
+    def __str__(self):
+        return f"{self.date}: {self.orders} orders"
+
+
+class DailyProductSummary(models.Model):
+    """Per-day, per-product totals for archived sales"""
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='daily_summaries')
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = [('date', 'product')]
+        verbose_name_plural = 'Daily Product Summaries'
+
+    def __str__(self):
+        return f"{self.date}: {self.product} x {self.quantity}"
+
+
+class ProductBatch(models.Model):
+    """One bake of a product; stock is sold first-expired-first-out across batches, see core.batches"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='batches')
+    # Units left; expired batches are written off to 0 by expire_batches
+    quantity = models.PositiveIntegerField()
+    baked_at = models.DateTimeField(default=timezone.now)
+    # Last day the batch can be sold; empty for products that don't expire
+    expires_at = models.DateField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        # FEFO allocation and per-product availability
+        indexes = [models.Index(fields=['product', 'expires_at'])]
+
+    def __str__(self):
+        return f"{self.product_id} baked {self.baked_at:%Y-%m-%d}: {self.quantity}"
+
+
+class StockMovement(models.Model):
+    """Append-only ledger of every change to Product.stock; see core.stock"""
+    SALE = 'SALE'
+    RESTOCK = 'RESTOCK'
+    ADJUSTMENT = 'ADJUSTMENT'
+    WASTE = 'WASTE'
+    KINDS = (
+        (SALE, 'Sale'),
+        (RESTOCK, 'Restock'),
+        (ADJUSTMENT, 'Adjustment'),
+        (WASTE, 'Waste'),
+    )
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    kind = models.CharField(max_length=10, choices=KINDS)
+    # Signed: negative for sales and waste
+    quantity = models.IntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    # No database constraint, so the id keeps pointing at the sale after archive_sales moves it
+    sale = models.ForeignKey(SalesTransaction, on_delete=models.DO_NOTHING, db_constraint=False,
+                             null=True, blank=True, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    note = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        # Range sums after a snapshot in stock_at
+        indexes = [models.Index(fields=['product', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.product_id}: {self.quantity:+d}"
+
+
+class StockSnapshot(models.Model):
+    """A product's stock at a point in time, so stock_at only sums the ledger since the latest one"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    taken_at = models.DateTimeField()
+    stock = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['product', 'taken_at'])]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.taken_at:%Y-%m-%d %H:%M}: {self.stock}"
+
+
+class SalesVelocity(models.Model):
+    """A product's exponentially weighted daily sales and reorder point, kept current by checkout (core.velocity)"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='velocity')
+    day = models.DateField()  # the day units_today counts; earlier days are folded into rate
+    units_today = models.PositiveIntegerField(default=0)
+    rate = models.FloatField(default=0)  # units per day
+    variance = models.FloatField(default=0)
+    reorder_point = models.PositiveIntegerField(default=0, db_index=True)
+
+    class Meta:
+        verbose_name_plural = 'Sales Velocities'
+
+    def __str__(self):
+        return f"{self.product_id}: {self.rate:.1f}/day, reorder at {self.reorder_point}"
+
+    @property
+    def days_of_cover(self):
+        """Days the product's stock (unexpired, as low_stock() annotates it) lasts at this rate, or None if not selling"""
+        stock = getattr(self, 'available', None)
+        if stock is None:
+            stock = self.product.stock
+        return stock / self.rate if self.rate else None
@@ -1,18 +1,45 @@
 import csv
-from io import StringIO
+import heapq
+from itertools import groupby
+from django.db import router
 from django.db.models import Sum, F
 from .models import SalesItem
+from .archive import archived_daily_totals
 
-def sales_csv(start, end, granularity='daily'):
-    # Build CSV string of date,revenue,qty
-    qs = SalesItem.objects.filter(sale__created_at__date__gte=start,
-                                  sale__created_at__date__lte=end)
+
+class _Echo:
+    """Pseudo-buffer whose write() returns the line, so csv.writer can feed a generator"""
+    def write(self, value):
+        return value
+
+
+def sales_csv_lines(start, end, granularity='daily'):
+    """
+    CSV lines of date,revenue,qty, yielded as the daily rows are read.
+
+    The database and the archived days are resolved now, while the caller's
+    read routing (use_analytics_db) is in effect; the rows themselves are read
+    when the returned generator is consumed, e.g. by a StreamingHttpResponse.
+    """
+    qs = SalesItem.objects.using(router.db_for_read(SalesItem)).filter(
+        sale__created_at__date__gte=start, sale__created_at__date__lte=end)
     agg = (qs.values('sale__created_at__date')
              .annotate(revenue=Sum(F('line_total')), qty=Sum('qty'))
              .order_by('sale__created_at__date'))
-    buf = StringIO()
-    writer = csv.writer(buf)
-    writer.writerow(['Date','Revenue','Quantity'])
-    for r in agg:
-        writer.writerow([r['sale__created_at__date'], float(r['revenue'] or 0), int(r['qty'] or 0)])
-    return buf.getvalue()
+    # Days that archive_sales has rolled up into summaries
+    archived = sorted((day, s['revenue'], s['quantity']) for day, s in archived_daily_totals(start, end).items())
+
+    def lines():
+        writer = csv.writer(_Echo())
+        yield writer.writerow(['Date', 'Revenue', 'Quantity'])
+        hot = ((r['sale__created_at__date'], float(r['revenue'] or 0), int(r['qty'] or 0)) for r in agg.iterator())
+        for day, rows in groupby(heapq.merge(hot, archived), key=lambda row: row[0]):
+            rows = list(rows)
+            yield writer.writerow([day, sum(r[1] for r in rows), sum(r[2] for r in rows)])
+
+    return lines()
+
+
+def sales_csv(start, end, granularity='daily'):
+    # Build CSV string of date,revenue,qty
+    return ''.join(sales_csv_lines(start, end, granularity))
@@ -0,0 +1,105 @@
+"""
+Send analytics reads to an optional replica / analytics database.
+
+Views decorated with use_analytics_db (reports, forecast, exports, dashboard
+aggregates) read from the 'analytics' alias when ANALYTICS_DATABASE_URL is
+configured; everything else, and every write, uses 'default'. A cashier who
+just checked out is pinned to the primary for ANALYTICS_PIN_SECONDS so their
+own sale isn't missing from a lagging replica, and read_from_primary forces
+the primary for pages that must see a write immediately (the receipt).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+
+ANALYTICS_DB = 'analytics'
+PIN_SESSION_KEY = '_db_primary_until'
+
+# Propagates into sync_to_async threads, so async views route the same way
+_route = ContextVar('core_db_route', default=None)
+
+
+def analytics_db_configured():
+    return ANALYTICS_DB in settings.DATABASES
+
+
+@contextmanager
+def analytics_reads():
+    token = _route.set('analytics')
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    token = _route.set('primary')
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def pin_to_primary(request):
+    """Read from the primary for this session for a while, e.g. right after a sale"""
+    request.session[PIN_SESSION_KEY] = time.time() + settings.ANALYTICS_PIN_SECONDS
+
+
+def _is_pinned(pinned_until):
+    return bool(pinned_until) and pinned_until > time.time()
+
+
+def _route_view(view, reads, check_pin):
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if check_pin and _is_pinned(await request.session.aget(PIN_SESSION_KEY)):
+                return await view(request, *args, **kwargs)
+            with reads():
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if check_pin and _is_pinned(request.session.get(PIN_SESSION_KEY)):
+            return view(request, *args, **kwargs)
+        with reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def use_analytics_db(view):
+    """Route the view's reads to the analytics database unless the session is pinned to the primary"""
+    return _route_view(view, analytics_reads, check_pin=True)
+
+
+def read_from_primary(view):
+    """Always read from the primary, e.g. for a page showing a row that was just written"""
+    return _route_view(view, primary_reads, check_pin=False)
+
+
+class AnalyticsRouter:
+    def db_for_read(self, model, **hints):
+        route = _route.get()
+        if route == 'analytics' and analytics_db_configured():
+            return ANALYTICS_DB
+        if route == 'primary':
+            return 'default'
+        return None  # Django's default: the instance's database, else 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data (replica or copy), so relations across them are fine
+        return {obj1._state.db, obj2._state.db} <= {'default', ANALYTICS_DB}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A read-only replica gets its schema through replication; a separate analytics
+        # database (or a local SQLite copy) can still be migrated with --database analytics
+        return None
@@ -1,11 +1,14 @@
 from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import LoginHistory
-from django.utils import timezone
+from .audit import get_login_audit
+from .fragments import bump_catalog, bump_sales
+from .models import Product, SalesTransaction
 
 @receiver(user_logged_in)
 def log_user_login(sender, request, user, **kwargs):
-    """Record login history when a user logs in"""
+    """Queue a login history record when a user logs in (written in batches by core.audit)"""
     ip_address = None
     user_agent = ''
     
@@ -20,23 +23,21 @@ def log_user_login(sender, request, user, **kwargs):
         # Get user agent
         user_agent = request.META.get('HTTP_USER_AGENT', '')[:255]
     
-    LoginHistory.objects.create(
-        user=user,
-        ip_address=ip_address,
-        user_agent=user_agent
-    )
+    get_login_audit().record_login(user.pk, ip_address=ip_address, user_agent=user_agent)
 
 @receiver(user_logged_out)
 def log_user_logout(sender, request, user, **kwargs):
-    """Record logout time when a user logs out"""
+    """Queue the logout time; the flush closes the user's most recent open login"""
     if user:
-        # Update the most recent login record for this user that doesn't have a logout time
-        latest_login = LoginHistory.objects.filter(
-            user=user,
-            logout_time__isnull=True
-        ).order_by('-login_time').first()
-        
-        if latest_login:
-            latest_login.logout_time = timezone.now()
-            latest_login.save()
+        get_login_audit().record_logout(user.pk)
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_catalog_fragments(sender, **kwargs):
+    """Product edits, archiving and deletes change the cached POS grid"""
+    # After commit, so no request can cache the old rows under the new version
+    transaction.on_commit(bump_catalog)
 
+@receiver(post_save, sender=SalesTransaction)
+def invalidate_sales_fragments(sender, **kwargs):
+    """A new sale changes the cached report and top-seller tables"""
+    transaction.on_commit(bump_sales)
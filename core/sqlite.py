@@ -0,0 +1,50 @@
+"""
+Opt-in SQLite tuning for stores that run on the local database.
+
+When settings.SQLITE_PERFORMANCE_MODE is on, every new SQLite connection gets
+settings.SQLITE_PRAGMAS (WAL journal, relaxed fsync, bigger cache, ...) and the
+settings give SQLite databases OPTIONS['transaction_mode'] = 'IMMEDIATE'
+(Django 5.1+), so transactions start with BEGIN IMMEDIATE. WAL lets readers continue
+while a checkout writes; IMMEDIATE takes the write lock up front, so
+concurrent writers wait on busy_timeout instead of failing with "database is
+locked" when a read transaction tries to upgrade.
+"""
+from django.conf import settings
+from django.db import connections
+
+
+def apply_pragmas(connection, pragmas):
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """connection_created receiver, registered in CoreConfig.ready()"""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PERFORMANCE_MODE:
+        return
+    apply_pragmas(connection, settings.SQLITE_PRAGMAS)
+
+
+def set_transaction_mode(mode, using='default'):
+    """Start the transactions of connections opened from now on with BEGIN `mode` (None for SQLite's DEFERRED)"""
+    connections[using].settings_dict.setdefault('OPTIONS', {})['transaction_mode'] = mode
+
+
+def get_pragma(name, using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+def checkpoint(mode='TRUNCATE', using='default'):
+    """Copy the WAL back into the database file; returns (busy, wal_pages, checkpointed_pages)"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'PRAGMA wal_checkpoint({mode})')
+        return tuple(cursor.fetchone())
+
+
+def optimize(using='default'):
+    """Let SQLite refresh query planner statistics where it thinks they are stale"""
+    with connections[using].cursor() as cursor:
+        cursor.execute('PRAGMA optimize')
@@ -0,0 +1,89 @@
+"""
+Stock ledger.
+
+Every change to Product.stock is also written as an append-only StockMovement
+(sale, restock, adjustment, waste) in the same transaction, so stock can be
+audited and reconstructed for any moment. snapshot_stock periodically stores
+each product's stock as a StockSnapshot; stock_at() then reads the latest
+snapshot before the requested time and sums only the movements after it, one
+short range on the (product, created_at) index instead of a replay of the ledger.
+"""
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from .models import Product, StockMovement, StockSnapshot
+
+
+def record(movements):
+    StockMovement.objects.bulk_create(movements, batch_size=500)
+
+
+def sale_movements(sale, cart):
+    """Ledger rows for a sale; cart is {product_id: qty}"""
+    return [
+        StockMovement(product_id=pid, kind=StockMovement.SALE, quantity=-qty, sale=sale,
+                      user_id=sale.cashier_id, created_at=sale.created_at)
+        for pid, qty in cart.items()
+    ]
+
+
+def stock_change(product, previous, kind=None, user=None, note=''):
+    """The movement for product.stock having been set from `previous`, or None if it did not change"""
+    delta = product.stock - previous
+    if not delta:
+        return None
+    if not kind:
+        kind = StockMovement.RESTOCK if delta > 0 else StockMovement.ADJUSTMENT
+    return StockMovement(product=product, kind=kind, quantity=delta, user=user, note=note)
+
+
+def record_new_products(products, user=None, note='Opening stock'):
+    """Start the ledger of newly created products: a zero snapshot at creation plus a restock of their stock"""
+    StockSnapshot.objects.bulk_create(
+        [StockSnapshot(product=p, taken_at=p.created_at, stock=0) for p in products], batch_size=500)
+    record([m for m in (stock_change(p, 0, user=user, note=note) for p in products) if m])
+
+
+def ledger_balances(product_ids=None):
+    """
+    {product_id: stock according to the ledger}: each product's latest snapshot
+    plus the movements since, in one query. Products without a snapshot are left out.
+    """
+    latest = StockSnapshot.objects.filter(product=OuterRef('pk')).order_by('-taken_at')
+    moved = (StockMovement.objects.filter(product=OuterRef('pk'), created_at__gt=OuterRef('snapshot_at'))
+             .values('product').annotate(total=Sum('quantity')).values('total'))
+    qs = Product.objects.all() if product_ids is None else Product.objects.filter(pk__in=product_ids)
+    rows = (qs.annotate(snapshot_at=Subquery(latest.values('taken_at')[:1]),
+                        snapshot_stock=Subquery(latest.values('stock')[:1]))
+              .annotate(moved=Subquery(moved))
+              .filter(snapshot_at__isnull=False)
+              .values_list('pk', 'snapshot_stock', 'moved'))
+    return {pk: stock + (moved or 0) for pk, stock, moved in rows}
+
+
+def take_snapshots(product_ids=None):
+    """Snapshot the current stock of every product (or of product_ids); returns how many were written"""
+    with transaction.atomic():
+        # Locking the rows waits out in-flight checkouts, so every movement
+        # before `now` is already in the stock read here and none after it is
+        qs = Product.objects.select_for_update()
+        if product_ids is not None:
+            qs = qs.filter(pk__in=product_ids)
+        rows = list(qs.values_list('pk', 'stock'))
+        now = timezone.now()
+        StockSnapshot.objects.bulk_create(
+            [StockSnapshot(product_id=pk, taken_at=now, stock=stock) for pk, stock in rows], batch_size=500)
+    return len(rows)
+
+
+def stock_at(product, when):
+    """Stock of `product` at `when`, or None if that is before its ledger started"""
+    snapshot = (StockSnapshot.objects.filter(product=product, taken_at__lte=when)
+                .order_by('-taken_at').values_list('taken_at', 'stock').first())
+    if snapshot is None:
+        return None
+    taken_at, stock = snapshot
+    moved = (StockMovement.objects.filter(product=product, created_at__gt=taken_at, created_at__lte=when)
+             .aggregate(total=Sum('quantity'))['total'])
+    return stock + (moved or 0)
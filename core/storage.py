@@ -0,0 +1,94 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+from django.utils.functional import LazyObject
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Content-hashed, gzip/brotli-compressed static files (collectstatic).
+
+    WhiteNoise serves the hashed names with far-future cache headers. Until
+    collectstatic has written the manifest (e.g. a deploy that skipped it),
+    {% static %} falls back to the plain file name instead of raising.
+    """
+    manifest_strict = False
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise  # collectstatic itself must see every file
+            return name
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Local media storage that names files after the SHA-256 of their content.
+
+    Files live at ``ab/cd/<sha256><ext>``, so saving the same bytes twice
+    returns the existing file, and a name never changes content. That makes
+    it safe to serve them with immutable, far-future cache headers
+    (see core.views.cas_media).
+    """
+    def __init__(self, location=None, base_url=None, **kwargs):
+        super().__init__(
+            location=location or settings.MEDIA_CAS_ROOT,
+            base_url=base_url or settings.MEDIA_CAS_URL,
+            **kwargs,
+        )
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is derived from the content in _save
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        ext = os.path.splitext(name)[1].lower()
+        cas_name = f'{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+        full_path = self.path(cas_name)
+        if os.path.exists(full_path):
+            return cas_name
+
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file and rename so concurrent saves of the same bytes never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    f.write(chunk)
+            os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+            os.replace(tmp_path, full_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return cas_name
+
+    @staticmethod
+    def digest_for(name):
+        """Return the content hash encoded in a stored name"""
+        return os.path.splitext(os.path.basename(name))[0]
+
+
+class _CASStorage(LazyObject):
+    def _setup(self):
+        self._wrapped = ContentAddressedStorage()
+
+
+cas_storage = _CASStorage()
+
+
+def get_derivative_storage():
+    """Storage for generated image renditions: content-addressed locally, default storage otherwise"""
+    return cas_storage if settings.MEDIA_CAS_ENABLED else default_storage
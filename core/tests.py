@@ -0,0 +1,1325 @@
+"""
+Query and time budgets for every URL in alvarez_bakery/urls.py.
+
+Each view is requested against a seeded dataset and must stay within its
+maximum query count and a rough time budget. The same request is then
+repeated after the dataset has grown; a view whose query count grows with
+the data has a per-row (N+1) query, and the failure shows a diff of the
+SQL it issued before and after.
+"""
+import asyncio
+import difflib
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from django.utils.functional import empty
+
+from .models import (
+    Product, SalesTransaction, SalesItem, LoginHistory, UserProfile, CartLine,
+    ArchivedSalesTransaction, ArchivedSalesItem, DailySalesSummary, DailyProductSummary,
+    StockMovement, StockSnapshot, ProductBatch, SalesVelocity,
+)
+from . import batches, cart as cart_store, compression, images, routers, stock, velocity
+from .archive import get_sale
+from .audit import LoginAuditBuffer
+from .logs import (
+    JsonFormatter, RequestIdFilter, RequestIdMiddleware, SamplingFilter, StreamLogHandler, request_id,
+)
+from .management.commands import load_test_pos, sync_media
+from .metrics import LATENCY_BUCKETS, Registry, RequestMetricsMiddleware, registry as metrics_registry
+from .storage import cas_storage
+from .uploads import UploadQueue
+
+DEFAULT_TIME_BUDGET = 1.0  # seconds; generous, only catches pathological slowdowns
+
+# url name -> (method, max queries, user). Request details are built in BudgetTests._request.
+BUDGETS = {
+    'login': ('GET', 0, None),
+    'logout': ('POST', 6, 'cashier'),
+    'home': ('GET', 12, 'admin'),
+    'product_list': ('GET', 5, 'admin'),
+    'product_create': ('GET', 3, 'admin'),
+    'product_edit': ('GET', 4, 'admin'),
+    'product_delete': ('GET', 6, 'admin'),
+    'product_restore': ('POST', 4, 'admin'),
+    'pos': ('GET', 5, 'cashier'),
+    'add_to_cart': ('POST', 8, 'cashier'),
+    'update_cart': ('POST', 6, 'cashier'),
+    'checkout': ('POST', 18, 'cashier'),
+    'receipt': ('GET', 6, 'cashier'),
+    'forecast': ('GET', 11, 'admin'),
+    'reports': ('GET', 6, 'admin'),
+    'reports_export_csv': ('GET', 4, 'admin'),
+    'cashier_list': ('GET', 4, 'admin'),
+    'cashier_create': ('GET', 3, 'admin'),
+    'cashier_login_history': ('GET', 5, 'admin'),
+    'profile': ('GET', 4, 'cashier'),
+    'upload_image': ('GET', 2, 'admin'),
+    'upload_image_status': ('GET', 2, 'admin'),
+    'api_dashboard': ('GET', 9, 'admin'),
+    'api_reports': ('GET', 4, 'admin'),
+    'api_forecast': ('GET', 10, 'admin'),
+    'api_catalog': ('GET', 3, 'cashier'),
+    'metrics': ('GET', 2, 'admin'),
+    'cas_media': ('GET', 0, None),
+}
+
+# Views that aren't measured against per-row growth because they don't list rows
+SCALE_EXEMPT = {'login', 'cas_media', 'upload_image', 'upload_image_status', 'metrics'}
+
+
+def named_url_patterns(patterns=None, namespace=None):
+    """Names of every URL pattern in the project, skipping the admin site"""
+    for pattern in patterns if patterns is not None else get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace == 'admin':
+                continue
+            yield from named_url_patterns(pattern.url_patterns, pattern.namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield f'{namespace}:{pattern.name}' if namespace else pattern.name
+
+
+def normalize_sql(sql):
+    """Replace literals so queries that differ only by parameters compare equal"""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    return re.sub(r'IN \((?:\?, )*\?\)', 'IN (...)', sql)
+
+
+def format_queries(queries):
+    """Numbered SQL listing, with statements repeated under different parameters flagged"""
+    repeats = Counter(normalize_sql(q) for q in queries)
+    lines = []
+    for i, sql in enumerate(queries, 1):
+        count = repeats[normalize_sql(sql)]
+        flag = f'  [x{count} same shape]' if count > 1 else ''
+        lines.append(f'{i:>3}. {sql}{flag}')
+    return '\n'.join(lines)
+
+
+class StandInServer:
+    """
+    A local HTTP server standing in for a remote host (the image host, a media URL).
+    `respond(handler, body)` returns (status, headers, payload) for each request;
+    every request is kept in `requests` as (method, path, headers, body).
+    """
+
+    def __init__(self, respond):
+        self.requests = []
+        requests = self.requests
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                requests.append((self.command, self.path, self.headers, body))
+                status, headers, payload = respond(self, body)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(payload)
+
+            do_GET = do_HEAD = do_POST = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0)
+class BudgetTests(TestCase):
+    databases = '__all__'  # analytics views read the 'analytics' alias when it is configured
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        now = timezone.now()
+        cls.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        cls.cashiers = [User.objects.create_user(f'cashier{i}', password='pw') for i in range(3)]
+        cls.cashier = cls.cashiers[0]
+        UserProfile.objects.create(user=cls.cashier)
+
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Bread {i:02d}', price=Decimal('10.00') + i, stock=500,
+                    expiration_date=today + timedelta(days=3) if i % 2 else None)
+            for i in range(12)
+        ])
+        batches.opening_batches(cls.products)
+        cls.product = cls.products[0]
+        cls.archived_product = Product.objects.create(name='Old Bun', price=Decimal('5.00'), is_archived=True)
+
+        for i, cashier in enumerate(cls.cashiers):
+            LoginHistory.objects.bulk_create([LoginHistory(user=cashier) for _ in range(i + 2)])
+
+        cls.sales = []
+        for day in range(20):
+            for n in range(2):
+                cls.sales.append(cls._make_sale(cls.cashiers[n % 3], now - timedelta(days=day, hours=n), 3, offset=day))
+        cls.sale = cls.sales[0]
+
+        archived = ArchivedSalesTransaction.objects.create(
+            id=10_000_000, cashier=cls.cashier, total_amount=Decimal('30.00'),
+            created_at=now - timedelta(days=400),
+        )
+        ArchivedSalesItem.objects.create(id=10_000_000, sale=archived, product=cls.product, qty=3,
+                                         unit_price=Decimal('10.00'), line_total=Decimal('30.00'))
+        DailySalesSummary.objects.create(date=today - timedelta(days=45), orders=1, quantity=3,
+                                         revenue=Decimal('30.00'))
+        DailyProductSummary.objects.create(date=today - timedelta(days=45), product=cls.product,
+                                           quantity=3, revenue=Decimal('30.00'))
+        velocity.rebuild()
+        SalesVelocity.objects.filter(product__in=cls.products[:3]).update(reorder_point=600)  # on the low-stock panel
+
+    @classmethod
+    def _make_sale(cls, cashier, created_at, lines, offset=0):
+        sale = SalesTransaction.objects.create(cashier=cashier, total_amount=0)
+        items = [
+            SalesItem(sale=sale, product=cls.products[(offset + j) % len(cls.products)], qty=j + 1,
+                      unit_price=Decimal('10.00'), line_total=Decimal('10.00') * (j + 1))
+            for j in range(lines)
+        ]
+        SalesItem.objects.bulk_create(items)
+        SalesTransaction.objects.filter(pk=sale.pk).update(
+            created_at=created_at, total_amount=sum(item.line_total for item in items)
+        )
+        return sale
+
+    def _grow(self):
+        """Add rows to everything the views list, so per-row queries show up as extra SQL"""
+        now = timezone.now()
+        extra = Product.objects.bulk_create([
+            Product(name=f'Cake {i:02d}', price=Decimal('50.00'), stock=100) for i in range(10)
+        ])
+        batches.opening_batches(extra)
+        SalesVelocity.objects.bulk_create([SalesVelocity(product=p, day=date.today(), rate=5, reorder_point=150)
+                                           for p in extra])
+        self.products = list(self.products) + extra
+        for i in range(3):
+            cashier = User.objects.create_user(f'extra{i}', password='pw')
+            LoginHistory.objects.bulk_create([LoginHistory(user=cashier) for _ in range(3)])
+        LoginHistory.objects.bulk_create([LoginHistory(user=self.cashier) for _ in range(5)])
+        for n in range(8):
+            self._make_sale(self.cashiers[n % 3], now - timedelta(minutes=n), 6, offset=n)
+        SalesItem.objects.bulk_create([
+            SalesItem(sale=self.sale, product=p, qty=1, unit_price=p.price, line_total=p.price) for p in extra
+        ])
+
+    def _request(self, name, cart_size=2):
+        """Log in and prepare state for `name`, then return (method, url, data)"""
+        method, _, role = BUDGETS[name]
+        user = {'admin': self.admin, 'cashier': self.cashier, None: None}[role]
+        if user:
+            self.client.force_login(user)
+        kwargs, data = {}, {}
+        if name in ('product_edit', 'product_delete'):
+            kwargs = {'pk': self.product.pk}
+        elif name == 'product_restore':
+            kwargs = {'pk': self.archived_product.pk}
+        elif name in ('add_to_cart', 'update_cart'):
+            kwargs, data = {'product_id': self.product.pk}, {'qty': 2}
+        elif name == 'receipt':
+            kwargs = {'sale_id': self.sale.pk}
+        elif name == 'cashier_login_history':
+            kwargs = {'user_id': self.cashier.pk}
+        elif name == 'upload_image_status':
+            kwargs = {'job_id': 'missing'}
+        elif name == 'cas_media':
+            kwargs = {'path': 'ab/cd/missing.webp'}
+        elif name == 'checkout':
+            data = {'discount': '0', 'cash_received': '1000'}
+
+        if name in ('update_cart', 'checkout'):
+            CartLine.objects.filter(user=user).delete()
+            CartLine.objects.bulk_create([CartLine(user=user, product=p, qty=1) for p in self.products[:cart_size]])
+        return method, reverse(name, kwargs=kwargs), data
+
+    def _measure(self, name, **options):
+        method, url, data = self._request(name, **options)
+        cache.clear()  # budgets are for a cold fragment cache, where every view renders everything
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            if method == 'POST':
+                response = self.client.post(url, data)
+            else:
+                response = self.client.get(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)  # streamed rows are queried as they are sent
+            elapsed = time.perf_counter() - started
+        self.assertLess(response.status_code, 500, f'{name} failed with {response.status_code}')
+        return [q['sql'] for q in ctx.captured_queries], elapsed
+
+    def test_every_url_has_a_budget(self):
+        missing = sorted(set(named_url_patterns()) - set(BUDGETS))
+        self.assertEqual(missing, [], 'Add these URLs to core.tests.BUDGETS')
+
+    def test_query_and_time_budgets(self):
+        for name, (_, max_queries, _) in BUDGETS.items():
+            with self.subTest(view=name):
+                queries, elapsed = self._measure(name)
+                self.assertLessEqual(
+                    len(queries), max_queries,
+                    f'{name} issued {len(queries)} queries, budget is {max_queries}:\n{format_queries(queries)}'
+                )
+                self.assertLess(elapsed, DEFAULT_TIME_BUDGET,
+                                f'{name} took {elapsed * 1000:.0f} ms, budget is {DEFAULT_TIME_BUDGET * 1000:.0f} ms')
+                self.client.logout()
+
+    def test_query_count_does_not_grow_with_data(self):
+        names = [name for name in BUDGETS if name not in SCALE_EXEMPT]
+        before = {}
+        for name in names:
+            with self.subTest(view=name, dataset='base'):
+                before[name] = self._measure(name)[0]
+                self.client.logout()
+        self._grow()
+        for name in names:
+            with self.subTest(view=name, dataset='grown'):
+                after = self._measure(name, cart_size=8)[0]
+                self.client.logout()
+                if len(after) != len(before[name]):
+                    diff = '\n'.join(difflib.unified_diff(
+                        [normalize_sql(q) for q in before[name]], [normalize_sql(q) for q in after],
+                        'before', 'after', lineterm='',
+                    ))
+                    self.fail(f'{name} went from {len(before[name])} to {len(after)} queries as the data grew; '
+                              f'likely a per-row query:\n{diff}')
+
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0)
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        cls.bread = Product.objects.create(name='Pandesal', price=Decimal('3.00'), stock=50)
+        cls.pie = Product.objects.create(name='Egg Pie', price=Decimal('45.00'), stock=5)
+
+    def _sale(self, created_at, *lines):
+        sale = SalesTransaction.objects.create(cashier=self.admin, total_amount=Decimal('0'))
+        SalesItem.objects.bulk_create([
+            SalesItem(sale=sale, product=product, qty=qty, unit_price=product.price, line_total=product.price * qty)
+            for product, qty in lines
+        ])
+        total = sum((product.price * qty for product, qty in lines), Decimal('0'))
+        SalesTransaction.objects.filter(pk=sale.pk).update(created_at=created_at, total_amount=total)
+        return sale
+
+    def test_old_sales_move_to_the_archive_and_summaries(self):
+        old_day = timezone.localdate() - timedelta(days=400)
+        at_noon = timezone.make_aware(datetime.combine(old_day, datetime.min.time().replace(hour=12)))
+        first = self._sale(at_noon, (self.bread, 4), (self.pie, 1))
+        self._sale(at_noon + timedelta(hours=1), (self.bread, 2))
+        recent = self._sale(timezone.now(), (self.bread, 1))
+
+        call_command('archive_sales', '--batch-size', '1', stdout=io.StringIO())
+        self.assertEqual(list(SalesTransaction.objects.values_list('pk', flat=True)), [recent.pk])
+        self.assertEqual(ArchivedSalesTransaction.objects.count(), 2)
+        self.assertEqual(ArchivedSalesItem.objects.count(), 3)
+        summary = DailySalesSummary.objects.get()
+        self.assertEqual((summary.date, summary.orders, summary.quantity, summary.revenue),
+                         (old_day, 2, 7, Decimal('63.00')))
+        self.assertEqual(dict(DailyProductSummary.objects.values_list('product__name', 'quantity')),
+                         {'Pandesal': 6, 'Egg Pie': 1})
+
+        # Receipts of archived sales are still served, from the archive tables
+        self.assertIsInstance(get_sale(first.pk), ArchivedSalesTransaction)
+        self.assertIsInstance(get_sale(recent.pk), SalesTransaction)
+        self.assertIsNone(get_sale(999_999))
+        self.client.force_login(self.admin)
+        self.assertContains(self.client.get(reverse('receipt', args=[first.pk])), 'Egg Pie')
+
+    def test_csv_export_streams_hot_and_archived_days(self):
+        old_day = timezone.localdate() - timedelta(days=400)
+        self._sale(timezone.make_aware(datetime.combine(old_day, datetime.min.time().replace(hour=12))), (self.pie, 2))
+        call_command('archive_sales', stdout=io.StringIO())
+        self._sale(timezone.now(), (self.bread, 3))
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('reports_export_csv'), {'start': old_day.isoformat(),
+                                                                   'end': timezone.localdate().isoformat()})
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), [
+            'Date,Revenue,Quantity', f'{old_day},90.0,2', f'{timezone.localdate()},9.0,3',
+        ])
+
+    def test_cutoff_follows_the_shop_timezone(self):
+        cutoff = timezone.localdate() - timedelta(days=365)
+        midnight = timezone.make_aware(datetime.combine(cutoff, datetime.min.time()))
+        before = self._sale(midnight - timedelta(minutes=1), (self.bread, 1))
+        after = self._sale(midnight + timedelta(minutes=1), (self.bread, 1))
+        call_command('archive_sales', stdout=io.StringIO())
+        self.assertEqual(list(ArchivedSalesTransaction.objects.values_list('pk', flat=True)), [before.pk])
+        self.assertTrue(SalesTransaction.objects.filter(pk=after.pk).exists())
+
+
+def _imgbb_ok(handler, body):
+    return 200, {'Content-Type': 'application/json'}, json.dumps(
+        {'success': True, 'data': {'url': 'https://i.ibb.co/abc/bun.png'}}).encode()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0, IMAGE_UPLOAD_BACKOFF=0)
+@mock.patch.dict(os.environ, {'IMGBB_API_KEY': 'test-key'})
+class UploadTests(TestCase):
+    IMAGE = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 40
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_upload_streams_a_multipart_body_to_the_image_host(self):
+        with StandInServer(_imgbb_ok) as host, override_settings(IMGBB_UPLOAD_URL=host.url + '/1/upload'), \
+                mock.patch('core.views.get_upload_queue', return_value=UploadQueue(1, 2, inline=True)):
+            response = self.client.post(reverse('upload_image'),
+                                        {'image': SimpleUploadedFile('bun.png', self.IMAGE, 'image/png')})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['status'], response.json()['image_url']), ('done', 'https://i.ibb.co/abc/bun.png'))
+
+        [(method, path, headers, body)] = host.requests
+        self.assertEqual((method, path), ('POST', '/1/upload?key=test-key'))
+        boundary = headers['Content-Type'].split('boundary=')[1]
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        self.assertIsNone(headers['Transfer-Encoding'])
+        self.assertEqual(body, (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="expiration"\r\n\r\n0\r\n'
+            f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="bun.png"\r\n'
+            f'Content-Type: image/png\r\n\r\n'.encode() + self.IMAGE + f'\r\n--{boundary}--\r\n'.encode()))
+
+    def test_background_job_state_is_readable_from_another_worker(self):
+        attempts = []
+
+        def flaky(handler, body):
+            attempts.append(body)
+            return (503, {}, b'busy') if len(attempts) == 1 else _imgbb_ok(handler, body)
+
+        queue = UploadQueue(1, 2)
+        with StandInServer(flaky) as host, override_settings(IMGBB_UPLOAD_URL=host.url + '/1/upload'):
+            job = queue.submit(SimpleUploadedFile('bun.png', self.IMAGE, 'image/png'), user_id=self.admin.pk)
+            queue._executor.shutdown(wait=True)
+        self.assertEqual(len(attempts), 2)  # retried after the 503
+        self.assertEqual(len(attempts[0]), len(attempts[1]))  # the whole file again, from the spool
+
+        # Another process (here: another queue) answers the status poll from the shared cache
+        with mock.patch('core.views.get_upload_queue', return_value=UploadQueue(1, 2, inline=True)):
+            status = self.client.get(reverse('upload_image_status', args=[job.id])).json()
+            self.assertEqual((status['status'], status['image_url']), ('done', 'https://i.ibb.co/abc/bun.png'))
+            other = User.objects.create_user('other', password='pw', is_staff=True)
+            self.client.force_login(other)
+            self.assertEqual(self.client.get(reverse('upload_image_status', args=[job.id])).status_code, 404)
+
+
+@override_settings(IMAGE_UPLOAD_BACKOFF=0)
+@mock.patch.dict(os.environ, {'IMGBB_API_KEY': 'test-key'})
+class SyncMediaTests(TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        for name, data in (('a.png', b'A' * 2000), ('copy-of-a.png', b'A' * 2000), ('b.png', b'B' * 2000)):
+            (self.dir / name).write_bytes(data)
+        self.manifest = self.dir / 'manifest.json'
+        self.product = Product.objects.create(name='Pandesal', price=Decimal('3.00'), image='/media/a.png')
+        Product.objects.filter(pk=self.product.pk).update(updated_at=timezone.now() - timedelta(days=1))
+
+    def _sync(self, host):
+        with override_settings(IMGBB_UPLOAD_URL=host.url + '/1/upload'):
+            call_command('sync_media', '--dir', str(self.dir), '--manifest', str(self.manifest), stdout=io.StringIO())
+        return json.loads(self.manifest.read_text())
+
+    def test_uploads_each_file_once_and_repoints_products(self):
+        def host_url(handler, body):
+            name = re.search(rb'filename="([^"]+)"', body).group(1).decode()
+            return 200, {}, json.dumps({'success': True, 'data': {'url': f'https://i.ibb.co/{name}'}}).encode()
+
+        before = Product.objects.get().updated_at
+        with StandInServer(host_url) as host:
+            manifest = self._sync(host)
+            self.assertEqual(len(host.requests), 2)  # a.png and its copy are the same bytes
+            self._sync(host)
+            self.assertEqual(len(host.requests), 2)  # nothing new on the second run
+        self.assertEqual(len(manifest), 2)
+        product = Product.objects.get()
+        self.assertIn(product.image, {'https://i.ibb.co/a.png', 'https://i.ibb.co/copy-of-a.png'})
+        self.assertGreater(product.updated_at, before)
+
+    def test_manifest_keeps_finished_uploads_when_one_fails_unexpectedly(self):
+        real = sync_media.post_image_with_retries
+
+        def upload(path, *args, **kwargs):
+            if Path(path).name == 'b.png':
+                raise OSError('disk read failed')
+            return real(path, *args, **kwargs)
+
+        with StandInServer(_imgbb_ok) as host, mock.patch.object(sync_media, 'post_image_with_retries', upload):
+            manifest = self._sync(host)
+        self.assertEqual([entry['url'] for entry in manifest.values()], ['https://i.ibb.co/abc/bun.png'])
+        self.assertEqual(Product.objects.get().image, 'https://i.ibb.co/abc/bun.png')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0, MEDIA_CAS_ENABLED=True)
+class DerivativeTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.enterContext(override_settings(MEDIA_CAS_ROOT=root))
+        cas_storage._wrapped = empty  # rebuilt on first use with the temporary root
+        self.addCleanup(setattr, cas_storage, '_wrapped', empty)
+        from PIL import Image
+        buf = io.BytesIO()
+        Image.new('RGB', (800, 600), (200, 150, 90)).save(buf, 'PNG')
+        self.original = buf.getvalue()
+
+    def test_renditions_are_content_addressed_and_reused(self):
+        variants = images.build_derivatives(self.original, source='/media/bun.png')
+        self.assertEqual(len(variants['files']), 4)
+        self.assertTrue(all(cas_storage.exists(path) for path in variants['files']))
+        self.assertEqual(variants['thumb']['width'], 240)
+        self.assertEqual(variants['medium']['width'], 640)
+
+        # The same bytes under a new URL: nothing is rendered again
+        known = images.variants_by_hash([variants])
+        with mock.patch.object(images, '_render', wraps=images._render) as render:
+            moved = images.build_derivatives(self.original, source='https://i.ibb.co/bun.png', known=known)
+            self.assertEqual(render.call_count, 0)
+            self.assertEqual({**moved, 'source': ''}, {**variants, 'source': ''})
+            self.assertEqual(moved['source'], 'https://i.ibb.co/bun.png')
+
+            # ...unless a recorded file has gone missing
+            cas_storage.delete(variants['files'][0])
+            images.build_derivatives(self.original, known=known)
+            self.assertEqual(render.call_count, 2)
+
+    def test_cas_media_revalidates_only_existing_files(self):
+        path = cas_storage.save('bun.webp', ContentFile(b'RIFF....WEBP'))
+        url = reverse('cas_media', args=[path])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        cas_storage.delete(path)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+
+def _image_host(handler, body):
+    """ok.png answers HEAD; no-head.png only a ranged GET, like hosts that reject HEAD; anything else is gone"""
+    if handler.path == '/ok.png':
+        return 200, {'Content-Type': 'image/png'}, b'PNG'
+    if handler.path == '/no-head.png':
+        if handler.command == 'HEAD':
+            return 405, {}, b''
+        return 206, {'Content-Type': 'image/png', 'Content-Range': 'bytes 0-0/3'}, b'P'
+    return 404, {'Content-Type': 'text/html'}, b'gone'
+
+
+class CheckImageUrlsTests(TestCase):
+    def setUp(self):
+        self.host = self.enterContext(StandInServer(_image_host))
+        for name in ('ok', 'no-head', 'gone'):
+            Product.objects.create(name=name, price=Decimal('1.00'), image=f'{self.host.url}/{name}.png')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.report = os.path.join(directory, 'image_health.json')
+
+    def _check(self, *args):
+        out = io.StringIO()
+        call_command('check_image_urls', '--report', self.report, *args, stdout=out)
+        with open(self.report) as f:
+            return json.load(f)['results'], out.getvalue()
+
+    def test_falls_back_to_a_ranged_get_when_head_is_rejected(self):
+        results, _ = self._check()
+        self.assertEqual({url.rsplit('/', 1)[1]: r['ok'] for url, r in results.items()},
+                         {'ok.png': True, 'no-head.png': True, 'gone.png': False})
+        ranged = [headers['Range'] for method, path, headers, _ in self.host.requests if method == 'GET']
+        self.assertEqual(ranged, ['bytes=0-0'])
+
+    def test_results_are_cached_for_the_ttl(self):
+        self._check()
+        seen = len(self.host.requests)
+        _, out = self._check()
+        self.assertIn('Checking 0 image URLs (3 cached)', out)
+        self.assertEqual(len(self.host.requests), seen)
+        self._check('--ttl', '0')
+        self.assertGreater(len(self.host.requests), seen)
+
+    def test_repair_replaces_broken_images(self):
+        _, out = self._check('--repair', '--placeholder', '/static/img/placeholder.png')
+        self.assertIn('Repaired 1 products and 0 profiles', out)
+        self.assertEqual(dict(Product.objects.values_list('name', 'image'))['gone'], '/static/img/placeholder.png')
+        self.assertTrue(Product.objects.get(name='ok').image.endswith('/ok.png'))
+
+
+def _bridge_app(environ, start_response):
+    """Echoes the Cookie header back as an unsized, streamed body"""
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return iter([b'cookie=', environ.get('HTTP_COOKIE', '').encode(), b'|end'])
+
+
+class WsgiBridgeTests(SimpleTestCase):
+    def setUp(self):
+        from api.index import handler
+        bridge = type('Bridge', (handler,), {'application': staticmethod(_bridge_app), 'log_message': lambda *a: None})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), bridge)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def _raw(self, request):
+        import socket
+        with socket.create_connection(self.server.server_address, timeout=5) as sock:
+            sock.sendall(request)
+            received = b''
+            while data := sock.recv(65536):
+                received += data
+        return received.partition(b'\r\n\r\n')
+
+    def test_split_cookie_headers_are_joined_with_semicolons(self):
+        head, _, body = self._raw(b'GET / HTTP/1.1\r\nHost: x\r\nCookie: sessionid=abc\r\n'
+                                  b'Cookie: csrftoken=xyz\r\nConnection: close\r\n\r\n')
+        self.assertIn(b'Transfer-Encoding: chunked', head)
+        chunks = []
+        while True:
+            size, _, body = body.partition(b'\r\n')
+            if not int(size, 16):
+                break
+            chunks.append(body[:int(size, 16)])
+            body = body[int(size, 16) + 2:]
+        self.assertEqual(b''.join(chunks), b'cookie=sessionid=abc; csrftoken=xyz|end')
+
+    def test_http10_clients_get_a_close_delimited_body(self):
+        head, _, body = self._raw(b'GET / HTTP/1.0\r\nHost: x\r\n\r\n')
+        self.assertNotIn(b'chunked', head)
+        self.assertIn(b'Connection: close', head)
+        self.assertEqual(body, b'cookie=|end')
+
+
+class SeedDemoTests(TestCase):
+    def _seed(self, *args):
+        call_command('seed_demo', '--days', '3', '--products', '3', '--tx-per-day', '5', *args, stdout=io.StringIO())
+
+    def test_ledger_records_the_seeded_sales_and_bakes(self):
+        self._seed()
+        sold = dict(SalesItem.objects.values('product').annotate(units=Sum('qty')).values_list('product', 'units'))
+        sales = StockMovement.objects.filter(kind=StockMovement.SALE)
+        self.assertEqual(dict(sales.values('product').annotate(units=Sum('quantity')).values_list('product', 'units')),
+                         {pid: -units for pid, units in sold.items()})
+        self.assertEqual(sales.values('sale').distinct().count(), SalesTransaction.objects.count())
+        # Each day's bake sells out: stock, batches and the ledger still agree
+        self.assertEqual(stock.ledger_balances(), dict(Product.objects.values_list('pk', 'stock')))
+        self.assertEqual(set(ProductBatch.objects.values_list('quantity', flat=True)), {1000})
+
+    def test_clear_replaces_the_seeded_ledger_and_velocities(self):
+        self._seed()
+        SalesVelocity.objects.update(rate=99)
+        self._seed('--clear', '--seed', '7')
+        self.assertFalse(SalesVelocity.objects.filter(rate=99).exists())
+        sale_ids = set(SalesTransaction.objects.values_list('pk', flat=True))
+        self.assertEqual(set(StockMovement.objects.filter(kind=StockMovement.SALE).values_list('sale', flat=True)),
+                         sale_ids)
+
+
+class LoadTestStockTests(TestCase):
+    def test_stock_option_adjusts_batches_fefo_through_the_ledger(self):
+        today = date.today()
+        product = Product.objects.create(name='Pandesal', price=Decimal('3.00'), stock=50)
+        soon = ProductBatch.objects.create(product=product, quantity=30, expires_at=today + timedelta(days=1))
+        later = ProductBatch.objects.create(product=product, quantity=20, expires_at=today + timedelta(days=5))
+        # Only the stock set-up is under test, not the cashier threads
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(load_test_pos.Command, '_run_cashier'):
+            call_command('load_test_pos', '--cashiers', '1', '--products', '1', '--stock', '25',
+                         '--output', os.path.join(tmp, 'report.json'), stdout=io.StringIO())
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 25)
+        self.assertEqual(dict(ProductBatch.objects.values_list('pk', 'quantity')), {soon.pk: 5, later.pk: 20})
+        movement = StockMovement.objects.get(product=product)
+        self.assertEqual((movement.kind, movement.quantity), (StockMovement.ADJUSTMENT, -25))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0)
+class CartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cashier = User.objects.create_user('cashier', password='pw')
+        cls.bread = Product.objects.create(name='Pandesal', price=Decimal('3.00'), stock=50)
+        cls.pie = Product.objects.create(name='Egg Pie', price=Decimal('45.00'), stock=5)
+        batches.opening_batches([cls.bread, cls.pie])
+
+    def setUp(self):
+        self.client.force_login(self.cashier)
+
+    def _session_data(self):
+        return SessionStore(session_key=self.client.session.session_key).load()
+
+    def test_cart_clicks_do_not_touch_the_session(self):
+        before = self._session_data()
+        self.client.post(reverse('add_to_cart', args=[self.bread.pk]), {'qty': 4})
+        self.client.post(reverse('add_to_cart', args=[self.bread.pk]), {'qty': 2})
+        self.client.post(reverse('add_to_cart', args=[self.pie.pk]), {'qty': 9})
+        self.client.post(reverse('update_cart', args=[self.bread.pk]), {'qty': 3})
+        self.assertEqual(cart_store.quantities(self.cashier), {self.bread.pk: 3, self.pie.pk: 5})
+        self.assertEqual(self._session_data(), before)
+        self.assertContains(self.client.get(reverse('pos')), f'value="5" class="form-control text-center cart-qty" data-pid="{self.pie.pk}"')
+
+    def test_checkout_uses_catalog_prices_and_keeps_receipt_data_on_the_sale(self):
+        cart_store.add(self.cashier, self.bread.pk, 10)
+        Product.objects.filter(pk=self.bread.pk).update(price=Decimal('4.00'))
+        response = self.client.post(reverse('checkout'), {'discount': '0', 'cash_received': '50'})
+        sale = SalesTransaction.objects.get()
+        self.assertRedirects(response, reverse('receipt', args=[sale.pk]))
+        self.assertEqual(sale.total_amount, Decimal('40.00'))
+        self.assertEqual((sale.cash_received, sale.change_given), (Decimal('50.00'), Decimal('10.00')))
+        self.assertEqual(cart_store.quantities(self.cashier), {})
+        self.assertFalse([key for key in self._session_data() if key.startswith('sale_')])
+        self.assertEqual(self.client.get(reverse('receipt', args=[sale.pk])).context['change'], Decimal('10.00'))
+
+    def test_cart_is_shared_by_the_cashiers_sessions(self):
+        other_till = self.client_class()
+        other_till.force_login(self.cashier)
+        self.client.post(reverse('add_to_cart', args=[self.bread.pk]), {'qty': 4})
+        other_till.post(reverse('add_to_cart', args=[self.bread.pk]), {'qty': 1})
+        self.assertNotEqual(other_till.session.session_key, self.client.session.session_key)
+        self.assertEqual(cart_store.quantities(self.cashier), {self.bread.pk: 5})
+
+        # Checking out at one till empties the cart at the other too
+        other_till.post(reverse('checkout'), {'discount': '0', 'cash_received': '15'})
+        self.assertEqual(SalesItem.objects.get().qty, 5)
+        self.assertEqual(cart_store.quantities(self.cashier), {})
+        self.client.post(reverse('checkout'), {'discount': '0', 'cash_received': '15'})
+        self.assertEqual(SalesTransaction.objects.count(), 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0)
+class StockLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.client.post(reverse('product_create'), {'name': 'Ensaymada', 'price': '25.00', 'stock': '30', 'is_active': 'on'})
+        self.product = Product.objects.get(name='Ensaymada')
+
+    def _edit(self, new_stock, reason=''):
+        return self.client.post(reverse('product_edit', args=[self.product.pk]), {
+            'name': 'Ensaymada', 'price': '25.00', 'stock': str(new_stock), 'is_active': 'on', 'stock_reason': reason,
+        })
+
+    def test_every_stock_change_is_in_the_ledger(self):
+        opened = timezone.now()
+        cart_store.add(self.admin, self.product.pk, 4)
+        self.client.post(reverse('checkout'), {'discount': '0', 'cash_received': '100'})
+        after_sale = timezone.now()
+        self._edit(20, StockMovement.WASTE)
+        self._edit(50)
+
+        movements = list(StockMovement.objects.filter(product=self.product).order_by('id').values_list('kind', 'quantity'))
+        self.assertEqual(movements, [('RESTOCK', 30), ('SALE', -4), ('WASTE', -6), ('RESTOCK', 30)])
+        self.assertEqual(StockMovement.objects.get(kind='SALE').sale, SalesTransaction.objects.get())
+        self.assertEqual(stock.stock_at(self.product, opened), 30)
+        self.assertEqual(stock.stock_at(self.product, after_sale), 26)
+        self.assertEqual(stock.stock_at(self.product, timezone.now()), 50)
+        self.assertIsNone(stock.stock_at(self.product, opened - timedelta(days=1)))
+
+    def test_waste_cannot_increase_stock(self):
+        self.assertEqual(self._edit(40, StockMovement.WASTE).status_code, 200)
+        self.assertEqual(Product.objects.get().stock, 30)
+
+    def test_stock_at_reads_from_the_latest_snapshot(self):
+        self._edit(35)
+        stock.take_snapshots()
+        StockMovement.objects.filter(product=self.product).delete()  # nothing before the snapshot is read
+        with self.assertNumQueries(2):
+            self.assertEqual(stock.stock_at(self.product, timezone.now()), 35)
+
+    def test_snapshot_stock_reports_and_reconciles_drift(self):
+        Product.objects.filter(pk=self.product.pk).update(stock=27)  # changed behind the ledger's back
+        self.assertEqual(stock.ledger_balances(), {self.product.pk: 30})
+        out = io.StringIO()
+        call_command('snapshot_stock', '--reconcile', stdout=out)
+        self.assertIn('ledger says 30 (-3)', out.getvalue())
+        self.assertEqual(StockMovement.objects.latest('id').quantity, -3)
+        self.assertEqual(stock.ledger_balances(), {self.product.pk: 27})
+        self.assertEqual(StockSnapshot.objects.latest('taken_at').stock, 27)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0)
+class BatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cashier = User.objects.create_user('cashier', password='pw')
+        today = date.today()
+        cls.product = Product.objects.create(name='Pandesal', price=Decimal('3.00'), stock=13,
+                                             expiration_date=today + timedelta(days=1))
+        cls.stale = ProductBatch.objects.create(product=cls.product, quantity=3, expires_at=today - timedelta(days=1))
+        cls.soon = ProductBatch.objects.create(product=cls.product, quantity=4, expires_at=today + timedelta(days=1))
+        cls.later = ProductBatch.objects.create(product=cls.product, quantity=6, expires_at=today + timedelta(days=3))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.cashier)
+
+    def test_checkout_sells_the_first_expiring_batch_first(self):
+        cart_store.add(self.cashier, self.product.pk, 5)
+        self.client.post(reverse('checkout'), {'discount': '0', 'cash_received': '50'})
+        self.assertEqual(dict(ProductBatch.objects.values_list('pk', 'quantity')),
+                         {self.stale.pk: 3, self.soon.pk: 0, self.later.pk: 5})
+        product = Product.objects.get()
+        self.assertEqual((product.stock, product.expiration_date), (8, self.later.expires_at))
+
+    def test_expired_batch_does_not_block_fresh_stock(self):
+        self.assertContains(self.client.get(reverse('pos')), 'Pandesal')
+        cart_store.add(self.cashier, self.product.pk, 11)  # more than the 10 unexpired units
+        self.client.post(reverse('checkout'), {'discount': '0', 'cash_received': '50'})
+        self.assertFalse(SalesTransaction.objects.exists())
+        self.assertEqual(ProductBatch.objects.get(pk=self.stale.pk).quantity, 3)
+
+    def test_expire_batches_writes_off_waste(self):
+        out = io.StringIO()
+        call_command('expire_batches', stdout=out)
+        self.assertIn('Wrote off 1 expired batches (3 units)', out.getvalue())
+        self.assertFalse(ProductBatch.objects.filter(pk=self.stale.pk).exists())
+        self.assertEqual(Product.objects.get().stock, 10)
+        self.assertEqual(list(StockMovement.objects.values_list('kind', 'quantity')), [('WASTE', -3)])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0,
+                   VELOCITY_HALF_LIFE_DAYS=1, REORDER_LEAD_DAYS=1, REORDER_SAFETY_Z=0)
+class VelocityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        cls.bread = Product.objects.create(name='Pandesal', price=Decimal('3.00'), stock=50)
+        cls.pie = Product.objects.create(name='Egg Pie', price=Decimal('45.00'), stock=5)
+        batches.opening_batches([cls.bread, cls.pie])
+
+    def test_checkout_updates_the_rate_incrementally(self):
+        self.client.force_login(self.admin)
+        cart_store.add(self.admin, self.bread.pk, 8)
+        self.client.post(reverse('checkout'), {'discount': '0', 'cash_received': '50'})
+        row = SalesVelocity.objects.get()
+        self.assertEqual((row.day, row.units_today, row.rate), (date.today(), 8, 0))
+
+        # With a one-day half-life each closed day moves the rate halfway to its sales
+        today = date.today()
+        velocity.record_sale({self.bread.pk: 4}, today + timedelta(days=1))
+        self.assertEqual(SalesVelocity.objects.get().rate, 4)
+        velocity.record_sale({self.bread.pk: 1}, today + timedelta(days=3))  # 4 units on day 1, then an idle day
+        row = SalesVelocity.objects.get()
+        self.assertEqual((row.rate, row.units_today, row.reorder_point), (2, 1, 2))
+
+    def test_low_stock_compares_stock_with_the_reorder_point(self):
+        SalesVelocity.objects.bulk_create([
+            SalesVelocity(product=self.bread, day=date.today(), rate=10, reorder_point=10),
+            SalesVelocity(product=self.pie, day=date.today(), rate=2, reorder_point=6),
+        ])
+        with self.assertNumQueries(1):
+            alerts = velocity.low_stock()
+        self.assertEqual([(v.product, v.days_of_cover) for v in alerts], [(self.pie, 2.5)])
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['kpi_low_stock'], 1)
+        self.assertContains(response, 'Egg Pie')
+
+    def test_low_stock_ignores_expired_units(self):
+        # 50 loaves in stock, but 45 of them expired yesterday and wait for expire_batches
+        ProductBatch.objects.filter(product=self.bread).update(quantity=45, expires_at=date.today() - timedelta(days=1))
+        ProductBatch.objects.create(product=self.bread, quantity=5)
+        SalesVelocity.objects.create(product=self.bread, day=date.today(), rate=2, reorder_point=6)
+        with self.assertNumQueries(1):
+            alerts = velocity.low_stock()
+        self.assertEqual([(v.product, v.available, v.days_of_cover) for v in alerts], [(self.bread, 5, 2.5)])
+
+    def test_rebuild_matches_checkout(self):
+        sale = SalesTransaction.objects.create(cashier=self.admin, total_amount=Decimal('9.00'))
+        SalesItem.objects.create(sale=sale, product=self.bread, qty=3, unit_price=Decimal('3.00'), line_total=Decimal('9.00'))
+        SalesTransaction.objects.filter(pk=sale.pk).update(created_at=timezone.now() - timedelta(days=2))
+        velocity.rebuild()
+        rebuilt = SalesVelocity.objects.get()
+        self.assertEqual((rebuilt.day, rebuilt.units_today), (date.today(), 0))
+
+        SalesVelocity.objects.all().delete()
+        velocity.record_sale({self.bread.pk: 3}, date.today() - timedelta(days=2))
+        velocity.roll_all()
+        self.assertAlmostEqual(SalesVelocity.objects.get().rate, rebuilt.rate)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0)
+class StaticBundleTests(TestCase):
+    def test_pages_link_static_bundles_instead_of_inline_assets(self):
+        self.client.force_login(User.objects.create_user('admin', password='pw', is_staff=True))
+        sale = SalesTransaction.objects.create(cashier=User.objects.get(), total_amount=0)
+        for url, bundles in [
+            (reverse('pos'), ['css/pos', 'js/pos']),
+            (reverse('forecast'), ['css/forecast', 'js/forecast']),
+            (reverse('receipt', args=[sale.pk]), ['css/receipt']),
+        ]:
+            with self.subTest(url=url):
+                html = self.client.get(url).content.decode()
+                self.assertNotIn('<style>', html)
+                self.assertNotRegex(html, r'<script>(?!\s*</script>)')
+                for bundle in ['css/base', 'js/base'] + bundles:
+                    self.assertRegex(html, rf'/static/{bundle}(\.[0-9a-f]{{12}})?\.(css|js)"')
+
+
+
+@override_settings(COMPRESSION_MIN_BYTES=1024)
+class CompressionTests(SimpleTestCase):
+    body = b'Pandesal,12,60.00\n' * 200
+
+    def _respond(self, response, accept='gzip, deflate, br'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+        return compression.CompressionMiddleware(lambda r: response)(request)
+
+    def test_html_is_gzipped_with_random_padding(self):
+        first = self._respond(HttpResponse(self.body, content_type='text/html; charset=utf-8', headers={'ETag': '"v1"'}))
+        second = self._respond(HttpResponse(self.body, content_type='text/html; charset=utf-8'))
+        # Never brotli for HTML, which is where BREACH-sensitive tokens live
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertEqual(first['Vary'], 'Accept-Encoding')
+        self.assertEqual(first['ETag'], 'W/"v1"')
+        self.assertEqual(gzip.decompress(first.content), self.body)
+        self.assertEqual(int(first['Content-Length']), len(first.content))
+        self.assertNotEqual(first.content, second.content)
+
+    def test_streaming_csv_is_compressed_as_it_streams(self):
+        response = self._respond(StreamingHttpResponse(iter([self.body] * 5), content_type='text/csv'), accept='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.body * 5)
+
+    def test_skips_small_media_refused_and_encoded_responses(self):
+        cases = [
+            (b'{"ok": true}', 'application/json', {}, 'gzip'),
+            (self.body, 'image/jpeg', {}, 'gzip'),
+            (self.body, 'text/csv', {}, 'identity, gzip;q=0'),
+            (self.body, 'text/css', {'Content-Encoding': 'br'}, 'gzip'),
+        ]
+        for body, content_type, headers, accept in cases:
+            with self.subTest(content_type=content_type, accept=accept):
+                response = self._respond(HttpResponse(body, content_type=content_type, headers=headers), accept)
+                self.assertEqual(response.content, body)
+                self.assertNotEqual(response.get('Content-Encoding'), 'gzip')
+
+    def test_middleware_chain_stays_async_around_an_async_view(self):
+        async def view(request):
+            return StreamingHttpResponse(self._achunks(), content_type='text/csv')
+
+        handler = view
+        for middleware in (RequestMetricsMiddleware, compression.CompressionMiddleware, RequestIdMiddleware):
+            handler = middleware(handler)
+            self.assertTrue(asyncio.iscoroutinefunction(handler))
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip', HTTP_X_REQUEST_ID='till-1')
+        response = asyncio.run(handler(request))
+        self.assertEqual((response['X-Request-ID'], response['Content-Encoding']), ('till-1', 'gzip'))
+
+        async def body():
+            return b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(gzip.decompress(asyncio.run(body())), self.body * 3)
+
+    async def _achunks(self):
+        for _ in range(3):
+            yield self.body
+
+    @unittest.skipUnless(compression.brotli, 'Brotli is not installed')
+    def test_json_uses_brotli_when_accepted(self):
+        response = self._respond(JsonResponse({'rows': ['Pandesal'] * 500}))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(compression.brotli.decompress(response.content)), {'rows': ['Pandesal'] * 500})
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0)
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        batches.opening_batches(Product.objects.bulk_create(
+            [Product(name=f'Bread {i:02d}', price=Decimal('10.00'), stock=5) for i in range(20)]))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def _product_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in ctx.captured_queries if 'FROM "core_product"' in q['sql']]
+
+    def test_pos_grid_is_cached_until_the_catalog_changes(self):
+        response, queries = self._product_queries(reverse('pos'))
+        self.assertEqual(len(queries), 1)
+        response, queries = self._product_queries(reverse('pos'))
+        self.assertEqual(queries, [])
+        self.assertContains(response, 'Bread 19')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            batches.opening_batches([Product.objects.create(name='Ube Loaf', price=Decimal('70.00'), stock=3)])
+        response, queries = self._product_queries(reverse('pos'))
+        self.assertEqual(len(queries), 1)
+        self.assertContains(response, 'Ube Loaf')
+
+    def test_cached_grid_holds_no_csrf_token(self):
+        self.client.get(reverse('pos'))
+        html = self.client.get(reverse('pos')).content.decode()
+        grid = html[html.index('row-cols-md-3'):html.index('RIGHT: cart')]
+        self.assertEqual(grid.count('name="csrfmiddlewaretoken" value="" data-csrf'), 20)
+        self.assertNotRegex(grid, r'name="csrfmiddlewaretoken" value="\w+"')
+        self.assertRegex(html[:html.index('row-cols-md-3')], r'name="csrfmiddlewaretoken" value="\w+"')
+
+    def test_sold_out_product_leaves_the_grid(self):
+        self.client.get(reverse('pos'))
+        product = Product.objects.get(name='Bread 00')
+        cart_store.add(self.admin, product.pk, 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('checkout'), {'discount': '0', 'cash_received': '50'})
+        self.assertNotContains(self.client.get(reverse('pos')), 'Bread 00')
+
+    def test_report_rows_are_cached_per_range_until_a_sale(self):
+        today = date.today().isoformat()
+        url = f"{reverse('reports')}?start={today}&end={today}"
+        self.assertNotContains(self.client.get(url), '₱42.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            sale = SalesTransaction.objects.create(cashier=self.admin, total_amount=Decimal('42.00'))
+            SalesItem.objects.create(sale=sale, product=Product.objects.first(), qty=1,
+                                     unit_price=Decimal('42.00'), line_total=Decimal('42.00'))
+        self.assertContains(self.client.get(url), '₱42.00')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        cls.other = User.objects.create_user('other', password='pw', is_staff=True)
+        cls.product = Product.objects.create(name='Pandesal', price=Decimal('5.00'), stock=50)
+        batches.opening_batches([cls.product])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _revalidate(self, url):
+        self.client.get(url)  # sets the CSRF cookie the ETag depends on
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, len(ctx.captured_queries)
+
+    def test_unchanged_pages_return_304_without_rendering(self):
+        for url in (reverse('product_list'), reverse('forecast'), reverse('reports')):
+            with self.subTest(url=url):
+                response, queries = self._revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertLessEqual(queries, 5)  # session, user, profile and the validators
+
+    def test_new_sale_changes_the_etag(self):
+        urls = [reverse('reports'), reverse('product_list')]  # checkout's stock change shows on the product list
+        self.client.get(urls[0])
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        cart_store.add(self.admin, self.product.pk, 2)
+        self.client.post(reverse('checkout'), {'discount': '0', 'cash_received': '20'})
+        self.client.get(reverse('pos'))  # consume the "Sale completed" message
+        for url, etag in zip(urls, etags):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+            self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_etag_is_per_user(self):
+        self.client.get(reverse('product_list'))
+        etag = self.client.get(reverse('product_list'))['ETag']
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(reverse('product_list'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class _ManualAuditBuffer(LoginAuditBuffer):
+    """Flushed by the test instead of a background thread"""
+    def _ensure_worker(self):
+        pass
+
+
+@override_settings(LOGIN_AUDIT_FLUSH_SECONDS=60, LOGIN_AUDIT_MAX_EVENTS=5)
+class LoginAuditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'cashier{i}', password='pw') for i in range(3)]
+
+    def test_events_are_written_in_batches(self):
+        buffer = _ManualAuditBuffer()
+        now = timezone.now()
+        stale = LoginHistory.objects.create(user=self.users[0], login_time=now - timedelta(hours=3))
+        with self.assertNumQueries(0):
+            for i, user in enumerate(self.users):
+                buffer.record_login(user.pk, '10.0.0.1', 'test', at=now - timedelta(minutes=10 - i))
+            buffer.record_logout(self.users[0].pk, at=now)
+        self.assertEqual(buffer.pending(), 4)
+
+        with self.assertNumQueries(3):  # insert logins, read open logins, update logouts
+            self.assertEqual(buffer.flush(), (3, 1))
+        self.assertEqual(buffer.pending(), 0)
+        rows = LoginHistory.objects.filter(user=self.users[0]).order_by('login_time')
+        self.assertEqual([(r.login_time, r.logout_time) for r in rows],
+                         [(stale.login_time, None), (now - timedelta(minutes=10), now)])
+        self.assertEqual(LoginHistory.objects.filter(logout_time__isnull=True).count(), 3)
+
+    def test_size_threshold_wakes_the_flusher(self):
+        buffer = _ManualAuditBuffer()
+        for _ in range(4):
+            buffer.record_login(self.users[0].pk)
+        self.assertFalse(buffer._wakeup.is_set())
+        buffer.record_logout(self.users[0].pk)
+        self.assertTrue(buffer._wakeup.is_set())
+
+    @override_settings(LOGIN_AUDIT_FLUSH_SECONDS=0)
+    def test_synchronous_mode_writes_on_login_and_logout(self):
+        self.client.force_login(self.users[1])
+        login = LoginHistory.objects.get(user=self.users[1])
+        self.client.post(reverse('logout'), secure=True)
+        login.refresh_from_db()
+        self.assertIsNotNone(login.logout_time)
+
+    def test_failed_flush_keeps_events_for_the_next_one(self):
+        buffer = _ManualAuditBuffer()
+        now = timezone.now()
+        buffer.record_login(self.users[0].pk, at=now - timedelta(minutes=5))
+        buffer.record_logout(self.users[0].pk, at=now)
+        failing = mock.patch.object(LoginHistory.objects, 'bulk_create', side_effect=OperationalError('database is locked'))
+        with failing, self.assertLogs('core.audit', 'WARNING'), self.assertRaises(OperationalError):
+            buffer.flush()
+        self.assertEqual(buffer.pending(), 2)
+        self.assertFalse(LoginHistory.objects.exists())
+
+        buffer.record_login(self.users[1].pk, at=now)
+        self.assertEqual(buffer.flush(), (2, 1))
+        rows = LoginHistory.objects.order_by('login_time')
+        self.assertEqual([(r.user, r.logout_time) for r in rows], [(self.users[0], now), (self.users[1], None)])
+
+    @override_settings(LOGIN_AUDIT_MAX_BUFFERED=2)
+    def test_retry_queue_is_bounded(self):
+        buffer = _ManualAuditBuffer()
+        for i in range(3):
+            buffer.record_login(self.users[i].pk)
+        failing = mock.patch.object(LoginHistory.objects, 'bulk_create', side_effect=OperationalError('database is locked'))
+        with failing, self.assertLogs('core.audit', 'ERROR'), self.assertRaises(OperationalError):
+            buffer.flush()
+        self.assertEqual([login.user_id for login in buffer._logins], [self.users[1].pk, self.users[2].pk])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+
+    def setUp(self):
+        metrics_registry.reset()
+        self.addCleanup(metrics_registry.reset)
+
+    def _scrape(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode().splitlines()
+
+    def test_metrics_render_the_request_histograms(self):
+        self.client.get(reverse('login'))
+        lines = self._scrape()
+        labels = 'view="login",method="GET"'
+        buckets = [line for line in lines if line.startswith(f'bakery_request_duration_seconds_bucket{{{labels},')]
+        self.assertEqual(len(buckets), len(LATENCY_BUCKETS) + 1)
+        counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(buckets[-1], f'bakery_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1')
+        self.assertIn(f'bakery_request_duration_seconds_count{{{labels}}} 1', lines)
+        self.assertRegex('\n'.join(lines), rf'bakery_request_duration_seconds_sum{{{labels}}} \d+\.\d{{6}}\n')
+        self.assertIn(f'bakery_request_db_queries_count{{{labels}}} 1', lines)
+        self.assertIn(f'bakery_requests_total{{{labels},status="2xx"}} 1', lines)
+
+    def test_bucket_bounds_are_inclusive(self):
+        registry = Registry()
+        registry.observe('pos', 'GET', 200, 0.005, 2, 0.001, 10)
+        lines = registry.render().splitlines()
+        labels = 'view="pos",method="GET"'
+        self.assertIn(f'bakery_request_duration_seconds_bucket{{{labels},le="0.005"}} 1', lines)
+        self.assertIn(f'bakery_request_db_queries_bucket{{{labels},le="1"}} 0', lines)
+        self.assertIn(f'bakery_request_db_queries_bucket{{{labels},le="2"}} 1', lines)
+        self.assertIn(f'bakery_response_bytes_total{{{labels}}} 10', lines)
+
+    @override_settings(SLOW_REQUEST_MS=0.001)
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs('core.slow_requests', 'WARNING') as logs:
+            self.client.get(reverse('login'))
+        self.assertEqual(len(logs.records), 1)
+        self.assertRegex(logs.records[0].getMessage(),
+                         r'^Slow request GET /login/ \(login\) 200 in \d+ ms: \d+ queries in \d+ ms, \d+ bytes$')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0)
+class LoggingTests(TestCase):
+    def _record(self, name='core.cart', level=logging.DEBUG, rid='-', **extra):
+        record = logging.LogRecord(name, level, __file__, 1, 'Updated %s', ('cart',), None)
+        record.__dict__.update(extra)
+        token = request_id.set(rid)
+        try:
+            RequestIdFilter().filter(record)
+        finally:
+            request_id.reset(token)
+        return record
+
+    def test_request_id_is_echoed_or_generated(self):
+        response = self.client.get(reverse('login'), HTTP_X_REQUEST_ID='till-3.abc')
+        self.assertEqual(response['X-Request-ID'], 'till-3.abc')
+        response = self.client.get(reverse('login'), HTTP_X_REQUEST_ID='<script>')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_json_lines_carry_the_request_id_and_extras(self):
+        record = self._record(rid='req-1', product_id=7)
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual((entry['message'], entry['request_id'], entry['product_id']), ('Updated cart', 'req-1', 7))
+
+    def test_stream_handler_writes_before_the_request_ends(self):
+        stream = io.StringIO()
+        logger = logging.getLogger('core.tests.stream')
+        handler = StreamLogHandler(stream)
+        logger.addHandler(handler)
+        token = request_id.set('req-9')
+        try:
+            logger.warning('Checkout rejected', extra={'lines': 2})
+            entry = json.loads(stream.getvalue())
+        finally:
+            request_id.reset(token)
+            logger.removeHandler(handler)
+        self.assertEqual((entry['message'], entry['request_id'], entry['lines']), ('Checkout rejected', 'req-9', 2))
+
+    def test_sampling_keeps_or_drops_whole_requests(self):
+        sampling = SamplingFilter({'core.cart': 0.5})
+        for rid in (f'req-{i}' for i in range(20)):
+            kept = {sampling.filter(self._record(rid=rid)) for _ in range(3)}
+            self.assertEqual(len(kept), 1)
+        kept = sum(sampling.filter(self._record(rid=f'req-{i}')) for i in range(1000))
+        self.assertTrue(350 < kept < 650, kept)
+        self.assertTrue(sampling.filter(self._record(level=logging.WARNING, rid='req-x')))
+        self.assertTrue(sampling.filter(self._record(name='core.views', rid='req-x')))
+
+
+def _route_view(request):
+    return HttpResponse(routers._route.get() or 'none')
+
+
+async def _async_route_view(request):
+    return HttpResponse(routers._route.get() or 'none')
+
+
+class RouterTests(TestCase):
+    """Run with ANALYTICS_DATABASE_URL=sqlite:///analytics.sqlite3 to cover the two-database tests too"""
+    databases = '__all__'
+
+    def _request(self, pinned=False):
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        if pinned:
+            routers.pin_to_primary(request)
+        return request
+
+    def test_decorators_set_the_route(self):
+        self.assertEqual(routers.use_analytics_db(_route_view)(self._request()).content, b'analytics')
+        self.assertEqual(routers.use_analytics_db(_route_view)(self._request(pinned=True)).content, b'none')
+        self.assertEqual(routers.read_from_primary(_route_view)(self._request(pinned=True)).content, b'primary')
+
+    def test_async_views_keep_the_route(self):
+        view = routers.use_analytics_db(_async_route_view)
+        self.assertEqual(asyncio.run(view(self._request())).content, b'analytics')
+        self.assertEqual(asyncio.run(view(self._request(pinned=True))).content, b'none')
+
+    def test_writes_always_go_to_default(self):
+        with routers.analytics_reads():
+            self.assertEqual(routers.AnalyticsRouter().db_for_write(SalesTransaction), 'default')
+
+    @unittest.skipIf(routers.ANALYTICS_DB in settings.DATABASES, 'analytics database configured')
+    def test_reads_stay_on_default_without_analytics_database(self):
+        with routers.analytics_reads():
+            self.assertEqual(SalesTransaction.objects.all().db, 'default')
+
+
+@unittest.skipUnless(routers.ANALYTICS_DB in settings.DATABASES, 'set ANALYTICS_DATABASE_URL')
+@override_settings(SECURE_SSL_REDIRECT=False, SLOW_REQUEST_MS=0, LOGIN_AUDIT_FLUSH_SECONDS=0)
+class AnalyticsDatabaseTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        product = Product.objects.create(name='Pandesal', price=Decimal('3.00'), stock=100)
+        cls.primary_sale = SalesTransaction.objects.create(cashier=cls.admin, total_amount=Decimal('6.00'))
+        SalesItem.objects.create(sale=cls.primary_sale, product=product, qty=2,
+                                 unit_price=Decimal('3.00'), line_total=Decimal('6.00'))
+        # A sale that only the analytics database knows about
+        analytics = routers.ANALYTICS_DB
+        cashier = User.objects.using(analytics).create(username='analytics-only')
+        other = Product.objects.using(analytics).create(name='Ube Loaf', price=Decimal('70.00'))
+        sale = SalesTransaction.objects.using(analytics).create(cashier=cashier, total_amount=Decimal('700.00'))
+        SalesItem.objects.using(analytics).create(sale=sale, product=other, qty=10,
+                                                  unit_price=Decimal('70.00'), line_total=Decimal('700.00'))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _report_revenue(self):
+        history = self.client.get(reverse('reports')).context['history']
+        return sum(h['revenue'] for h in history)
+
+    def test_reports_read_from_analytics_database(self):
+        self.assertEqual(self._report_revenue(), 700.0)
+
+    def test_pinned_session_reads_from_primary(self):
+        session = self.client.session
+        session[routers.PIN_SESSION_KEY] = time.time() + 60
+        session.save()
+        self.assertEqual(self._report_revenue(), 6.0)
+
+    def test_receipt_reads_from_primary(self):
+        response = self.client.get(reverse('receipt', args=[self.primary_sale.pk]))
+        self.assertEqual(response.status_code, 200)
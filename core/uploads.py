@@ -0,0 +1,224 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+class UploadError(Exception):
+    """Raised when the image host rejects an upload or cannot be reached"""
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class MultipartStream:
+    """
+    File-like multipart/form-data body that streams the image from disk.
+
+    requests sends objects with read() and __len__ in blocks with a proper
+    Content-Length, so the image is never base64-encoded or copied into memory.
+    """
+    def __init__(self, fields, file_field, fileobj, filename, content_type='application/octet-stream'):
+        self.boundary = uuid.uuid4().hex
+        head = BytesIO()
+        for name, value in fields.items():
+            head.write(f'--{self.boundary}\r\n'
+                       f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                       f'{value}\r\n'.encode())
+        safe_name = filename.replace('"', '')
+        head.write(f'--{self.boundary}\r\n'
+                   f'Content-Disposition: form-data; name="{file_field}"; filename="{safe_name}"\r\n'
+                   f'Content-Type: {content_type}\r\n\r\n'.encode())
+        head.seek(0)
+        tail = BytesIO(f'\r\n--{self.boundary}--\r\n'.encode())
+
+        fileobj.seek(0, os.SEEK_END)
+        file_size = fileobj.tell()
+        fileobj.seek(0)
+        self._length = len(head.getvalue()) + file_size + len(tail.getvalue())
+        self._parts = [head, fileobj, tail]
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        out = bytearray()
+        while self._parts and (size < 0 or len(out) < size):
+            chunk = self._parts[0].read(-1 if size < 0 else size - len(out))
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            out += chunk
+        return bytes(out)
+
+
+def post_image(fileobj, filename, content_type='application/octet-stream', session=None, url=None, api_key=None):
+    """Upload one image to ImgBB (or IMGBB_UPLOAD_URL) and return its public URL"""
+    import requests
+
+    api_key = api_key or os.getenv('IMGBB_API_KEY')
+    if not api_key or api_key == 'your_imgbb_api_key_here':
+        raise UploadError('ImgBB API key not configured')
+
+    body = MultipartStream({'expiration': 0}, 'image', fileobj, filename, content_type)
+    http = session or requests
+    try:
+        response = http.post(
+            url or settings.IMGBB_UPLOAD_URL,
+            params={'key': api_key},
+            data=body,
+            headers={'Content-Type': body.content_type},
+            timeout=settings.IMAGE_UPLOAD_TIMEOUT,
+        )
+    except requests.exceptions.RequestException as e:
+        raise UploadError(f'Network error: {e}', retryable=True)
+
+    if response.status_code >= 500 or response.status_code == 429:
+        raise UploadError(f'Image host returned HTTP {response.status_code}', retryable=True)
+    try:
+        data = response.json()
+    except ValueError:
+        raise UploadError(f'Unexpected response from image host (HTTP {response.status_code})')
+    if not response.ok or not data.get('success'):
+        raise UploadError(data.get('error', {}).get('message', 'Upload failed'))
+    return data['data']['url']
+
+
+def post_image_with_retries(path, filename, content_type='application/octet-stream', session=None):
+    """Upload a file from disk, retrying transient failures with exponential backoff"""
+    attempts = max(1, settings.IMAGE_UPLOAD_RETRIES)
+    for attempt in range(attempts):
+        try:
+            with open(path, 'rb') as f:
+                return post_image(f, filename, content_type, session=session)
+        except UploadError as e:
+            if not e.retryable or attempt == attempts - 1:
+                raise
+            time.sleep(settings.IMAGE_UPLOAD_BACKOFF * (2 ** attempt))
+
+
+class UploadJob:
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, user_id, path, filename, content_type, on_success):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.path = path
+        self.filename = filename
+        self.content_type = content_type
+        self.on_success = on_success
+        self.status = self.PENDING
+        self.image_url = None
+        self.error = None
+
+    def as_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'image_url': self.image_url,
+            'error': self.error,
+        }
+
+
+def _cache_key(job_id):
+    return f'upload-job:{job_id}'
+
+
+class UploadQueue:
+    """
+    Bounded background uploader.
+
+    Uploaded files are spooled to disk in the request, then sent by a small
+    thread pool so a slow image host never holds up a request worker. Job
+    state is kept in the cache for IMAGE_UPLOAD_JOB_TTL seconds, so the status
+    endpoint can answer from any worker that shares it (CACHE_BACKEND=db).
+    With IMAGE_UPLOAD_INLINE (set on serverless, where the instance may be
+    frozen once the response is sent) the upload finishes inside the request.
+    """
+    def __init__(self, workers, max_pending, inline=False):
+        self._inline = inline
+        self._executor = None if inline else ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-upload')
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, uploaded_file, user_id=None, on_success=None):
+        """Spool an UploadedFile and queue it; returns the job or None if the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        try:
+            suffix = os.path.splitext(uploaded_file.name)[1]
+            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=settings.IMAGE_UPLOAD_SPOOL_DIR) as spool:
+                for chunk in uploaded_file.chunks():
+                    spool.write(chunk)
+            job = UploadJob(user_id, spool.name, uploaded_file.name,
+                            getattr(uploaded_file, 'content_type', None) or 'application/octet-stream',
+                            on_success)
+            self._save(job)
+        except Exception:
+            self._slots.release()
+            raise
+
+        if self._inline:
+            self._run(job)
+        else:
+            self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        """The job's state as stored by _save, or None once it is unknown or expired"""
+        return cache.get(_cache_key(job_id))
+
+    def _save(self, job):
+        cache.set(_cache_key(job.id), {'user_id': job.user_id, **job.as_dict()}, settings.IMAGE_UPLOAD_JOB_TTL)
+
+    def _run(self, job):
+        job.status = UploadJob.RUNNING
+        self._save(job)
+        try:
+            job.image_url = post_image_with_retries(job.path, job.filename, job.content_type)
+            if job.on_success:
+                job.on_success(job.image_url)
+            job.status = UploadJob.DONE
+        except UploadError as e:
+            job.error = str(e)
+            job.status = UploadJob.FAILED
+        except Exception as e:
+            job.error = f'Upload error: {e}'
+            job.status = UploadJob.FAILED
+        finally:
+            self._save(job)
+            try:
+                os.unlink(job.path)
+            except OSError:
+                pass
+            if not self._inline:
+                # Callbacks may have used the ORM from this worker thread
+                connections.close_all()
+            self._slots.release()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_upload_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = UploadQueue(settings.IMAGE_UPLOAD_WORKERS, settings.IMAGE_UPLOAD_MAX_PENDING,
+                                 inline=settings.IMAGE_UPLOAD_INLINE)
+        return _queue
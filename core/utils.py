@@ -1,57 +1,93 @@
-import os
-import requests
-import base64
 from django.db.models import Sum, F
 from .models import SalesItem
+from .archive import (
+    archived_daily_totals, archived_product_totals,
+    aarchived_daily_totals, aarchived_product_totals,
+)
 from datetime import date, timedelta
-from django.conf import settings
 
-def daily_sales(start=None, end=None):
-    # returns list of dicts: [{'date': date, 'revenue': float}]
+def _sales_items(start=None, end=None):
     qs = SalesItem.objects.all()
     if start:
         qs = qs.filter(sale__created_at__date__gte=start)
     if end:
         qs = qs.filter(sale__created_at__date__lte=end)
-    agg = (qs.values('sale__created_at__date')
-             .annotate(revenue=Sum(F('line_total')))
-             .order_by('-sale__created_at__date'))
-    return [{'date': r['sale__created_at__date'], 'revenue': float(r['revenue'] or 0)} for r in agg]
+    return qs
+
+def _daily_sales_query(start=None, end=None):
+    return (_sales_items(start, end).values('sale__created_at__date')
+              .annotate(revenue=Sum(F('line_total')))
+              .order_by('-sale__created_at__date'))
+
+def _daily_sales_result(agg, archived):
+    totals = {r['sale__created_at__date']: float(r['revenue'] or 0) for r in agg}
+    # Days moved out by archive_sales are served from their daily summaries
+    for day, summary in archived.items():
+        totals[day] = totals.get(day, 0.0) + summary['revenue']
+    return [{'date': d, 'revenue': totals[d]} for d in sorted(totals, reverse=True)]
+
+def daily_sales(start=None, end=None):
+    # returns list of dicts: [{'date': date, 'revenue': float}]
+    return _daily_sales_result(_daily_sales_query(start, end), archived_daily_totals(start, end))
+
+async def adaily_sales(start=None, end=None):
+    agg = [r async for r in _daily_sales_query(start, end)]
+    return _daily_sales_result(agg, await aarchived_daily_totals(start, end))
+
+def _daily_quantity_query(start=None, end=None):
+    return (_sales_items(start, end).values('sale__created_at__date')
+              .annotate(quantity=Sum('qty'))
+              .order_by('-sale__created_at__date'))
+
+def _daily_quantity_result(agg, archived):
+    totals = {r['sale__created_at__date']: int(r['quantity'] or 0) for r in agg}
+    for day, summary in archived.items():
+        totals[day] = totals.get(day, 0) + summary['quantity']
+    return [{'date': d, 'quantity': totals[d]} for d in sorted(totals, reverse=True)]
 
 def daily_quantity(start=None, end=None):
     # returns list of dicts: [{'date': date, 'quantity': int}]
-    qs = SalesItem.objects.all()
-    if start:
-        qs = qs.filter(sale__created_at__date__gte=start)
-    if end:
-        qs = qs.filter(sale__created_at__date__lte=end)
-    agg = (qs.values('sale__created_at__date')
-             .annotate(quantity=Sum('qty'))
-             .order_by('-sale__created_at__date'))
-    return [{'date': r['sale__created_at__date'], 'quantity': int(r['quantity'] or 0)} for r in agg]
+    return _daily_quantity_result(_daily_quantity_query(start, end), archived_daily_totals(start, end))
 
-def top_sellers(start=None, end=None, limit=5):
-    qs = SalesItem.objects.all()
-    if start:
-        qs = qs.filter(sale__created_at__date__gte=start)
-    if end:
-        qs = qs.filter(sale__created_at__date__lte=end)
-    agg = (qs.values('product__name')
+async def adaily_quantity(start=None, end=None):
+    agg = [r async for r in _daily_quantity_query(start, end)]
+    return _daily_quantity_result(agg, await aarchived_daily_totals(start, end))
+
+def _top_sellers_query(start=None, end=None, limit=None):
+    agg = (_sales_items(start, end).values('product__name')
              .annotate(qty=Sum('qty'), revenue=Sum('line_total'))
-             .order_by('-qty')[:limit])
-    result = []
+             .order_by('-qty'))
+    return agg[:limit] if limit else agg
+
+def _top_sellers_result(agg, totals, limit):
     for r in agg:
-        qty = int(r['qty'] or 0)
-        revenue = float(r['revenue'] or 0)
+        totals[r['product__name']]['qty'] += int(r['qty'] or 0)
+        totals[r['product__name']]['revenue'] += float(r['revenue'] or 0)
+    ranked = sorted(totals.items(), key=lambda kv: kv[1]['qty'], reverse=True)[:limit]
+    result = []
+    for name, t in ranked:
+        qty = t['qty']
+        revenue = t['revenue']
         avg_price = revenue / qty if qty > 0 else 0.0
         result.append({
-            'product': r['product__name'],
+            'product': name,
             'qty': qty,
             'revenue': revenue,
             'avg_price': round(avg_price, 2)
         })
     return result
 
+def top_sellers(start=None, end=None, limit=5):
+    totals = archived_product_totals(start, end)
+    # Only the hot rows can be cut to `limit` in SQL when there is nothing archived to merge
+    agg = _top_sellers_query(start, end, None if totals else limit)
+    return _top_sellers_result(agg, totals, limit)
+
+async def atop_sellers(start=None, end=None, limit=5):
+    totals = await aarchived_product_totals(start, end)
+    agg = [r async for r in _top_sellers_query(start, end, None if totals else limit)]
+    return _top_sellers_result(agg, totals, limit)
+
 def moving_average_forecast(history, horizon=7, window=7):
     # history: list of {'date': date, 'revenue': float}
     if not history:
@@ -66,36 +102,17 @@ def upload_image_to_imgbb(image_file):
     """
     Upload an image file to ImgBB and return the URL
     """
-    api_key = os.getenv('IMGBB_API_KEY')
-    
-    if not api_key or api_key == 'your_imgbb_api_key_here':
-        return None, "ImgBB API key not configured"
-    
+    from .uploads import post_image, UploadError
+
     try:
-        # Read image file and encode to base64
-        image_data = image_file.read()
-        encoded_image = base64.b64encode(image_data)
-        
-        # Prepare API request
-        url = "https://api.imgbb.com/1/upload"
-        payload = {
-            "key": api_key,
-            "image": encoded_image,
-            "expiration": 0,  # No expiration
-        }
-        
-        # Upload to ImgBB
-        response = requests.post(url, data=payload)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if data.get('success'):
-            return data['data']['url'], None
-        else:
-            return None, data.get('error', {}).get('message', 'Upload failed')
-            
-    except requests.exceptions.RequestException as e:
-        return None, f"Network error: {str(e)}"
+        # Streams the file as multipart instead of base64-encoding it in memory
+        image_url = post_image(
+            image_file,
+            getattr(image_file, 'name', 'image'),
+            getattr(image_file, 'content_type', None) or 'application/octet-stream',
+        )
+        return image_url, None
+    except UploadError as e:
+        return None, str(e)
     except Exception as e:
         return None, f"Upload error: {str(e)}"
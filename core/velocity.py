@@ -0,0 +1,140 @@
+"""
+Sales velocity, reorder points and low-stock alerts.
+
+Each product that sells has one SalesVelocity row: an exponentially weighted
+average (and variance) of its daily unit sales, updated incrementally by
+checkout with one read and one upsert, never by scanning sales. Units are
+counted per day and folded into the average when the next day starts, days
+without sales counting as zero. The reorder point is the expected demand over
+REORDER_LEAD_DAYS plus REORDER_SAFETY_Z standard deviations of it; a product
+whose unexpired stock is at or below it is low on stock, which the dashboard
+reads from this table in one query. update_velocity rolls every row forward nightly and
+can rebuild them from the sales history.
+"""
+import math
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .batches import with_available
+from .models import DailyProductSummary, Product, SalesItem, SalesVelocity
+
+UPSERT_FIELDS = ['day', 'units_today', 'rate', 'variance', 'reorder_point']
+# After this many idle days a sale from before them weighs nothing anyway
+MAX_FOLDED_DAYS = 366
+
+
+def _alpha():
+    return 1 - 0.5 ** (1 / settings.VELOCITY_HALF_LIFE_DAYS)
+
+
+def reorder_point(rate, variance):
+    lead = settings.REORDER_LEAD_DAYS
+    # Rounded first so float noise doesn't push e.g. 3.0000000001 up to 4
+    return math.ceil(round(rate * lead + settings.REORDER_SAFETY_Z * math.sqrt(variance * lead), 6))
+
+
+def roll(velocity, today):
+    """Fold the days before `today` into velocity's rate and reorder point; True if anything changed"""
+    if velocity.day >= today:
+        return False
+    alpha = _alpha()
+    idle = min((today - velocity.day).days - 1, MAX_FOLDED_DAYS)
+    for units in [velocity.units_today] + [0] * idle:
+        diff = units - velocity.rate
+        velocity.rate += alpha * diff
+        velocity.variance = (1 - alpha) * (velocity.variance + alpha * diff * diff)
+    velocity.day, velocity.units_today = today, 0
+    velocity.reorder_point = reorder_point(velocity.rate, velocity.variance)
+    return True
+
+
+def _save(velocities):
+    SalesVelocity.objects.bulk_create(velocities, batch_size=500, update_conflicts=True,
+                                      unique_fields=['product'], update_fields=UPSERT_FIELDS)
+
+
+def record_sale(cart, today=None):
+    """
+    Count a sale's units, cart being {product_id: qty}, towards each product's velocity.
+    Called by checkout while it holds the products' row locks, so concurrent
+    sales of a product update its row one after the other.
+    """
+    today = today or date.today()
+    rows = SalesVelocity.objects.in_bulk(list(cart))
+    velocities = []
+    for pid, qty in cart.items():
+        velocity = rows.get(pid) or SalesVelocity(product_id=pid, day=today)
+        roll(velocity, today)
+        velocity.units_today += qty
+        velocities.append(velocity)
+    _save(velocities)
+
+
+def _lock_products():
+    # Checkout updates a product's row under that product's lock; taking the same locks keeps its units
+    list(Product.objects.select_for_update().values_list('pk', flat=True))
+
+
+def roll_all(today=None):
+    """Roll every row forward to today, so products that stopped selling lower their reorder point"""
+    today = today or date.today()
+    with transaction.atomic():
+        _lock_products()
+        rolled = [v for v in SalesVelocity.objects.all() if roll(v, today)]
+        SalesVelocity.objects.bulk_update(rolled, UPSERT_FIELDS, batch_size=500)
+    return len(rolled)
+
+
+def rebuild(days=56, today=None):
+    """Recompute every row from the last `days` days of sales, archived days included; returns the row count"""
+    today = today or date.today()
+    start = today - timedelta(days=days)
+    with transaction.atomic():
+        _lock_products()
+        daily = defaultdict(lambda: defaultdict(int))
+        sold = (SalesItem.objects.filter(sale__created_at__date__gte=start, sale__created_at__date__lte=today)
+                .values('product_id', 'sale__created_at__date').annotate(units=Sum('qty')).order_by())
+        for row in sold:
+            daily[row['product_id']][row['sale__created_at__date']] += row['units']
+        archived = DailyProductSummary.objects.filter(date__gte=start, date__lte=today)
+        for pid, day, units in archived.values_list('product_id', 'date', 'quantity'):
+            daily[pid][day] += units
+
+        velocities = []
+        for pid, units in daily.items():
+            velocity = SalesVelocity(product_id=pid, day=start, units_today=units.get(start, 0))
+            for offset in range(1, days + 1):
+                day = start + timedelta(days=offset)
+                roll(velocity, day)
+                velocity.units_today = units.get(day, 0)
+            velocities.append(velocity)
+        SalesVelocity.objects.all().delete()
+        _save(velocities)
+    return len(velocities)
+
+
+def _low_stock_query():
+    # Expired units still count in product.stock until expire_batches writes them off, but can't be sold
+    velocities = SalesVelocity.objects.select_related('product').filter(
+        product__is_archived=False, product__is_active=True, reorder_point__gt=0)
+    return with_available(velocities, product='product').filter(available__lte=F('reorder_point'))
+
+
+def _soonest_out_first(alerts):
+    return sorted(alerts, key=lambda v: (v.days_of_cover if v.days_of_cover is not None else math.inf, v.product.name))
+
+
+def low_stock():
+    """
+    Active products whose unexpired stock, annotated as `available`, is at or
+    below their reorder point, in one query, the soonest to run out first
+    """
+    return _soonest_out_first(_low_stock_query())
+
+
+async def alow_stock():
+    return _soonest_out_first([v async for v in _low_stock_query()])
@@ -1,62 +1,86 @@
+import hashlib
 import json
+import logging
+import mimetypes
+import os
 from collections import defaultdict
+from decimal import Decimal
 from calendar import month_abbr
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Q, Sum, Count, Max
+from django.db.models.functions import TruncMonth
 from django.db.models.deletion import ProtectedError
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import JsonResponse, HttpResponse, HttpResponseForbidden
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, Http404, FileResponse, StreamingHttpResponse
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, SuspiciousFileOperation
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.contrib import messages
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from datetime import date, timedelta, datetime
 
-from .models import Product, SalesTransaction, SalesItem, LoginHistory
+from .models import Product, SalesTransaction, SalesItem, LoginHistory, ArchivedSalesItem
 from .forms import ProductForm, CashierForm, ProfileEditForm
-from .utils import daily_sales, daily_quantity, top_sellers, moving_average_forecast, upload_image_to_imgbb
-from .reports import sales_csv
+from .utils import daily_sales, daily_quantity, top_sellers, moving_average_forecast
+from .uploads import UploadJob, get_upload_queue
+from .storage import ContentAddressedStorage, cas_storage
+from .reports import sales_csv_lines
+from .archive import get_sale, archived_daily_totals
+from .metrics import registry as metrics_registry
+from .routers import use_analytics_db, read_from_primary, pin_to_primary
+from . import batches, cart as cart_store, fragments, stock, velocity
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
+# Cart clicks are high volume; their debug lines are sampled (settings.LOG_SAMPLE_RATES)
+cart_logger = logging.getLogger('core.cart')
 
 def is_admin(user):
     return user.is_staff  # treat staff=True as Admin role
 
 @login_required
+@use_analytics_db
 def home(request):
     today = date.today()
     yesterday = today - timedelta(days=1)
     
     # Today's sales data
-    today_sales = SalesTransaction.objects.filter(created_at__date=today)
-    today_revenue = sum(sale.total_amount for sale in today_sales)
-    today_orders = today_sales.count()
+    today_totals = SalesTransaction.objects.filter(created_at__date=today).aggregate(
+        revenue=Sum('total_amount'), orders=Count('id')
+    )
+    today_revenue = today_totals['revenue'] or 0
+    today_orders = today_totals['orders']
     today_avg_ticket = today_revenue / today_orders if today_orders > 0 else 0
     
     # Yesterday's sales for comparison
-    yesterday_sales = SalesTransaction.objects.filter(created_at__date=yesterday)
-    yesterday_revenue = sum(sale.total_amount for sale in yesterday_sales)
+    yesterday_revenue = SalesTransaction.objects.filter(created_at__date=yesterday).aggregate(
+        revenue=Sum('total_amount')
+    )['revenue'] or 0
     today_growth = ((today_revenue - yesterday_revenue) / yesterday_revenue * 100) if yesterday_revenue > 0 else 0
     
-    # Active products count (matching POS view logic: non-archived, with stock, not expired)
-    active_products_count = Product.objects.filter(
-        is_archived=False,
-        stock__gt=0
-    ).exclude(
-        expiration_date__lt=today
-    ).count()
+    # Active products count (matching POS view logic: non-archived, with unexpired batch stock)
+    active_products_count = batches.sellable(Product.objects.filter(is_archived=False), today).count()
+
+    # Products at or below their reorder point, read from the velocity table in one query
+    low_stock = velocity.low_stock()
     
     # Top sellers (last 7 days)
     week_start = today - timedelta(days=7)
     top_products = top_sellers(start=week_start, end=today, limit=5)
     
     # Recent transactions (last 6)
-    recent_sales = SalesTransaction.objects.select_related().prefetch_related('items').order_by('-created_at')[:6]
+    recent_sales = SalesTransaction.objects.annotate(item_count=Count('items')).order_by('-created_at')[:6]
     recent_sales_data = []
     for sale in recent_sales:
         recent_sales_data.append({
             'id': sale.id,
             'created_at': sale.created_at.strftime('%H:%M'),
-            'item_count': sale.items.count(),
+            'item_count': sale.item_count,
             'total_amount': f"{sale.total_amount:.2f}"
         })
     
@@ -65,18 +89,22 @@ def home(request):
     start_date = today.replace(day=1) - timedelta(days=180)  # Approximately 7 months back
     monthly_data = defaultdict(lambda: {'revenue': 0.0, 'quantity': 0})
     
-    # Get all sales items in the date range
-    sales_items = SalesItem.objects.filter(
-        sale__created_at__date__gte=start_date,
-        sale__created_at__date__lte=today
-    ).select_related('sale')
+    # Group sales items in the date range by month in the database
+    monthly_rows = (SalesItem.objects
+                    .filter(sale__created_at__date__gte=start_date, sale__created_at__date__lte=today)
+                    .annotate(month=TruncMonth('sale__created_at'))
+                    .values('month')
+                    .annotate(revenue=Sum('line_total'), quantity=Sum('qty')))
+    for row in monthly_rows:
+        month_key = f"{row['month'].year}-{row['month'].month:02d}"
+        monthly_data[month_key]['revenue'] += float(row['revenue'] or 0)
+        monthly_data[month_key]['quantity'] += int(row['quantity'] or 0)
     
-    # Group by month
-    for item in sales_items:
-        sale_date = item.sale.created_at.date()
-        month_key = f"{sale_date.year}-{sale_date.month:02d}"
-        monthly_data[month_key]['revenue'] += float(item.line_total)
-        monthly_data[month_key]['quantity'] += int(item.qty)
+    # Months that have been archived only exist as daily summaries
+    for day, summary in archived_daily_totals(start_date, today).items():
+        month_key = f"{day.year}-{day.month:02d}"
+        monthly_data[month_key]['revenue'] += summary['revenue']
+        monthly_data[month_key]['quantity'] += summary['quantity']
     
     # Sort by date and get last 7 months
     sorted_months = sorted(monthly_data.keys())[-7:]
@@ -97,7 +125,9 @@ def home(request):
         'kpi_today_growth': f"{today_growth:+.1f}%",
         'kpi_today_orders': today_orders,
         'kpi_avg_ticket': f"{today_avg_ticket:.2f}",
-        'kpi_low_stock': active_products_count,
+        'kpi_low_stock': len(low_stock),
+        'kpi_active_products': active_products_count,
+        'low_stock': low_stock[:5],
         'top_products': top_products,
         'recent_sales': recent_sales_data,
         'last7_labels': json.dumps(last7_labels),
@@ -105,9 +135,58 @@ def home(request):
         'last7_quantities': json.dumps(last7_quantities),
     })
 
+# ---------------- Conditional GET ----------------------
+def _page_etag(request, *validators):
+    """
+    ETag for an auto-refreshed admin page: its data validators plus what base.html
+    renders per user, so a 304 never replays another user's navbar or a stale CSRF token.
+    """
+    csrf_secret = request.META.get('CSRF_COOKIE')
+    if not csrf_secret:
+        return None  # first visit: the render sets the CSRF cookie, revalidate from the next one
+    if len(messages.get_messages(request)):
+        return None  # flash messages are shown once, so this render must happen
+    user = request.user
+    try:
+        picture = user.profile.profile_picture  # base.html loads the profile anyway
+    except ObjectDoesNotExist:
+        picture = None
+    key = (user.pk, user.username, user.get_full_name(), picture, csrf_secret, *validators)
+    return hashlib.sha256(repr(key).encode()).hexdigest()[:32]
+
+
+def _sales_validator(start, end):
+    """Count and newest id of the sales in [start, end]; a new, archived or deleted sale changes it"""
+    lower = timezone.make_aware(datetime.combine(start, datetime.min.time()))
+    upper = timezone.make_aware(datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    # A range on created_at (not created_at__date) so the index is used
+    sales = SalesTransaction.objects.filter(created_at__gte=lower, created_at__lt=upper)
+    return tuple(sales.aggregate(count=Count('id'), last=Max('id')).values())
+
+
+def _catalog_validator():
+    return tuple(Product.objects.aggregate(count=Count('id'), updated=Max('updated_at')).values())
+
+
+def _product_list_etag(request):
+    return _page_etag(request, date.today(), _catalog_validator())
+
+
+def _forecast_etag(request):
+    today = date.today()
+    return _page_etag(request, today, _sales_validator(today - timedelta(days=60), today), _catalog_validator())
+
+
+def _reports_etag(request):
+    start, end = _report_range(request)
+    return _page_etag(request, start, end, _sales_validator(start, end))
+
+
 # ---------------- Admin: Product CRUD -----------------
 @login_required
 @user_passes_test(is_admin)
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_product_list_etag)
 def product_list(request):
     q = (request.GET.get('q') or '').strip()
     show_archived = request.GET.get('archived', '').lower() == 'true'
@@ -130,7 +209,10 @@ def product_create(request):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES)  # <-- IMPORTANT
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                product = form.save()
+                batches.opening_batches([product])
+                stock.record_new_products([product], user=request.user)
             messages.success(request, 'Product created.')
             return redirect('product_list')
     else:
@@ -140,25 +222,34 @@ def product_create(request):
 @login_required
 @user_passes_test(is_admin)
 def product_edit(request, pk):
-    product = get_object_or_404(Product, pk=pk)
     if request.method == 'POST':
-        form = ProductForm(request.POST, request.FILES, instance=product)  # <-- IMPORTANT
-        if form.is_valid():
-            form.save()
-            messages.success(request, 'Product updated.')
-            return redirect('product_list')
+        with transaction.atomic():
+            # Locked so a checkout can't change stock between reading it and writing the ledger
+            product = get_object_or_404(Product.objects.select_for_update(), pk=pk)
+            previous_stock, previous_expiry = product.stock, product.expiration_date
+            form = ProductForm(request.POST, request.FILES, instance=product)  # <-- IMPORTANT
+            if form.is_valid():
+                product = form.save(commit=False)
+                batches.apply_edit(product, previous_expiry)
+                product.save()
+                movement = stock.stock_change(product, previous_stock, kind=form.cleaned_data['stock_reason'],
+                                              user=request.user)
+                if movement:
+                    stock.record([movement])
+                messages.success(request, 'Product updated.')
+                return redirect('product_list')
     else:
-        form = ProductForm(instance=product)
+        form = ProductForm(instance=get_object_or_404(Product, pk=pk))
     return render(request, 'core/product_form.html', {'form': form})
 
 @login_required
 @user_passes_test(is_admin)
 def product_delete(request, pk):
     product = get_object_or_404(Product, pk=pk)
+    # Sales history, including sales moved to the archive tables
+    sales_items_count = (SalesItem.objects.filter(product=product).count()
+                         + ArchivedSalesItem.objects.filter(product=product).count())
     if request.method == 'POST':
-        # Check if product has sales history
-        sales_items_count = SalesItem.objects.filter(product=product).count()
-        
         if sales_items_count > 0:
             # Archive the product instead of deleting
             product.is_archived = True
@@ -175,7 +266,7 @@ def product_delete(request, pk):
             messages.success(request, 'Product deleted successfully.')
         
         return redirect('product_list')
-    return render(request, 'core/product_delete.html', {'product': product})
+    return render(request, 'core/product_delete.html', {'product': product, 'sales_count': sales_items_count})
 
 @login_required
 @user_passes_test(is_admin)
@@ -195,223 +286,238 @@ def pos(request):
     from datetime import date
     today = date.today()
     
-    # Show all non-archived products with stock that are not expired
+    # Show all non-archived products with stock in batches that have not expired
     # Include products with no expiration date set
     # Note: We check is_active in add_to_cart, but show all non-archived products here for flexibility
-    products = Product.objects.filter(
-        is_archived=False,
-        stock__gt=0
-    ).exclude(
-        expiration_date__lt=today
-    ).order_by('name')
+    products = batches.sellable(Product.objects.filter(is_archived=False), today).order_by('name')
     
-    cart = request.session.get('cart', {})
-    return render(request, 'core/pos.html', {'products': products, 'cart': cart})
+    cart = cart_store.lines(request.user)
+    # `products` is only queried when the cached grid fragment has to be rebuilt
+    return render(request, 'core/pos.html', {
+        'products': products, 'cart': cart, 'today': today, **fragments.context(fragments.CATALOG),
+    })
 
 @login_required
 def add_to_cart(request, product_id):
     from datetime import date
     # Match POS view logic: non-archived products (is_active check removed to match POS display)
-    product = get_object_or_404(Product, pk=product_id, is_archived=False)
+    product = get_object_or_404(batches.with_available(Product.objects.filter(is_archived=False)), pk=product_id)
     
-    # Check if product is expired
-    if product.is_expired():
+    # Check if product is expired: stock left, but only in expired batches
+    if not product.available and product.stock > 0:
         messages.error(request, f'❌ Cannot add "{product.name}" - Product has expired!')
         return redirect('pos')
     
     # Check if product is in stock
-    if product.stock <= 0:
+    if product.available <= 0:
         messages.error(request, f'❌ Cannot add "{product.name}" - Out of stock!')
         return redirect('pos')
     
-    cart = request.session.get('cart', {})
     qty = int(request.POST.get('qty', 1))
     if qty <= 0: qty = 1
     
     # Check if adding this quantity exceeds available stock
-    current_cart_qty = cart.get(str(product_id), {}).get('qty', 0)
-    if current_cart_qty + qty > product.stock:
-        messages.warning(request, f'⚠️ Only {product.stock} units available for "{product.name}"')
-        qty = max(1, product.stock - current_cart_qty)
+    current_cart_qty = cart_store.get_qty(request.user, product_id)
+    if current_cart_qty + qty > product.available:
+        messages.warning(request, f'⚠️ Only {product.available} units available for "{product.name}"')
+        qty = max(1, product.available - current_cart_qty)
     
-    item = cart.get(str(product_id), {'name': product.name, 'unit_price': float(product.price), 'qty': 0})
-    item['qty'] += qty
-    cart[str(product_id)] = item
-    request.session['cart'] = cart
-    request.session.modified = True  # Ensure session is saved
+    cart_store.add(request.user, product_id, qty)
     messages.success(request, f'✅ Added {qty}x {product.name} to cart')
     return redirect('pos')
 
 @login_required
 def update_cart(request, product_id):
-    cart = request.session.get('cart', {})
-    print(f"Before update - Product {product_id}, Cart: {cart}")
+    current_qty = cart_store.get_qty(request.user, product_id)
     
-    if str(product_id) in cart:
+    if current_qty:
         # Check if product still exists and is valid
         try:
             # Match POS view logic: non-archived products (is_active check removed to match POS display)
-            product = Product.objects.get(pk=product_id, is_archived=False)
-            if product.is_expired():
-                cart.pop(str(product_id))
+            product = batches.with_available(Product.objects.filter(is_archived=False)).get(pk=product_id)
+            if not product.available and product.stock > 0:
+                cart_store.remove(request.user, product_id)
                 messages.error(request, f'❌ Removed "{product.name}" from cart - Product has expired!')
-                request.session['cart'] = cart
-                request.session.modified = True
                 return redirect('pos')
-            elif product.stock <= 0:
-                cart.pop(str(product_id))
+            elif product.available <= 0:
+                cart_store.remove(request.user, product_id)
                 messages.error(request, f'❌ Removed "{product.name}" from cart - Out of stock!')
-                request.session['cart'] = cart
-                request.session.modified = True
                 return redirect('pos')
         except Product.DoesNotExist:
-            cart.pop(str(product_id))
+            cart_store.remove(request.user, product_id)
             messages.warning(request, '⚠️ Product no longer available')
-            request.session['cart'] = cart
-            request.session.modified = True
             return redirect('pos')
         
         qty = int(request.POST.get('qty', 1))
-        print(f"Updating product {product_id} to quantity {qty}")
         
         if qty <= 0:
-            cart.pop(str(product_id))
-            print(f"Removed product {product_id} from cart")
+            cart_store.remove(request.user, product_id)
+            cart_logger.debug('Removed product from cart', extra={'product_id': product_id})
         else:
             # Ensure quantity doesn't exceed stock
-            if qty > product.stock:
-                qty = product.stock
-                messages.warning(request, f'⚠️ Limited to {product.stock} units for "{product.name}"')
-            cart[str(product_id)]['qty'] = qty
-            print(f"Updated product {product_id} quantity to {qty}")
-        
-        request.session['cart'] = cart
-        request.session.modified = True  # Ensure session is saved
-        print(f"After update - Cart: {cart}")
+            if qty > product.available:
+                qty = product.available
+                messages.warning(request, f'⚠️ Limited to {product.available} units for "{product.name}"')
+            cart_store.set_qty(request.user, product_id, qty)
+            cart_logger.debug('Updated cart quantity', extra={'product_id': product_id, 'qty': qty, 'previous_qty': current_qty})
     else:
-        print(f"Product {product_id} not found in cart")
+        cart_logger.debug('Product not in cart', extra={'product_id': product_id})
     
     return redirect('pos')
 
 @login_required
 def checkout(request):
     from datetime import date
-    cart = request.session.get('cart', {})
+    cart = cart_store.quantities(request.user)
     if request.method == 'POST' and cart:
-        # Validate all products in cart before checkout
-        invalid_products = []
-        for pid, item in cart.items():
-            try:
-                product = Product.objects.get(pk=int(pid))
-                if product.is_expired():
-                    invalid_products.append(product.name)
+        with transaction.atomic():
+            # Lock every cart product in one query so stock can't change before it is decremented,
+            # then their unexpired batches in a second one, in the FEFO order they are sold in
+            products = Product.objects.select_for_update().in_bulk(list(cart))
+            lots = batches.lock_for_sale(list(products), date.today())
+
+            # Validate all products in cart before checkout
+            invalid_products = []
+            for pid, qty in cart.items():
+                product = products.get(pid)
+                if product is None:
+                    invalid_products.append(f"Product ID {pid}")
                 elif not product.is_active:
                     invalid_products.append(product.name)
-                elif product.stock < item['qty']:
+                elif not lots[pid] and product.stock > 0:
+                    invalid_products.append(f"{product.name} (expired)")
+                elif sum(batch.quantity for batch in lots[pid]) < qty:
                     invalid_products.append(f"{product.name} (insufficient stock)")
-            except Product.DoesNotExist:
-                invalid_products.append(f"Product ID {pid}")
-        
-        if invalid_products:
-            messages.error(request, f'❌ Cannot checkout - Some products are expired, inactive, or out of stock: {", ".join(invalid_products)}')
-            return redirect('pos')
-        
-        # Debug: Print cart data before processing
-        print(f"Checkout cart data: {cart}")
-        discount = float(request.POST.get('discount', 0) or 0)
-        payment_method = request.POST.get('payment_method', 'CASH')
-        cash_received = float(request.POST.get('cash_received', 0) or 0)
-        total = 0.0
-        for pid, item in cart.items():
-            total += item['unit_price'] * item['qty']
-        total_after_discount = max(0.0, total - discount)
-        change = max(0.0, cash_received - total_after_discount)
-
-        sale = SalesTransaction.objects.create(
-            cashier=request.user,
-            total_amount=total_after_discount,
-            discount=discount,
-            payment_method=payment_method
-        )
-        
-        # Store cash_received and change in session for receipt
-        request.session[f'sale_{sale.id}_cash_received'] = cash_received
-        request.session[f'sale_{sale.id}_change'] = change
-        for pid, item in cart.items():
-            # Debug: Print each item being saved
-            print(f"Creating SalesItem: Product {pid}, Qty: {item['qty']}, Unit Price: {item['unit_price']}, Line Total: {item['unit_price'] * item['qty']}")
-            product = Product.objects.get(pk=int(pid))
-            SalesItem.objects.create(
-                sale=sale,
-                product=product,
-                qty=item['qty'],
-                unit_price=item['unit_price'],
-                line_total=item['unit_price'] * item['qty']
-            )
-            # Update stock
-            product.stock -= item['qty']
-            product.save()
-        request.session['cart'] = {}
+
+            if invalid_products:
+                logger.warning('Checkout rejected', extra={'invalid_products': invalid_products})
+                messages.error(request, f'❌ Cannot checkout - Some products are expired, inactive, or out of stock: {", ".join(invalid_products)}')
+                return redirect('pos')
+
+            sale = _record_sale(request, cart, products, lots)
+            cart_store.clear(request.user)
+        # Dashboards read from the analytics database; show this cashier their own sale right away
+        pin_to_primary(request)
+        logger.info('Sale recorded', extra={
+            'sale_id': sale.id, 'lines': len(cart), 'units': sum(cart.values()), 'total': sale.total_amount,
+        })
         messages.success(request, f'Sale #{sale.id} completed.')
         return redirect('receipt', sale_id=sale.id)
     return redirect('pos')
 
+
+def _record_sale(request, cart, products, lots):
+    """Create the sale and its items at catalog prices and take the units FEFO from the batches locked by checkout"""
+    discount = Decimal(request.POST.get('discount', 0) or 0)
+    payment_method = request.POST.get('payment_method', 'CASH')
+    cash_received = Decimal(request.POST.get('cash_received', 0) or 0)
+    total = sum((products[pid].price * qty for pid, qty in cart.items()), Decimal('0'))
+    total_after_discount = max(Decimal('0'), total - discount)
+    change = max(Decimal('0'), cash_received - total_after_discount)
+
+    sale = SalesTransaction.objects.create(
+        cashier=request.user,
+        total_amount=total_after_discount,
+        discount=discount,
+        payment_method=payment_method,
+        cash_received=cash_received,
+        change_given=change,
+    )
+
+    items, taken = [], []
+    today = date.today()
+    for pid, qty in cart.items():
+        product = products[pid]
+        items.append(SalesItem(
+            sale=sale,
+            product=product,
+            qty=qty,
+            unit_price=product.price,
+            line_total=product.price * qty
+        ))
+        # Update stock
+        taken += batches.take(lots[pid], qty)
+        product.stock -= qty
+        product.expiration_date = batches.next_expiry(lots[pid], today)
+        product.updated_at = sale.created_at
+    SalesItem.objects.bulk_create(items)
+    batches.save_taken(taken)
+    stock.record(stock.sale_movements(sale, cart))
+    velocity.record_sale(cart, today)
+    # bulk_update skips auto_now; updated_at is set so product_list's ETag changes
+    Product.objects.bulk_update([products[pid] for pid in cart], ['stock', 'expiration_date', 'updated_at'])
+    if any(not any(batch.quantity for batch in lots[pid]) for pid in cart):
+        # bulk_update skips the post_save hook; sold-out products leave the cached POS grid
+        transaction.on_commit(fragments.bump_catalog)
+    return sale
+
 @login_required
+@read_from_primary
 def receipt(request, sale_id):
-    sale = get_object_or_404(SalesTransaction, pk=sale_id)
-    # Get cash_received and change from session
-    cash_received = request.session.get(f'sale_{sale_id}_cash_received', 0)
-    change = request.session.get(f'sale_{sale_id}_change', 0)
+    # Old sales may have been moved to the archive tables by archive_sales
+    sale = get_sale(sale_id)
+    if sale is None:
+        raise Http404('Sale not found')
     return render(request, 'core/receipt.html', {
         'sale': sale,
-        'cash_received': cash_received,
-        'change': change
+        'cash_received': sale.cash_received,
+        'change': sale.change_given
     })
 
 # ---------------- Admin: Forecast & Analytics -----------
 @login_required
 @user_passes_test(is_admin)
+@use_analytics_db
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_forecast_etag)
 def forecast(request):
     today = date.today()
     start = today - timedelta(days=60)
     history = daily_sales(start=start, end=today)
     quantity_history = daily_quantity(start=start, end=today)
     forecast_points = moving_average_forecast(history, horizon=7, window=7)
-    top = top_sellers(start=start, end=today, limit=5)
+    # Lazy, so a cached top-sellers fragment skips the query
+    top = SimpleLazyObject(lambda: top_sellers(start=start, end=today, limit=5))
     # Sales performance for last 7 days
     start_7days = today - timedelta(days=7)
-    top_7days = top_sellers(start=start_7days, end=today, limit=10)
+    top_7days = SimpleLazyObject(lambda: top_sellers(start=start_7days, end=today, limit=10))
     return render(request, 'core/forecast.html', {
         'history': history,
         'quantity_history': quantity_history,
         'forecast_points': forecast_points,
         'top': top,
         'top_7days': top_7days,
+        'today': today,
+        **fragments.context(fragments.SALES),
     })
 
 # ---------------- Admin: Reports ------------------------
+def _report_range(request):
+    # Defaults: last 30 days
+    today = date.today()
+    start = datetime.fromisoformat(request.GET.get('start', (today - timedelta(days=30)).isoformat())).date()
+    end = datetime.fromisoformat(request.GET.get('end', today.isoformat())).date()
+    return start, end
+
 @login_required
 @user_passes_test(is_admin)
+@use_analytics_db
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_reports_etag)
 def reports(request):
-    # Defaults: last 30 days
-    today = date.today()
-    start_str = request.GET.get('start', (today - timedelta(days=30)).isoformat())
-    end_str = request.GET.get('end', today.isoformat())
-    start = datetime.fromisoformat(start_str).date()
-    end = datetime.fromisoformat(end_str).date()
+    start, end = _report_range(request)
     history = daily_sales(start=start, end=end)
-    return render(request, 'core/reports.html', {'history': history, 'start': start_str, 'end': end_str})
+    return render(request, 'core/reports.html', {
+        'history': history, 'start': start.isoformat(), 'end': end.isoformat(), **fragments.context(fragments.SALES),
+    })
 
 @login_required
 @user_passes_test(is_admin)
+@use_analytics_db
 def reports_export_csv(request):
-    today = date.today()
-    start_str = request.GET.get('start', (today - timedelta(days=30)).isoformat())
-    end_str = request.GET.get('end', today.isoformat())
-    start = datetime.fromisoformat(start_str).date()
-    end = datetime.fromisoformat(end_str).date()
-    csv_data = sales_csv(start, end, 'daily')
-    resp = HttpResponse(csv_data, content_type='text/csv')
+    start, end = _report_range(request)
+    # Rows are written to the client as they are read instead of building the file in memory
+    resp = StreamingHttpResponse(sales_csv_lines(start, end, 'daily'), content_type='text/csv')
     resp['Content-Disposition'] = f'attachment; filename="sales_{start}_{end}.csv"'
     return resp
 
@@ -420,17 +526,17 @@ def reports_export_csv(request):
 @user_passes_test(is_admin)
 def cashier_list(request):
     """List all cashiers (non-staff users)"""
-    cashiers = User.objects.filter(is_staff=False).order_by('-date_joined')
+    # Login count and latest login for each cashier, in the same query
+    cashiers = (User.objects.filter(is_staff=False)
+                .annotate(login_count=Count('login_history'), last_login_time=Max('login_history__login_time'))
+                .order_by('-date_joined'))
     
-    # Get login history count for each cashier
     cashiers_with_stats = []
     for cashier in cashiers:
-        login_count = LoginHistory.objects.filter(user=cashier).count()
-        last_login = LoginHistory.objects.filter(user=cashier).first()
         cashiers_with_stats.append({
             'user': cashier,
-            'login_count': login_count,
-            'last_login': last_login.login_time if last_login else None,
+            'login_count': cashier.login_count,
+            'last_login': cashier.last_login_time,
         })
     
     return render(request, 'core/cashier_list.html', {
@@ -465,15 +571,23 @@ def profile(request):
         form = ProfileEditForm(request.POST, request.FILES, instance=user)
         if form.is_valid():
             form.save()
-            # Handle profile picture upload with ImgBB
+            # Handle profile picture upload with ImgBB in the background
             if 'profile_picture' in request.FILES:
-                image_url, error = upload_image_to_imgbb(request.FILES['profile_picture'])
-                if error:
-                    messages.error(request, f'Profile picture upload failed: {error}')
+                def save_picture(image_url, profile_id=user_profile.pk):
+                    UserProfile.objects.filter(pk=profile_id).update(
+                        profile_picture=image_url, updated_at=timezone.now()
+                    )
+                job = get_upload_queue().submit(
+                    request.FILES['profile_picture'], user_id=user.pk, on_success=save_picture
+                )
+                if job is None:
+                    messages.error(request, 'Profile picture upload failed: upload queue is full, please try again.')
+                elif job.status == job.FAILED:  # uploaded inline on serverless
+                    messages.error(request, f'Profile picture upload failed: {job.error}')
+                elif job.status == job.DONE:
+                    messages.success(request, 'Profile updated successfully!')
                 else:
-                    user_profile.profile_picture = image_url
-                    user_profile.save()
-                    messages.success(request, 'Profile picture uploaded successfully!')
+                    messages.success(request, 'Profile updated! Your new picture will appear in a moment.')
             else:
                 messages.success(request, 'Profile updated successfully!')
             return redirect('profile')
@@ -502,16 +616,62 @@ def cashier_login_history(request, user_id):
 @login_required
 @user_passes_test(is_admin)
 def upload_image(request):
-    """Handle image upload via ImgBB API"""
+    """Queue an image upload to ImgBB; poll upload_image_status for the result"""
     if request.method == 'POST' and request.FILES.get('image'):
         image_file = request.FILES['image']
         
-        # Upload to ImgBB
-        image_url, error = upload_image_to_imgbb(image_file)
+        job = get_upload_queue().submit(image_file, user_id=request.user.pk)
+        if job is None:
+            return JsonResponse({'success': False, 'error': 'Upload queue is full, please try again'}, status=503)
         
-        if error:
-            return JsonResponse({'success': False, 'error': error}, status=400)
-        
-        return JsonResponse({'success': True, 'image_url': image_url})
+        # Inline uploads (serverless) are already finished; background ones are polled
+        finished = job.status in (job.DONE, job.FAILED)
+        return JsonResponse({
+            'success': job.status != job.FAILED,
+            **job.as_dict(),
+            'status_url': reverse('upload_image_status', args=[job.id]),
+        }, status=200 if finished else 202)
     
     return JsonResponse({'success': False, 'error': 'Invalid request'}, status=400)
+
+
+@login_required
+def upload_image_status(request, job_id):
+    """Report the state of a background image upload started by this user"""
+    job = get_upload_queue().get(job_id)
+    if job is None or job.pop('user_id') != request.user.pk:
+        return JsonResponse({'success': False, 'error': 'Unknown upload'}, status=404)
+    return JsonResponse({'success': job['status'] != UploadJob.FAILED, **job})
+
+
+def _cas_etag(request, path):
+    # No ETag for a missing file, so If-None-Match can't turn its 404 into a 304
+    try:
+        if not cas_storage.exists(path):
+            return None
+    except SuspiciousFileOperation:
+        return None
+    return ContentAddressedStorage.digest_for(path)
+
+
+@cache_control(public=True, max_age=settings.MEDIA_CAS_MAX_AGE, immutable=True)
+@condition(etag_func=_cas_etag)
+def cas_media(request, path):
+    """Serve a content-addressed media file; the name is its hash so it can be cached forever"""
+    try:
+        full_path = cas_storage.path(path)
+    except SuspiciousFileOperation:
+        raise Http404('File not found')
+    if not os.path.isfile(full_path):
+        raise Http404('File not found')
+    content_type, _ = mimetypes.guess_type(full_path)
+    return FileResponse(open(full_path, 'rb'), content_type=content_type or 'application/octet-stream')
+
+
+@login_required
+@user_passes_test(is_admin)
+def metrics(request):
+    """Request metrics for this worker process in the Prometheus text format"""
+    if request.method == 'POST' and request.POST.get('reset'):
+        metrics_registry.reset()
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
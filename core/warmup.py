@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+
+def warm_up(templates=None):
+    """
+    Populate the URL resolver and compile the busiest templates.
+
+    Called once at startup by the serverless entry point so the first request
+    after a cold start doesn't pay for it. Compiled templates are kept by
+    Django's cached template loader.
+    """
+    resolver = get_resolver()
+    # Accessing reverse_dict builds the resolver's lookup tables for every pattern
+    resolver.reverse_dict
+    for name in templates if templates is not None else settings.WARMUP_TEMPLATES:
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            pass
@@ -0,0 +1,7 @@
+window.addEventListener('DOMContentLoaded', () => {
+  setTimeout(() => {
+    document.querySelectorAll('.alert.fade.show').forEach(el => {
+      bootstrap.Alert.getOrCreateInstance(el).close();
+    });
+  }, 3000); // 3 seconds
+});
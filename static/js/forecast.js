@@ -0,0 +1,723 @@
+// Parse data
+const histData = JSON.parse(document.getElementById('hist-json').textContent || '[]');
+const qtyData = JSON.parse(document.getElementById('qty-json').textContent || '[]');
+
+// Group data by month
+function groupByMonth(data) {
+  const monthly = {};
+
+  data.forEach(item => {
+    // Handle date format - could be "YYYY-MM-DD" string or Date object
+    let dateStr = item.date;
+    if (typeof dateStr === 'string') {
+      // Extract year-month from "YYYY-MM-DD" format
+      const parts = dateStr.split('-');
+      if (parts.length >= 2) {
+        const monthKey = `${parts[0]}-${parts[1]}`;
+
+        if (!monthly[monthKey]) {
+          monthly[monthKey] = {
+            date: monthKey,
+            revenue: 0,
+            quantity: 0
+          };
+        }
+
+        monthly[monthKey].revenue += Number(item.revenue || 0);
+        monthly[monthKey].quantity += Number(item.quantity || 0);
+      }
+    } else {
+      // If it's a Date object, convert to string first
+      const date = new Date(dateStr);
+      const monthKey = `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}`;
+
+      if (!monthly[monthKey]) {
+        monthly[monthKey] = {
+          date: monthKey,
+          revenue: 0,
+          quantity: 0
+        };
+      }
+
+      monthly[monthKey].revenue += Number(item.revenue || 0);
+      monthly[monthKey].quantity += Number(item.quantity || 0);
+    }
+  });
+
+  // Convert to array and sort by date
+  return Object.values(monthly).sort((a, b) => a.date.localeCompare(b.date));
+}
+
+// Combine revenue and quantity data by date
+const dateMap = {};
+
+// Add revenue data
+histData.forEach(h => {
+  const date = h.date;
+  if (!dateMap[date]) {
+    dateMap[date] = { date, revenue: 0, quantity: 0 };
+  }
+  dateMap[date].revenue = Number(h.revenue || 0);
+});
+
+// Add quantity data
+qtyData.forEach(q => {
+  const date = q.date;
+  if (!dateMap[date]) {
+    dateMap[date] = { date, revenue: 0, quantity: 0 };
+  }
+  dateMap[date].quantity = Number(q.quantity || 0);
+});
+
+// Convert to array and group by month
+const combinedData = Object.values(dateMap);
+const monthlyData = groupByMonth(combinedData);
+
+// Format month labels (e.g., "Jan 2024")
+const monthNames = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
+
+// Get last 3 months from available data
+const last3Months = monthlyData.slice(-3);
+
+// Get the last month from the data to determine the most recent month
+let last3MonthsData = [];
+
+if (monthlyData.length > 0) {
+  // Get the most recent month from the data
+  const lastMonth = monthlyData[monthlyData.length - 1];
+  const [lastYear, lastMonthNum] = lastMonth.date.split('-');
+  const lastYearNum = parseInt(lastYear);
+  const lastMonthIndex = parseInt(lastMonthNum) - 1; // Convert to 0-11
+
+  // Create a map of available months for quick lookup
+  const availableMonthsMap = {};
+  monthlyData.forEach(m => {
+    availableMonthsMap[m.date] = m;
+  });
+
+  // Generate last 3 months: 2 months ago, 1 month ago, most recent month from data
+  for (let i = 2; i >= 0; i--) {
+    // Calculate the month index (0-11)
+    let monthIndex = lastMonthIndex - i;
+    let year = lastYearNum;
+
+    // Handle year rollover if month goes negative
+    if (monthIndex < 0) {
+      monthIndex += 12;
+      year -= 1;
+    }
+
+    // Create month key in format "YYYY-MM"
+    const month = monthIndex + 1; // Convert to 1-12
+    const monthKey = `${year}-${String(month).padStart(2, '0')}`;
+
+    if (availableMonthsMap[monthKey]) {
+      last3MonthsData.push(availableMonthsMap[monthKey]);
+    } else {
+      // Add empty month with zero values
+      last3MonthsData.push({
+        date: monthKey,
+        revenue: 0,
+        quantity: 0
+      });
+    }
+  }
+} else {
+  // No data available, generate last 3 months from today
+  const today = new Date();
+  const currentYear = today.getFullYear();
+  const currentMonth = today.getMonth();
+
+  for (let i = 2; i >= 0; i--) {
+    let monthIndex = currentMonth - i;
+    let year = currentYear;
+
+    if (monthIndex < 0) {
+      monthIndex += 12;
+      year -= 1;
+    }
+
+    const month = monthIndex + 1;
+    const monthKey = `${year}-${String(month).padStart(2, '0')}`;
+
+    last3MonthsData.push({
+      date: monthKey,
+      revenue: 0,
+      quantity: 0
+    });
+  }
+}
+
+const labels = last3MonthsData.map(m => {
+  const [year, month] = m.date.split('-');
+  return `${monthNames[parseInt(month) - 1]} ${year}`;
+});
+const values = last3MonthsData.map(m => m.revenue);
+const qtyValues = last3MonthsData.map(m => m.quantity);
+
+const pesoFmt = new Intl.NumberFormat('en-PH', { style: 'currency', currency: 'PHP' });
+
+const hasData = values.length > 0;
+let forecastChart = null;
+
+// Initialize chart
+function initChart() {
+  const ctx = document.getElementById('forecastChart');
+  if (!ctx) return;
+
+  const chartWrap = ctx.closest('.chart-container');
+  const chartEmpty = document.getElementById('chartEmpty');
+
+  if (!hasData) {
+    chartWrap.style.display = 'none';
+    if (chartEmpty) chartEmpty.style.display = 'block';
+    return;
+  }
+
+  chartWrap.style.display = 'block';
+  if (chartEmpty) chartEmpty.style.display = 'none';
+
+  const grad = ctx.getContext('2d').createLinearGradient(0, 0, 0, 400);
+  grad.addColorStop(0, 'rgba(13, 110, 253, 0.2)');
+  grad.addColorStop(1, 'rgba(13, 110, 253, 0)');
+
+  forecastChart = new Chart(ctx, {
+    type: 'line',
+    data: {
+      labels: labels,
+      datasets: [{
+        label: 'Monthly Revenue',
+        data: values,
+        borderColor: '#0d6efd',
+        backgroundColor: grad,
+        fill: true,
+        borderWidth: 2,
+        tension: 0.35,
+        pointRadius: 0,
+        pointHoverRadius: 3,
+        yAxisID: 'y'
+      }, {
+        label: 'Monthly Quantity Sold',
+        data: qtyValues,
+        borderColor: '#20c997',
+        backgroundColor: 'rgba(32, 201, 151, 0.1)',
+        fill: false,
+        borderWidth: 2,
+        tension: 0.25,
+        pointRadius: 0,
+        pointHoverRadius: 3,
+        yAxisID: 'y1'
+      }]
+    },
+    options: {
+      maintainAspectRatio: false,
+      responsive: true,
+      interaction: { mode: 'index', intersect: false },
+      plugins: {
+        legend: { display: false },
+        tooltip: {
+          padding: 12,
+          displayColors: true,
+          callbacks: {
+            label: function(context) {
+              if (context.dataset.label === 'Monthly Revenue') {
+                return `${context.dataset.label}: ${pesoFmt.format(context.parsed.y || 0)}`;
+              } else {
+                return `${context.dataset.label}: ${context.parsed.y || 0} units`;
+              }
+            }
+          }
+        }
+      },
+      scales: {
+        x: {
+          grid: { display: false },
+          ticks: { font: { size: 11 } }
+        },
+        y: {
+          type: 'linear',
+          display: true,
+          position: 'left',
+          ticks: {
+            callback: function(value) {
+              return pesoFmt.format(value).replace('PHP', '₱');
+            },
+            font: { size: 11 }
+          },
+          grid: { color: 'rgba(0,0,0,.05)' }
+        },
+        y1: {
+          type: 'linear',
+          display: true,
+          position: 'right',
+          ticks: {
+            callback: function(value) {
+              return value;
+            },
+            font: { size: 11 }
+          },
+          grid: { drawOnChartArea: false }
+        }
+      }
+    }
+  });
+
+  updateStats();
+  updateForecastSummary();
+}
+
+// Update statistics
+function updateStats() {
+  if (!hasData) return;
+
+  const total = values.reduce((a, b) => a + b, 0);
+  const avg = total / values.length;
+  let bestVal = -Infinity, bestIdx = -1;
+  values.forEach((v, i) => { if (v > bestVal) { bestVal = v; bestIdx = i; } });
+
+  document.getElementById('statTotal').textContent = pesoFmt.format(total);
+  document.getElementById('statAvg').textContent = pesoFmt.format(avg);
+  document.getElementById('statBest').textContent = pesoFmt.format(bestVal);
+  document.getElementById('statBestDate').textContent = bestIdx >= 0 ? labels[bestIdx] : '';
+  document.getElementById('statsGrid').style.display = 'grid';
+}
+
+// Update forecast summary
+function updateForecastSummary() {
+  const forecastPeriod = parseInt(document.getElementById('forecastPeriod').value) || 1;
+  const maWindow = parseInt(document.getElementById('maWindow').value) || 1;
+
+  const newForecast = calculateForecast(forecastPeriod, maWindow);
+  const total = newForecast.reduce((a, b) => a + b, 0);
+
+  document.getElementById('forecastTotal').textContent = pesoFmt.format(total);
+  const periodText = forecastPeriod === 1 ? 'month' : 'months';
+  const windowText = maWindow === 1 ? 'month' : 'months';
+
+  // Check if there's enough data for the selected window
+  const availableData = monthlyData.length;
+  const effectiveWindow = Math.min(maWindow, availableData);
+  let descText = `Expected revenue for the next ${forecastPeriod} ${periodText} (based on ${effectiveWindow}-${effectiveWindow === 1 ? 'month' : 'months'} moving average)`;
+
+  if (maWindow > availableData) {
+    descText += ` - Note: Using available ${availableData} ${availableData === 1 ? 'month' : 'months'} of data`;
+  }
+
+  document.getElementById('forecastDesc').textContent = descText;
+  document.getElementById('forecastSummary').style.display = 'block';
+}
+
+// Calculate forecast
+function calculateForecast(period, window) {
+  if (!monthlyData || monthlyData.length === 0) {
+    return Array(period).fill(0);
+  }
+
+  // Use available data, but limit window to available data length
+  const availableData = monthlyData.length;
+  const effectiveWindow = Math.min(window, availableData);
+
+  // Get the last N months of data
+  const lastVals = monthlyData.slice(-effectiveWindow).map(m => m.revenue || 0);
+
+  // Calculate average
+  const avg = lastVals.reduce((a, b) => a + b, 0) / Math.max(1, lastVals.length);
+
+  // Return forecast for the requested period
+  return Array(period).fill(Math.round(avg * 100) / 100);
+}
+
+// Update chart
+function updateChart() {
+  if (!forecastChart || !hasData) return;
+
+  forecastChart.data.labels = labels;
+  forecastChart.data.datasets[0].data = values;
+  forecastChart.data.datasets[1].data = qtyValues;
+
+  forecastChart.update('active');
+  updateForecastSummary();
+  showNotification('✅ Chart updated successfully!', 'success');
+}
+
+// Helper function to get jsPDF
+function getJsPDF() {
+  if (window.jspdf && window.jspdf.jsPDF) {
+    return window.jspdf.jsPDF;
+  } else if (window.jsPDF) {
+    return window.jsPDF;
+  } else if (typeof jspdf !== 'undefined' && jspdf.jsPDF) {
+    return jspdf.jsPDF;
+  }
+  return null;
+}
+
+// Setup controls
+function setupControls() {
+  const periodEl = document.getElementById('forecastPeriod');
+  const windowEl = document.getElementById('maWindow');
+  const applyBtn = document.getElementById('applyForecast');
+  const exportBtn = document.getElementById('exportForecast');
+
+  if (!periodEl || !windowEl || !applyBtn || !exportBtn) {
+    setTimeout(setupControls, 100);
+    return;
+  }
+
+  applyBtn.addEventListener('click', function() {
+    const originalHTML = this.innerHTML;
+    this.innerHTML = '<div class="loading-spinner"></div> Applying...';
+    this.disabled = true;
+
+    setTimeout(() => {
+      updateChart();
+      this.innerHTML = originalHTML;
+      this.disabled = false;
+    }, 300);
+  });
+
+  periodEl.addEventListener('change', updateChart);
+  windowEl.addEventListener('change', updateChart);
+
+    exportBtn.addEventListener('click', function() {
+    try {
+      // Get jsPDF - wait a bit if not loaded yet
+      let jsPDF = getJsPDF();
+      if (!jsPDF) {
+        // Wait up to 3 seconds for library to load
+        let attempts = 0;
+        const checkInterval = setInterval(() => {
+          attempts++;
+          jsPDF = getJsPDF();
+          if (jsPDF) {
+            clearInterval(checkInterval);
+            generatePDF(jsPDF);
+          } else if (attempts >= 30) {
+            clearInterval(checkInterval);
+            showNotification('❌ PDF library failed to load. Please refresh the page.', 'danger');
+          }
+        }, 100);
+        return;
+      }
+
+      generatePDF(jsPDF);
+
+      function generatePDF(jsPDFClass) {
+      const period = parseInt(periodEl.value) || 1;
+        const maWindow = parseInt(windowEl.value) || 1;
+        const forecast = calculateForecast(period, maWindow);
+
+        // Helper function to format numbers without separators
+        function formatNumber(num) {
+          return num.toFixed(2);
+        }
+
+        // Helper function to format quantity without separators
+        function formatQuantity(num) {
+          return num.toString();
+        }
+
+        const currentDate = new Date();
+        const totalHistorical = values.reduce((a,b) => a + b, 0);
+        const totalForecast = forecast.reduce((a,b) => a + b, 0);
+        const avgMonthly = values.length > 0 ? totalHistorical / values.length : 0;
+        const totalQuantity = monthlyData.reduce((sum, item) => sum + item.quantity, 0);
+
+        // Load logo first, then generate PDF
+        const logoUrl = 'https://crisvin03.github.io/bakery_pos/static/images/logo.png';
+        const logoSize = 20; // Height in points
+
+        // Function to generate PDF with or without logo
+        function createPDF(logoDataUrl, imgWidth, imgHeight) {
+          // Create PDF using jsPDF
+          const doc = new jsPDFClass();
+
+          // Professional header section
+          const pageWidth = doc.internal.pageSize.getWidth();
+          const margin = 20;
+          let yPos = margin;
+
+          // Company header with line
+          doc.setFillColor(59, 130, 246);
+          doc.rect(0, 0, pageWidth, 30, 'F');
+
+          // Add logo if available
+          let textStartX = margin;
+          if (logoDataUrl && imgWidth > 0 && imgHeight > 0) {
+            try {
+              const logoX = margin;
+              const logoY = 5;
+              const logoHeight = logoSize;
+              // Calculate width maintaining actual aspect ratio
+              const logoWidth = (logoHeight * imgWidth) / imgHeight;
+              // Use PNG format to preserve transparency
+              doc.addImage(logoDataUrl, 'PNG', logoX, logoY, logoWidth, logoHeight);
+              textStartX = margin + logoWidth + 8;
+            } catch (e) {
+              console.log('Error adding logo to PDF:', e);
+            }
+          }
+
+          // Add company name and title (positioned after logo)
+          doc.setTextColor(255, 255, 255);
+          doc.setFontSize(20);
+          doc.setFont(undefined, 'bold');
+          doc.text('ALVAREZ BAKERY', textStartX, 15);
+
+          doc.setFontSize(14);
+          doc.setFont(undefined, 'normal');
+          doc.text('Sales Forecast Report', textStartX, 22);
+
+          // Reset text color
+          doc.setTextColor(0, 0, 0);
+          yPos = 45;
+
+          // Report metadata
+          doc.setFontSize(9);
+          doc.setFont(undefined, 'normal');
+          doc.text(`Generated: ${currentDate.toLocaleDateString('en-US', { year: 'numeric', month: 'long', day: 'numeric' })}`, margin, yPos);
+          yPos += 5;
+          doc.text(`Forecast Period: ${period} ${period === 1 ? 'Month' : 'Months'} | Moving Average: ${maWindow} ${maWindow === 1 ? 'Month' : 'Months'}`, margin, yPos);
+          yPos += 10;
+
+          // Draw separator line
+          doc.setDrawColor(200, 200, 200);
+          doc.line(margin, yPos, pageWidth - margin, yPos);
+          yPos += 8;
+
+          // Prepare table data
+          const tableData = [];
+          const maxLength = Math.max(monthlyData.length, forecast.length);
+
+          for (let i = 0; i < maxLength; i++) {
+            let periodText = '';
+            let revenue = '';
+            let quantity = '';
+            let avgPrice = '';
+            let forecasted = '';
+
+            // Historical data
+            if (i < monthlyData.length) {
+              const item = monthlyData[i];
+              const [year, month] = item.date.split('-');
+              const monthName = monthNames[parseInt(month) - 1];
+              periodText = `${monthName} ${year}`;
+              revenue = `PHP ${formatNumber(item.revenue)}`;
+              quantity = formatQuantity(item.quantity);
+              avgPrice = `PHP ${formatNumber(item.quantity > 0 ? item.revenue / item.quantity : 0)}`;
+            }
+
+            // Forecast data
+            if (i < forecast.length) {
+              const forecastDate = new Date(currentDate);
+              forecastDate.setMonth(currentDate.getMonth() + i + 1);
+              const monthName = monthNames[forecastDate.getMonth()];
+              const year = forecastDate.getFullYear();
+              if (!periodText) periodText = `${monthName} ${year}`;
+              forecasted = `PHP ${formatNumber(forecast[i])}`;
+            }
+
+            tableData.push([periodText, revenue, quantity, avgPrice, forecasted]);
+          }
+
+          // Table headers - shortened for better fit
+          const headers = ['Period', 'Revenue', 'Quantity', 'Avg Price', 'Forecast'];
+
+          // Calculate available width and adjust column widths proportionally
+          const availableWidth = pageWidth - (margin * 2);
+          const rowHeight = 7;
+          // Proportional widths: Period, Revenue, Quantity, Avg Price, Forecast
+          const colWidths = [
+            availableWidth * 0.18,  // Period
+            availableWidth * 0.22,  // Revenue
+            availableWidth * 0.18,  // Quantity
+            availableWidth * 0.22,  // Avg Price
+            availableWidth * 0.20   // Forecast
+          ];
+          const startX = margin;
+          const tableWidth = availableWidth;
+
+          // Draw header row with professional styling
+          doc.setFont(undefined, 'bold');
+          doc.setFontSize(10);
+          doc.setFillColor(40, 40, 40);
+          doc.rect(startX, yPos - 5, tableWidth, rowHeight, 'F');
+          doc.setTextColor(255, 255, 255);
+
+          // Draw header borders
+          doc.setDrawColor(60, 60, 60);
+          doc.line(startX, yPos - 5, startX + tableWidth, yPos - 5); // Top
+          doc.line(startX, yPos - 5, startX, yPos + rowHeight - 5); // Left
+          doc.line(startX + tableWidth, yPos - 5, startX + tableWidth, yPos + rowHeight - 5); // Right
+
+          let xPos = startX;
+          headers.forEach((header, idx) => {
+            // Center align headers and ensure they fit
+            const textWidth = doc.getTextWidth(header);
+            const cellCenter = xPos + colWidths[idx] / 2;
+            doc.text(header, cellCenter - textWidth / 2, yPos);
+            // Draw vertical separator
+            if (idx < headers.length - 1) {
+              doc.line(xPos + colWidths[idx], yPos - 5, xPos + colWidths[idx], yPos + rowHeight - 5);
+            }
+            xPos += colWidths[idx];
+          });
+          // Draw bottom border of header
+          doc.line(startX, yPos + rowHeight - 5, startX + tableWidth, yPos + rowHeight - 5);
+
+          // Draw data rows
+          doc.setTextColor(0, 0, 0);
+          doc.setFont(undefined, 'normal');
+          doc.setFontSize(9);
+          yPos += rowHeight;
+
+          tableData.forEach((row, rowIdx) => {
+            if (yPos > 270) {
+              doc.addPage();
+              yPos = margin + 10;
+            }
+
+            // Alternate row colors for better readability
+            if (rowIdx % 2 === 0) {
+              doc.setFillColor(250, 250, 250);
+              doc.rect(startX, yPos - 5, tableWidth, rowHeight, 'F');
+            }
+
+            // Draw cell borders
+            doc.setDrawColor(220, 220, 220);
+            // Draw left border
+            doc.line(startX, yPos - 5, startX, yPos + rowHeight - 5);
+            // Draw vertical lines between columns
+            xPos = startX;
+            colWidths.forEach((width, colIdx) => {
+              if (colIdx < colWidths.length - 1) {
+                xPos += width;
+                doc.line(xPos, yPos - 5, xPos, yPos + rowHeight - 5);
+              }
+            });
+            // Draw right border
+            doc.line(startX + tableWidth, yPos - 5, startX + tableWidth, yPos + rowHeight - 5);
+            // Draw horizontal line at bottom
+            doc.line(startX, yPos + rowHeight - 5, startX + tableWidth, yPos + rowHeight - 5);
+
+            // Draw cell content
+            xPos = startX;
+            row.forEach((cell, colIdx) => {
+              const cellText = cell || '';
+              const cellWidth = colWidths[colIdx];
+              const padding = 2;
+              const maxTextWidth = cellWidth - (padding * 2);
+
+              // Check if text fits, truncate if necessary
+              let displayText = cellText;
+              let textWidth = doc.getTextWidth(displayText);
+
+              if (textWidth > maxTextWidth) {
+                // Truncate text to fit
+                while (textWidth > maxTextWidth && displayText.length > 0) {
+                  displayText = displayText.slice(0, -1);
+                  textWidth = doc.getTextWidth(displayText);
+                }
+                displayText = displayText.slice(0, -3) + '...';
+              }
+
+              // Right align numbers, left align text
+              if (colIdx > 0 && cellText) {
+                // Right align for numeric columns
+                doc.text(displayText, xPos + cellWidth - textWidth - padding, yPos);
+              } else {
+                // Left align for period column
+                doc.text(displayText, xPos + padding, yPos);
+              }
+              xPos += cellWidth;
+            });
+
+            yPos += rowHeight;
+          });
+
+          // Footer
+          const totalPages = doc.internal.pages.length - 1;
+          for (let i = 1; i <= totalPages; i++) {
+            doc.setPage(i);
+            doc.setFontSize(8);
+            doc.setTextColor(128, 128, 128);
+            doc.text(`Page ${i} of ${totalPages}`, pageWidth - margin - 20, doc.internal.pageSize.getHeight() - 10);
+            doc.text(`Alvarez Bakery POS System`, margin, doc.internal.pageSize.getHeight() - 10);
+          }
+
+          // Save PDF
+          doc.save(`Sales_Forecast_Report_${new Date().toISOString().split('T')[0]}.pdf`);
+
+          showNotification('📥 Forecast data exported successfully!', 'success');
+        }
+
+        // Load logo image
+        const img = new Image();
+        img.crossOrigin = 'anonymous';
+
+        img.onload = function() {
+          try {
+            const canvas = document.createElement('canvas');
+            canvas.width = this.width;
+            canvas.height = this.height;
+            const ctx = canvas.getContext('2d');
+
+            // Clear canvas to ensure transparency
+            ctx.clearRect(0, 0, canvas.width, canvas.height);
+
+            // Draw image preserving transparency
+            ctx.drawImage(this, 0, 0);
+
+            // Use PNG format to preserve transparency
+            const logoDataUrl = canvas.toDataURL('image/png');
+            // Pass image dimensions for proper aspect ratio
+            createPDF(logoDataUrl, this.width, this.height);
+          } catch (e) {
+            console.log('Error processing logo:', e);
+            createPDF(null, 0, 0);
+          }
+        };
+
+        img.onerror = function() {
+          console.log('Logo could not be loaded, continuing without logo');
+          createPDF(null, 0, 0);
+        };
+
+        img.src = logoUrl;
+      }
+    } catch (error) {
+      console.error('Export error:', error);
+      showNotification('❌ Error generating PDF: ' + error.message, 'danger');
+    }
+  });
+}
+
+// Show notification
+function showNotification(message, type = 'info') {
+  const existing = document.querySelectorAll('.notification');
+  existing.forEach(n => n.remove());
+
+  const notification = document.createElement('div');
+  notification.className = `notification alert alert-${type} alert-dismissible fade show`;
+  notification.innerHTML = `
+    <div class="d-flex align-items-center">
+      <div class="me-2">${message}</div>
+      <button type="button" class="btn-close ms-auto" data-bs-dismiss="alert"></button>
+    </div>
+  `;
+
+  document.body.appendChild(notification);
+
+  setTimeout(() => {
+    if (notification.parentNode) {
+      notification.classList.remove('show');
+      setTimeout(() => notification.remove(), 300);
+    }
+  }, 4000);
+}
+
+// Initialize
+document.addEventListener('DOMContentLoaded', function() {
+  initChart();
+  setupControls();
+});
@@ -0,0 +1,539 @@
+  // The product grid is a shared cached fragment; give its forms this page's CSRF token
+  const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]:not([data-csrf])').value;
+  document.querySelectorAll('input[data-csrf]').forEach(input => { input.value = csrfToken; });
+
+  // Enhanced stepper buttons with animations
+  document.querySelectorAll('.qty-stepper').forEach(group => {
+    group.addEventListener('click', e => {
+      const btn = e.target.closest('button[data-step]');
+      if (!btn) return;
+
+      // Prevent default button behavior
+      e.preventDefault();
+      e.stopPropagation();
+
+      // Add click animation
+      btn.style.transform = 'scale(0.95)';
+      setTimeout(() => {
+        btn.style.transform = '';
+      }, 150);
+
+      const input = group.querySelector('input[type="number"]');
+      const step = parseInt(btn.getAttribute('data-step'), 10);
+      const min = parseInt(input.getAttribute('min') || '0', 10);
+      const newQty = Math.max(min, (parseInt(input.value || '0', 10) + step));
+
+      // Update the input value with animation
+      input.style.transform = 'scale(1.1)';
+      input.value = newQty;
+      setTimeout(() => {
+        input.style.transform = '';
+      }, 200);
+
+      // Check if this is a cart stepper (has data-pid) or product stepper
+      const productId = btn.getAttribute('data-pid');
+      if (productId) {
+        // This is a cart stepper - update cart
+        updateCartQuantity(productId, newQty);
+      }
+      // For product steppers, we just update the input value (no cart update needed)
+    });
+  });
+
+  // Enhanced function to update cart quantity with loading states
+  function updateCartQuantity(productId, qty) {
+    const row = document.querySelector(`tr[data-price] input[data-pid="${productId}"]`)?.closest('tr');
+    if (row) {
+      row.style.opacity = '0.6';
+      row.style.transform = 'scale(0.98)';
+    }
+
+    fetch(`/pos/update-cart/${productId}/`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/x-www-form-urlencoded',
+        'X-CSRFToken': csrfToken
+      },
+      body: `qty=${qty}`
+    }).then(() => {
+      // Show success notification
+      showNotification('Sales updated successfully!', 'success');
+      // Update totals after successful cart update
+      recompute();
+      // Restore row styling
+      if (row) {
+        row.style.opacity = '';
+        row.style.transform = '';
+      }
+    }).catch(() => {
+      // Show error notification
+      showNotification('❌ Failed to update cart', 'danger');
+      if (row) {
+        row.style.opacity = '';
+        row.style.transform = '';
+      }
+    });
+  }
+
+  // Enhanced client-side subtotal & total preview with animations
+  function recompute() {
+    let subtotal = 0;
+    document.querySelectorAll('#cartBody tr[data-price]').forEach(row => {
+      const price = parseFloat(row.getAttribute('data-price'));
+      const qty = parseFloat(row.querySelector('input.cart-qty')?.value || '0');
+      const line = price * qty;
+      subtotal += line;
+      const cell = row.querySelector('.cart-sub');
+      if (cell) {
+        cell.style.transform = 'scale(1.1)';
+        cell.textContent = '₱' + line.toFixed(2);
+        setTimeout(() => {
+          cell.style.transform = '';
+        }, 200);
+      }
+    });
+
+    const subtotalText = document.getElementById('subtotalText');
+    if (subtotalText) {
+      subtotalText.style.transform = 'scale(1.1)';
+      subtotalText.textContent = '₱' + subtotal.toFixed(2);
+      setTimeout(() => {
+        subtotalText.style.transform = '';
+      }, 200);
+    }
+
+    // Calculate discount from percentage
+    const discountPercentage = parseFloat(document.getElementById('discountInput')?.value || '0');
+    // Clamp percentage between 0 and 100
+    const clampedPercentage = Math.max(0, Math.min(100, discountPercentage));
+    // Calculate discount amount: subtotal * (percentage / 100)
+    const discountAmount = subtotal * (clampedPercentage / 100);
+
+    // Update hidden discount amount field for backend
+    const discountAmountField = document.getElementById('discountAmount');
+    if (discountAmountField) {
+      discountAmountField.value = discountAmount.toFixed(2);
+    }
+
+    // Update discount amount display
+    const discountAmountDisplay = document.getElementById('discountAmountDisplay');
+    if (discountAmountDisplay) {
+      discountAmountDisplay.textContent = `Discount amount: ₱${discountAmount.toFixed(2)}`;
+      if (discountAmount > 0) {
+        discountAmountDisplay.style.color = '#28a745';
+        discountAmountDisplay.style.fontWeight = '600';
+      } else {
+        discountAmountDisplay.style.color = '#6c757d';
+        discountAmountDisplay.style.fontWeight = 'normal';
+      }
+    }
+
+    const total = Math.max(0, subtotal - discountAmount);
+    const totalText = document.getElementById('totalText');
+    if (totalText) {
+      totalText.style.transform = 'scale(1.1)';
+      totalText.textContent = '₱' + total.toFixed(2);
+      setTimeout(() => {
+        totalText.style.transform = '';
+      }, 200);
+    }
+
+    // Update checkout button text
+    const checkoutText = document.getElementById('checkoutText');
+    if (checkoutText) {
+      checkoutText.textContent = 'Pay ₱' + total.toFixed(2);
+    }
+
+    // Calculate and display change
+    calculateChange(total);
+
+    // Validate cash after recompute
+    validateCash();
+  }
+
+  // Calculate change based on cash received and total
+  function calculateChange(total) {
+    const cashReceived = parseFloat(document.getElementById('cashReceived')?.value || '0');
+    const change = Math.max(0, cashReceived - total);
+    const changeText = document.getElementById('changeText');
+    const changeDisplay = document.getElementById('changeDisplay');
+
+    if (changeText) {
+      changeText.style.transform = 'scale(1.1)';
+      changeText.textContent = '₱' + change.toFixed(2);
+      setTimeout(() => {
+        changeText.style.transform = '';
+      }, 200);
+    }
+
+    // Show change display if cash received is greater than total
+    if (changeDisplay) {
+      if (cashReceived > 0 && cashReceived >= total) {
+        changeDisplay.style.display = 'flex';
+        changeDisplay.style.animation = 'slideIn 0.3s ease-out';
+      } else {
+        changeDisplay.style.display = 'none';
+      }
+    }
+  }
+
+  // Validate cash input and enable/disable checkout button
+  function validateCash() {
+    const cashInput = document.getElementById('cashReceived');
+    const cashError = document.getElementById('cashError');
+    const cashInsufficientError = document.getElementById('cashInsufficientError');
+    const checkoutBtn = document.getElementById('checkoutBtn');
+    const total = parseFloat(document.getElementById('totalText')?.textContent.replace('₱', '').replace(',', '') || '0');
+    const cashReceived = parseFloat(cashInput?.value || '0');
+
+    // Reset error messages
+    if (cashError) cashError.style.display = 'none';
+    if (cashInsufficientError) cashInsufficientError.style.display = 'none';
+
+    // Remove error styling
+    if (cashInput) {
+      cashInput.classList.remove('is-invalid');
+      cashInput.style.borderColor = '';
+    }
+
+    // Validate cash
+    let isValid = true;
+    if (!cashInput || cashReceived <= 0) {
+      isValid = false;
+      if (cashError) cashError.style.display = 'block';
+      if (cashInput) {
+        cashInput.classList.add('is-invalid');
+        cashInput.style.borderColor = '#dc3545';
+      }
+    } else if (cashReceived < total) {
+      isValid = false;
+      if (cashInsufficientError) cashInsufficientError.style.display = 'block';
+      if (cashInput) {
+        cashInput.classList.add('is-invalid');
+        cashInput.style.borderColor = '#dc3545';
+      }
+    }
+
+    // Enable/disable checkout button
+    if (checkoutBtn) {
+      if (isValid && cashReceived >= total) {
+        checkoutBtn.disabled = false;
+        checkoutBtn.style.opacity = '1';
+        checkoutBtn.style.cursor = 'pointer';
+      } else {
+        checkoutBtn.disabled = true;
+        checkoutBtn.style.opacity = '0.6';
+        checkoutBtn.style.cursor = 'not-allowed';
+      }
+    }
+
+    // Calculate change
+    calculateChange(total);
+
+    return isValid;
+  }
+
+  // Handle cash received input
+  document.getElementById('cashReceived')?.addEventListener('input', function(e) {
+    validateCash();
+  });
+
+  // Handle cash received blur
+  document.getElementById('cashReceived')?.addEventListener('blur', function(e) {
+    validateCash();
+  });
+
+  // Handle discount percentage input
+  document.getElementById('discountInput')?.addEventListener('input', function(e) {
+    let value = parseFloat(e.target.value) || 0;
+    // Clamp value between 0 and 100
+    if (value > 100) {
+      value = 100;
+      e.target.value = 100;
+    } else if (value < 0) {
+      value = 0;
+      e.target.value = 0;
+    }
+    recompute();
+  });
+
+  // Handle discount percentage blur to ensure valid range
+  document.getElementById('discountInput')?.addEventListener('blur', function(e) {
+    let value = parseFloat(e.target.value) || 0;
+    if (value > 100) {
+      e.target.value = 100;
+    } else if (value < 0) {
+      e.target.value = 0;
+    }
+    recompute();
+  });
+
+  // Enhanced direct input changes in cart quantity fields
+  document.getElementById('cartBody')?.addEventListener('input', e => {
+    if (e.target.matches('input.cart-qty')) {
+      const productId = e.target.getAttribute('data-pid');
+      const value = e.target.value.trim();
+
+      // Add input animation
+      e.target.style.borderColor = '#3b82f6';
+      e.target.style.boxShadow = '0 0 0 3px rgba(59, 130, 246, 0.1)';
+
+      // Don't update if field is empty - let user finish typing
+      if (productId && value !== '') {
+        const qty = parseInt(value);
+        if (!isNaN(qty) && qty >= 0) {
+          updateCartQuantity(productId, qty);
+        }
+      }
+    }
+  });
+
+  // Enhanced blur handling
+  document.getElementById('cartBody')?.addEventListener('blur', e => {
+    if (e.target.matches('input.cart-qty')) {
+      const productId = e.target.getAttribute('data-pid');
+      const value = e.target.value.trim();
+
+      // Remove focus styles
+      e.target.style.borderColor = '';
+      e.target.style.boxShadow = '';
+
+      if (productId) {
+        if (value === '') {
+          // If empty, set to 1 to prevent removal
+          e.target.value = '1';
+          updateCartQuantity(productId, 1);
+        } else {
+          const qty = parseInt(value);
+          if (!isNaN(qty) && qty >= 0) {
+            updateCartQuantity(productId, qty);
+          } else {
+            // Invalid input, reset to 1
+            e.target.value = '1';
+            updateCartQuantity(productId, 1);
+          }
+        }
+      }
+    }
+  }, true);
+
+  // Enhanced checkout form with loading states
+  // Professional confirmation modal before checkout
+  (function(){
+    var form = document.getElementById('checkoutForm');
+    if (!form) return;
+
+    // Build modal once
+    var modalHtml = `
+<div class="modal fade" id="confirmCheckoutModal" tabindex="-1" aria-hidden="true">
+  <div class="modal-dialog modal-dialog-centered">
+    <div class="modal-content" style="border-radius:16px; overflow:hidden;">
+      <div class="modal-header" style="background: linear-gradient(135deg, #3b82f6, #2563eb); color: #fff;">
+        <h5 class="modal-title d-flex align-items-center gap-2">
+          <span class="badge bg-light text-dark" style="border-radius:10px;">POS</span>
+          Confirm Payment
+        </h5>
+        <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal" aria-label="Close"></button>
+      </div>
+      <div class="modal-body">
+        <div class="d-flex align-items-center gap-3 mb-3">
+          <div class="icon-container" style="width:44px;height:44px;">
+            <svg width="22" height="22" viewBox="0 0 24 24" fill="currentColor"><path d="M12 2 2 7l10 5 10-5-10-5Zm0 7L2 4v13l10 5 10-5V4l-10 5Z"/></svg>
+          </div>
+          <div>
+            <div class="fw-bold">Are you sure you want to continue this transaction?</div>
+            <div class="text-secondary small">Please confirm to finalize the sale. This action cannot be undone.</div>
+          </div>
+        </div>
+        <div class="d-flex justify-content-between align-items-center p-3 rounded-3" style="background: linear-gradient(135deg, #f8fafc, #e2e8f0); border:1px solid rgba(16,24,40,.08);">
+          <span class="fw-semibold">Total to Pay</span>
+          <span id="confirmTotal" class="fs-4 fw-bold text-success">₱0.00</span>
+        </div>
+      </div>
+      <div class="modal-footer d-flex justify-content-between">
+        <button type="button" class="btn btn-outline-secondary" data-bs-dismiss="modal">Cancel</button>
+        <button type="button" id="confirmCheckoutBtn" class="btn btn-primary">Confirm & Pay</button>
+      </div>
+    </div>
+  </div>
+</div>`;
+
+    document.body.insertAdjacentHTML('beforeend', modalHtml);
+
+    var modalEl = document.getElementById('confirmCheckoutModal');
+    var confirmBtn = document.getElementById('confirmCheckoutBtn');
+    var bsModal = null;
+
+    form.addEventListener('submit', function(e){
+      if (form.dataset.confirmed === '1') { return; }
+      e.preventDefault();
+
+      // Validate cash before showing modal
+      if (!validateCash()) {
+        const cashInput = document.getElementById('cashReceived');
+        if (cashInput) {
+          cashInput.focus();
+          showNotification('❌ Please enter a valid cash amount before proceeding', 'danger');
+        }
+        return;
+      }
+
+      var total = document.getElementById('totalText')?.textContent || '₱0.00';
+      var totalTarget = document.getElementById('confirmTotal');
+      if (totalTarget) totalTarget.textContent = total;
+      if (window.bootstrap && bootstrap.Modal) {
+        bsModal = new bootstrap.Modal(modalEl, { backdrop: 'static', keyboard: false });
+        bsModal.show();
+      } else {
+        // Fallback show
+        modalEl.classList.add('show');
+        modalEl.style.display = 'block';
+        modalEl.removeAttribute('aria-hidden');
+        document.body.classList.add('modal-open');
+        var backdrop = document.createElement('div');
+        backdrop.className = 'modal-backdrop fade show';
+        backdrop.id = 'confirmBackdrop';
+        document.body.appendChild(backdrop);
+      }
+    });
+
+    confirmBtn?.addEventListener('click', function(){
+      // proceed with original submit with loading state
+      form.dataset.confirmed = '1';
+      if (bsModal) { bsModal.hide(); }
+      else {
+        modalEl.classList.remove('show');
+        modalEl.style.display = 'none';
+        modalEl.setAttribute('aria-hidden', 'true');
+        document.body.classList.remove('modal-open');
+        var bd = document.getElementById('confirmBackdrop');
+        if (bd) bd.parentNode.removeChild(bd);
+      }
+      const submitBtn = form.querySelector('button[type="submit"]');
+      if (submitBtn) {
+        submitBtn.classList.add('btn-loading');
+        submitBtn.disabled = true;
+        submitBtn.innerHTML = '<div class="loading me-2"></div> Processing...';
+      }
+      showNotification('🔄 Processing your order...', 'info');
+      form.submit();
+    });
+  })();
+
+  // Enhanced add to cart with animations
+  document.querySelectorAll('form[action*="add-to-cart"]').forEach(form => {
+    form.addEventListener('submit', function(e) {
+      const submitBtn = this.querySelector('button[type="submit"]');
+      const originalText = submitBtn.innerHTML;
+
+      // Add loading animation
+      submitBtn.style.transform = 'scale(0.95)';
+      submitBtn.innerHTML = '<div class="loading me-2"></div> Adding...';
+      submitBtn.disabled = true;
+
+      // Show success notification after a short delay
+      setTimeout(() => {
+        showNotification('Product added to cart!', 'success');
+      }, 500);
+    });
+  });
+
+  // Notification system
+  function showNotification(message, type = 'info') {
+    const notification = document.createElement('div');
+    notification.className = `notification alert alert-${type} alert-dismissible fade show`;
+
+    const icons = {
+      'success': '✅',
+      'info': 'ℹ️',
+      'warning': '⚠️',
+      'danger': '❌'
+    };
+
+    // Enhanced styling for success notifications
+    if (type === 'success') {
+      notification.style.background = 'linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%)';
+      notification.style.borderColor = '#28a745';
+      notification.style.color = '#155724';
+      notification.style.fontSize = '18px';
+      notification.style.fontWeight = '700';
+    }
+
+    notification.innerHTML = `
+      <div class="d-flex align-items-center">
+        <div class="me-3 fs-4">${icons[type] || icons.info}</div>
+        <div class="flex-grow-1">
+          <div class="fw-semibold">${message}</div>
+        </div>
+        <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
+      </div>
+    `;
+
+    document.body.appendChild(notification);
+
+    // Auto-remove after 3 seconds
+    setTimeout(() => {
+      if (notification.parentNode) {
+        notification.classList.remove('show');
+        setTimeout(() => {
+          if (notification.parentNode) {
+            notification.parentNode.removeChild(notification);
+          }
+        }, 300);
+      }
+    }, 3000);
+  }
+
+  // Enhanced page animations
+  document.addEventListener('DOMContentLoaded', function() {
+    // Animate product cards
+    const productCards = document.querySelectorAll('.product-card');
+    productCards.forEach((card, index) => {
+      card.style.opacity = '0';
+      card.style.transform = 'translateY(20px)';
+
+      setTimeout(() => {
+        card.style.transition = 'all 0.5s ease';
+        card.style.opacity = '1';
+        card.style.transform = 'translateY(0)';
+      }, index * 100);
+    });
+
+    // Animate cart items
+    const cartItems = document.querySelectorAll('#cartBody tr');
+    cartItems.forEach((item, index) => {
+      item.style.opacity = '0';
+      item.style.transform = 'translateX(-20px)';
+
+      setTimeout(() => {
+        item.style.transition = 'all 0.3s ease';
+        item.style.opacity = '1';
+        item.style.transform = 'translateX(0)';
+      }, 200 + (index * 50));
+    });
+  });
+
+  // Keyboard shortcuts
+  document.addEventListener('keydown', function(e) {
+    // Ctrl+Enter to checkout
+    if (e.ctrlKey && e.key === 'Enter') {
+      const checkoutForm = document.getElementById('checkoutForm');
+      if (checkoutForm) {
+        checkoutForm.submit();
+      }
+    }
+  });
+
+  // Initialize: compute totals and validate cash
+  recompute();
+
+  // Initialize checkout button state
+  document.addEventListener('DOMContentLoaded', function() {
+    const checkoutBtn = document.getElementById('checkoutBtn');
+    if (checkoutBtn) {
+      checkoutBtn.disabled = true;
+      checkoutBtn.style.opacity = '0.6';
+      checkoutBtn.style.cursor = 'not-allowed';
+    }
+    validateCash();
+  });